@@ -14,8 +14,10 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from . import routers
+from . import middlewares, routers, security
 
 __all__ = [
+    'middlewares',
     'routers',
+    'security',
 ]
@@ -0,0 +1,36 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from dependency_injector.wiring import inject, Provide
+from fastapi import Depends
+
+from app_container import AppContainer
+from repositories.data.data_base_pg import PgDatabase
+
+
+@inject
+async def unit_of_work(
+        db_pg: PgDatabase = Depends(
+            Provide[AppContainer.repository_container.data_container.db_pg]
+        ),
+):
+    """
+    请求范围的工作单元，请求内的仓储调用共用一个连接及事务
+    处理函数正常返回后提交，抛出异常时回滚；需以 scope='function' 声明，在响应发送前完成提交
+    流式响应中在处理函数返回后执行的仓储调用不在工作单元内，各自提交
+    :param db_pg: 数据库
+    """
+    async with db_pg.unit_of_work():
+        yield
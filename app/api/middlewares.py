@@ -0,0 +1,37 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from repositories.data.data_base_pg import request_scope
+
+
+class DatabaseRequestScopeMiddleware:
+    """
+    为每个请求开启数据库请求范围，用于只读副本的读己之写
+    使用纯ASGI中间件，保证上下文变量对后续的处理函数可见
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        with request_scope():
+            await self.app(scope, receive, send)
@@ -0,0 +1,125 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import os
+import re
+from typing import Mapping, Optional
+
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Scope, Receive, Send
+
+_RANGE_PATTERN = re.compile(r'(\d*)-(\d*)')
+
+
+def parse_range(http_range: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    解析单段 Range 请求头
+    :param http_range: Range 请求头，如 bytes=0-1023、bytes=1024-、bytes=-512
+    :param size: 对象大小
+    :return: (起始位置, 长度)；请求头缺失、格式不支持或为多段范围时返回 None，按整个对象响应
+    :raise ValueError: 范围无法满足
+    """
+    if not http_range:
+        return None
+
+    units, _, ranges = http_range.partition('=')
+    if units.strip().lower() != 'bytes' or ',' in ranges:
+        return None
+
+    match = _RANGE_PATTERN.fullmatch(ranges.strip())
+    if match is None or not any(match.groups()):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # 最后 n 个字节
+        length = min(int(last), size)
+        if length == 0:
+            raise ValueError(http_range)
+        return size - length, length
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(http_range)
+    return start, end - start + 1
+
+
+class ZeroCopyFileResponse(Response):
+    """
+    文件响应，服务器支持 ASGI zerocopysend 扩展时由服务器通过 sendfile 直接从文件发送，数据不经过用户态
+    不支持时整个文件使用 pathsend 扩展，否则在线程中用 pread 分块读取发送
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, offset: int, count: int, status_code: int = 200,
+                 headers: Optional[Mapping[str, str]] = None, media_type: Optional[str] = None,
+                 background: Optional[BackgroundTask] = None, whole_file: bool = False):
+        """
+        :param path: 文件路径
+        :param offset: 起始位置
+        :param count: 发送长度
+        :param whole_file: 是否发送整个文件，可使用 pathsend 扩展
+        """
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.whole_file = whole_file
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = background
+        self.init_headers(headers)
+        self.headers['content-length'] = str(count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+
+        extensions = scope.get('extensions') or {}
+        if scope.get('method', 'GET').upper() == 'HEAD' or self.count == 0:
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        elif 'http.response.zerocopysend' in extensions:
+            with open(self.path, 'rb') as file:
+                await send({
+                    'type': 'http.response.zerocopysend',
+                    'file': file,
+                    'offset': self.offset,
+                    'count': self.count,
+                    'more_body': False,
+                })
+        elif self.whole_file and 'http.response.pathsend' in extensions:
+            await send({'type': 'http.response.pathsend', 'path': self.path})
+        else:
+            await self._send_chunks(send)
+
+        if self.background is not None:
+            await self.background()
+
+    async def _send_chunks(self, send: Send):
+        fd = await asyncio.to_thread(os.open, self.path, os.O_RDONLY)
+        try:
+            offset, remaining = self.offset, self.count
+            while remaining > 0:
+                chunk = await asyncio.to_thread(os.pread, fd, min(self.chunk_size, remaining), offset)
+                if not chunk:
+                    raise RuntimeError(f'File at path {self.path} is shorter than expected.')
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': remaining > 0})
+        finally:
+            os.close(fd)
@@ -15,32 +15,65 @@ limitations under the License.
 """
 
 from dependency_injector.wiring import inject, Provide
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Form
 from fastapi.security import OAuth2PasswordRequestForm
 
+from api.security import oauth2_scheme
 from app_container import AppContainer
 from services import AccountService
+from services.account.account_token import AccountToken
 
 router = APIRouter()
 
 
 @router.post('/login')
 @inject
-def login(
+async def login(
         form_data: OAuth2PasswordRequestForm = Depends(),
         account_service: AccountService = Depends(
             Provide[AppContainer.service_container.account_service]
         ),
-):
+) -> AccountToken:
     """
     登录
     :param form_data: 登录提交的参数
     :param account_service: 账号服务
-    :return:
+    :return: 令牌
+    """
+    account = await account_service.authenticate_async(form_data.username, form_data.password)
+    return account_service.issue_token(account)
+
+
+@router.post('/refresh')
+@inject
+async def refresh(
+        refresh_token: str = Form(),
+        account_service: AccountService = Depends(
+            Provide[AppContainer.service_container.account_service]
+        ),
+) -> AccountToken:
+    """
+    刷新令牌
+    :param refresh_token: 刷新令牌
+    :param account_service: 账号服务
+    :return: 令牌
     """
-    return account_service.authenticate(form_data.username, form_data.password)
+    return await account_service.refresh_token(refresh_token)
 
 
 @router.get('/logout')
-def logout():
+@inject
+async def logout(
+        token: str = Depends(oauth2_scheme),
+        account_service: AccountService = Depends(
+            Provide[AppContainer.service_container.account_service]
+        ),
+):
+    """
+    登出，吊销当前会话，本次登录签发及刷新得到的所有令牌均失效
+    :param token: 访问令牌
+    :param account_service: 账号服务
+    :return:
+    """
+    await account_service.revoke_token(token)
     return
@@ -14,11 +14,19 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from api.security import current_account
+from services.account.account_token import AccountPrincipal
 
 router = APIRouter()
 
 
 @router.get('/me')
-def me():
-    return {'name': 'Maner·Fan'}
+async def me(account: AccountPrincipal = Depends(current_account)):
+    """
+    当前登录账号
+    :param account: 当前账号
+    :return:
+    """
+    return {'id': account.id, 'name': account.name, 'email': account.email}
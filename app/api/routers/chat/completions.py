@@ -0,0 +1,122 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+from uuid import UUID
+from typing import Literal, Optional, AsyncIterator
+
+from dependency_injector.wiring import inject, Provide
+from fastapi import APIRouter, Depends, Header
+from pydantic import BaseModel, Field
+from sse_starlette.sse import EventSourceResponse, ServerSentEvent
+
+from api.security import current_account
+from app_container import AppContainer
+from services.account.account_token import AccountPrincipal
+from services.chat.chat_models import ChatMessage
+from services.chat.chat_service import ChatService
+from services.chat.chat_stream import ChatStream
+from utils.errors.base_error import BaseServiceError
+
+router = APIRouter()
+
+
+class ChatCompletionMessage(BaseModel):
+    role: Literal['system', 'user', 'assistant']
+    content: str
+
+
+class ChatCompletionRequest(BaseModel):
+    messages: list[ChatCompletionMessage] = Field(min_length=1)
+    # 指定时将最后一条消息及回复记录到该会话
+    conversation_id: Optional[UUID] = None
+    model: Optional[str] = None
+    temperature: Optional[float] = Field(default=None, ge=0, le=2)
+    max_tokens: Optional[int] = Field(default=None, gt=0)
+
+
+def _sse_response(stream: ChatStream, last_event_id: int, ping: int, send_timeout: float) -> EventSourceResponse:
+    async def events() -> AsyncIterator[ServerSentEvent]:
+        # 写出受 ASGI 流控约束，客户端读取变慢时订阅随之放缓，缓冲满后生成任务等待；
+        # 客户端断开时仅取消订阅，生成在后台继续，重连后补发缺失的事件
+        try:
+            async for event in stream.subscribe(last_event_id):
+                yield ServerSentEvent(data=event.data, event=event.event, id=str(event.seq))
+        except BaseServiceError as e:
+            yield ServerSentEvent(data=json.dumps({'message': e.message}, ensure_ascii=False), event='error')
+
+    return EventSourceResponse(
+        events(),
+        ping=ping,
+        send_timeout=send_timeout,
+        # 禁止代理缓冲，片段到达即发往客户端
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'X-Chat-Stream-Id': stream.id},
+    )
+
+
+@router.post('/completions')
+@inject
+async def completions(
+        body: ChatCompletionRequest,
+        account: AccountPrincipal = Depends(current_account),
+        chat_service: ChatService = Depends(Provide[AppContainer.service_container.chat_service]),
+        ping: int = Depends(Provide[AppContainer.config.chat.sse.ping]),
+        send_timeout: float = Depends(Provide[AppContainer.config.chat.sse.send_timeout]),
+):
+    """
+    流式对话，以 SSE 逐片段返回模型输出
+    事件 delta: {"content"}；done: {"finish_reason", "usage"}；error: {"message"}
+    事件ID为流内递增序号，响应头 X-Chat-Stream-Id 为流ID，断线后通过 GET /completions/{stream_id} 续传
+    :param body: 对话请求
+    :param account: 当前账号
+    :param chat_service: 对话服务
+    :param ping: 心跳间隔（秒）
+    :param send_timeout: 单次写出超时（秒），客户端长时间不读取时断开
+    :return:
+    """
+    stream = await chat_service.start_stream(
+        account.id,
+        [ChatMessage(role=message.role, content=message.content) for message in body.messages],
+        conversation_id=str(body.conversation_id) if body.conversation_id else None,
+        model=body.model, temperature=body.temperature, max_tokens=body.max_tokens,
+    )
+    return _sse_response(stream, 0, ping, send_timeout)
+
+
+@router.get('/completions/{stream_id}')
+@inject
+async def resume(
+        stream_id: str,
+        last_event_id: int = Header(default=0, ge=0),
+        account: AccountPrincipal = Depends(current_account),
+        chat_service: ChatService = Depends(Provide[AppContainer.service_container.chat_service]),
+        ping: int = Depends(Provide[AppContainer.config.chat.sse.ping]),
+        send_timeout: float = Depends(Provide[AppContainer.config.chat.sse.send_timeout]),
+):
+    """
+    续传流式回复，补发 Last-Event-ID 之后的事件再继续接收实时事件，不会重新调用模型
+    :param stream_id: 流ID
+    :param last_event_id: 已收到的最后事件ID
+    :param account: 当前账号
+    :param chat_service: 对话服务
+    :param ping: 心跳间隔（秒）
+    :param send_timeout: 单次写出超时（秒）
+    :return:
+    """
+    stream = chat_service.get_stream(account.id, stream_id)
+    # 缺失的事件已被淘汰时直接返回 410
+    stream.check_resumable(last_event_id)
+    return _sse_response(stream, last_event_id, ping, send_timeout)
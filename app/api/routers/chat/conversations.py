@@ -0,0 +1,166 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+from typing import Optional
+from uuid import UUID
+
+from dependency_injector.wiring import inject, Provide
+from fastapi import APIRouter, Depends, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from api.security import current_account
+from app_container import AppContainer
+from repositories.data.conversation.conversation_models import Conversation, Message
+from services.account.account_token import AccountPrincipal
+from services.chat.conversation_service import ConversationService
+
+router = APIRouter()
+
+
+class ConversationCreateRequest(BaseModel):
+    title: str = Field(min_length=1, max_length=255)
+
+
+class ConversationPage(BaseModel):
+    items: list[Conversation]
+    # 下一页游标，为空时没有下一页
+    next_cursor: Optional[str]
+
+
+class MessagePage(BaseModel):
+    items: list[Message]
+    next_cursor: Optional[str]
+
+
+@router.post('')
+@inject
+async def create(
+        body: ConversationCreateRequest,
+        account: AccountPrincipal = Depends(current_account),
+        conversation_service: ConversationService = Depends(
+            Provide[AppContainer.service_container.conversation_service]
+        ),
+) -> Conversation:
+    """
+    创建会话
+    :param body: 会话
+    :param account: 当前账号
+    :param conversation_service: 会话服务
+    :return: 会话
+    """
+    return await conversation_service.create(account.id, body.title)
+
+
+@router.get('')
+@inject
+async def list_conversations(
+        limit: int = Query(default=20, ge=1, le=100),
+        cursor: Optional[str] = None,
+        account: AccountPrincipal = Depends(current_account),
+        conversation_service: ConversationService = Depends(
+            Provide[AppContainer.service_container.conversation_service]
+        ),
+) -> ConversationPage:
+    """
+    按最近更新倒序分页列出会话
+    :param limit: 每页数量
+    :param cursor: 上一页返回的 next_cursor
+    :param account: 当前账号
+    :param conversation_service: 会话服务
+    :return: 会话
+    """
+    items, next_cursor = await conversation_service.list_by_account(account.id, limit, cursor)
+    return ConversationPage(items=items, next_cursor=next_cursor)
+
+
+@router.get('/{conversation_id}')
+@inject
+async def get(
+        conversation_id: UUID,
+        account: AccountPrincipal = Depends(current_account),
+        conversation_service: ConversationService = Depends(
+            Provide[AppContainer.service_container.conversation_service]
+        ),
+) -> Conversation:
+    """
+    获取会话
+    :param conversation_id: 会话ID
+    :param account: 当前账号
+    :param conversation_service: 会话服务
+    :return: 会话
+    """
+    return await conversation_service.get(account.id, str(conversation_id))
+
+
+@router.get('/{conversation_id}/messages')
+@inject
+async def list_messages(
+        conversation_id: UUID,
+        limit: int = Query(default=50, ge=1, le=500),
+        cursor: Optional[str] = None,
+        account: AccountPrincipal = Depends(current_account),
+        conversation_service: ConversationService = Depends(
+            Provide[AppContainer.service_container.conversation_service]
+        ),
+) -> MessagePage:
+    """
+    按时间正序分页列出会话中的消息
+    :param conversation_id: 会话ID
+    :param limit: 每页数量
+    :param cursor: 上一页返回的 next_cursor
+    :param account: 当前账号
+    :param conversation_service: 会话服务
+    :return: 消息
+    """
+    items, next_cursor = await conversation_service.list_messages(account.id, str(conversation_id), limit, cursor)
+    return MessagePage(items=items, next_cursor=next_cursor)
+
+
+@router.get('/{conversation_id}/messages/stream')
+@inject
+async def stream_messages(
+        conversation_id: UUID,
+        account: AccountPrincipal = Depends(current_account),
+        conversation_service: ConversationService = Depends(
+            Provide[AppContainer.service_container.conversation_service]
+        ),
+        page_size: int = Depends(Provide[AppContainer.config.chat.history.page_size]),
+):
+    """
+    以 NDJSON 流式返回会话中的全部消息，每行一条，逐页读取并写出，不在内存中整体保留
+    :param conversation_id: 会话ID
+    :param account: 当前账号
+    :param conversation_service: 会话服务
+    :param page_size: 每次读取的数量
+    :return:
+    """
+    pages = conversation_service.iter_messages(account.id, str(conversation_id), page_size)
+    # 先读取首页再建立响应，会话不存在时直接返回 404
+    first = await anext(pages, [])
+
+    async def lines():
+        page = first
+        try:
+            while page:
+                yield ''.join(json.dumps(jsonable_encoder(message), ensure_ascii=False) + '\n' for message in page)
+                page = await anext(pages, [])
+        finally:
+            await pages.aclose()
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
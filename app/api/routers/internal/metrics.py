@@ -0,0 +1,148 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from dependency_injector.wiring import inject, Provide
+from fastapi import APIRouter, Depends
+
+from app_container import AppContainer
+from repositories.data.account.account_cache import AccountCache
+from repositories.data.data_base_pg import PgDatabase
+from services import EmbeddingService, IngestionPipeline, JobService
+from services.chat.chat_stream import ChatStreamRegistry
+from utils.password_hasher import PasswordHasher
+from utils.write_behind import WriteBehindBuffer
+
+router = APIRouter()
+
+
+@router.get('/password-hasher')
+@inject
+def password_hasher_stats(
+        password_hasher: PasswordHasher = Depends(
+            Provide[AppContainer.service_container.password_hasher]
+        ),
+):
+    """
+    密码哈希执行器统计
+    :param password_hasher: 密码哈希执行器
+    :return:
+    """
+    return password_hasher.stats()
+
+
+@router.get('/account-cache')
+@inject
+def account_cache_stats(
+        account_cache: AccountCache = Depends(
+            Provide[AppContainer.repository_container.data_container.account_cache]
+        ),
+):
+    """
+    账号缓存统计
+    :param account_cache: 账号缓存
+    :return:
+    """
+    return account_cache.stats()
+
+
+@router.get('/db-pool')
+@inject
+def db_pool_stats(
+        db_pg: PgDatabase = Depends(
+            Provide[AppContainer.repository_container.data_container.db_pg]
+        ),
+):
+    """
+    数据库连接池统计
+    :param db_pg: 数据库
+    :return:
+    """
+    return db_pg.pool_stats()
+
+
+@router.get('/embedding')
+@inject
+def embedding_stats(
+        embedding_service: EmbeddingService = Depends(
+            Provide[AppContainer.service_container.embedding_service]
+        ),
+):
+    """
+    向量服务缓存及批处理统计
+    :param embedding_service: 向量服务
+    :return:
+    """
+    return embedding_service.stats()
+
+
+@router.get('/chat-streams')
+@inject
+def chat_stream_stats(
+        chat_stream_registry: ChatStreamRegistry = Depends(
+            Provide[AppContainer.service_container.chat_stream_registry]
+        ),
+):
+    """
+    可续传流式回复统计
+    :param chat_stream_registry: 流式回复
+    :return:
+    """
+    return chat_stream_registry.stats()
+
+
+@router.get('/message-writer')
+@inject
+def message_writer_stats(
+        message_writer: WriteBehindBuffer = Depends(
+            Provide[AppContainer.service_container.message_writer]
+        ),
+):
+    """
+    消息后写缓冲统计
+    :param message_writer: 消息后写缓冲
+    :return:
+    """
+    return message_writer.stats()
+
+
+@router.get('/ingestion')
+@inject
+def ingestion_stats(
+        ingestion_pipeline: IngestionPipeline = Depends(
+            Provide[AppContainer.service_container.ingestion_pipeline]
+        ),
+):
+    """
+    文档导入各阶段统计
+    :param ingestion_pipeline: 文档导入
+    :return:
+    """
+    return ingestion_pipeline.stats()
+
+
+@router.get('/jobs')
+@inject
+async def job_stats(
+        job_service: JobService = Depends(
+            Provide[AppContainer.service_container.job_service]
+        ),
+):
+    """
+    后台任务各队列各状态的数量，待执行的积压持续增长时应增加执行进程
+    :param job_service: 后台任务
+    :return:
+    """
+    return await job_service.stats()
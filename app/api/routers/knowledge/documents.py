@@ -0,0 +1,112 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import dataclasses
+from typing import Optional
+from uuid import UUID
+
+from dependency_injector.wiring import inject, Provide
+from fastapi import APIRouter, Depends, status
+from pydantic import BaseModel, Field
+
+from api.security import current_account
+from app_container import AppContainer
+from repositories.data.job.job_models import Job
+from services.account.account_token import AccountPrincipal
+from services.ingestion.ingestion_models import IngestionResult, INGEST_DOCUMENT_JOB
+from services.ingestion.ingestion_pipeline import IngestionPipeline
+from services.job.job_service import JobService
+from services.knowledge.knowledge_collection_service import KnowledgeCollectionService
+from services.oss.object_service import account_object_key
+
+router = APIRouter()
+
+
+class DocumentIngestRequest(BaseModel):
+    # 当前账号已上传的对象键
+    key: str = Field(min_length=1, max_length=1024)
+    # 向量集合，首次导入时归属当前账号
+    collection: str = Field(pattern=r'^[a-z][a-z0-9_]{0,47}$')
+    metadata: Optional[dict] = None
+
+
+@router.post('')
+@inject
+async def ingest(
+        body: DocumentIngestRequest,
+        account: AccountPrincipal = Depends(current_account),
+        ingestion_pipeline: IngestionPipeline = Depends(
+            Provide[AppContainer.service_container.ingestion_pipeline]
+        ),
+        knowledge_collection_service: KnowledgeCollectionService = Depends(
+            Provide[AppContainer.service_container.knowledge_collection_service]
+        ),
+) -> IngestionResult:
+    """
+    将已上传的文档切分、生成向量并写入向量集合
+    :param body: 导入请求
+    :param account: 当前账号
+    :param ingestion_pipeline: 文档导入
+    :param knowledge_collection_service: 知识库归属
+    :return: 导入结果
+    """
+    await knowledge_collection_service.claim(account.id, body.collection)
+    result = await ingestion_pipeline.ingest(account_object_key(account.id, body.key), body.collection, body.metadata)
+    return dataclasses.replace(result, key=body.key)
+
+
+@router.post('/jobs', status_code=status.HTTP_202_ACCEPTED)
+@inject
+async def ingest_in_background(
+        body: DocumentIngestRequest,
+        account: AccountPrincipal = Depends(current_account),
+        job_service: JobService = Depends(
+            Provide[AppContainer.service_container.job_service]
+        ),
+        knowledge_collection_service: KnowledgeCollectionService = Depends(
+            Provide[AppContainer.service_container.knowledge_collection_service]
+        ),
+) -> Job:
+    """
+    提交文档导入任务，由后台执行进程导入，适用于大文档
+    :param body: 导入请求
+    :param account: 当前账号
+    :param job_service: 后台任务
+    :param knowledge_collection_service: 知识库归属
+    :return: 任务，完成后 result 为导入结果
+    """
+    await knowledge_collection_service.claim(account.id, body.collection)
+    payload = {**body.model_dump(), 'key': account_object_key(account.id, body.key)}
+    return await job_service.enqueue(INGEST_DOCUMENT_JOB, payload, account_id=account.id)
+
+
+@router.get('/jobs/{job_id}')
+@inject
+async def get_ingest_job(
+        job_id: UUID,
+        account: AccountPrincipal = Depends(current_account),
+        job_service: JobService = Depends(
+            Provide[AppContainer.service_container.job_service]
+        ),
+) -> Job:
+    """
+    查询当前账号提交的文档导入任务
+    :param job_id: 任务ID
+    :param account: 当前账号
+    :param job_service: 后台任务
+    :return: 任务
+    """
+    return await job_service.get(str(job_id), INGEST_DOCUMENT_JOB, account.id)
@@ -0,0 +1,64 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from typing import Literal, Optional
+
+from dependency_injector.wiring import inject, Provide
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+
+from api.security import current_account
+from app_container import AppContainer
+from repositories.vector.vector_models import VectorSearchResult
+from services.account.account_token import AccountPrincipal
+from services.knowledge.knowledge_collection_service import KnowledgeCollectionService
+from services.knowledge.knowledge_search_service import KnowledgeSearchService
+
+router = APIRouter()
+
+
+class KnowledgeSearchRequest(BaseModel):
+    # 当前账号的向量集合
+    collection: str = Field(pattern=r'^[a-z][a-z0-9_]{0,47}$')
+    query: str = Field(min_length=1, max_length=2048)
+    top_k: int = Field(default=10, ge=1, le=100)
+    # 元数据过滤
+    filters: Optional[dict] = None
+    # hybrid（混合）| vector（仅向量）| lexical（仅全文）
+    mode: Literal['hybrid', 'vector', 'lexical'] = 'hybrid'
+
+
+@router.post('')
+@inject
+async def search(
+        body: KnowledgeSearchRequest,
+        account: AccountPrincipal = Depends(current_account),
+        knowledge_search_service: KnowledgeSearchService = Depends(
+            Provide[AppContainer.service_container.knowledge_search_service]
+        ),
+        knowledge_collection_service: KnowledgeCollectionService = Depends(
+            Provide[AppContainer.service_container.knowledge_collection_service]
+        ),
+) -> list[VectorSearchResult]:
+    """
+    检索知识库
+    :param body: 检索请求
+    :param account: 当前账号
+    :param knowledge_search_service: 知识库检索
+    :param knowledge_collection_service: 知识库归属
+    :return: 检索结果
+    """
+    await knowledge_collection_service.get(account.id, body.collection)
+    return await knowledge_search_service.search(body.collection, body.query, body.top_k, body.filters, body.mode)
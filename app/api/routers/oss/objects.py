@@ -0,0 +1,123 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from email.utils import formatdate
+
+from dependency_injector.wiring import inject, Provide
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+
+from api.responses import ZeroCopyFileResponse, parse_range
+from api.security import current_account
+from app_container import AppContainer
+from repositories.oss.oss_models import OssObject
+from services.account.account_token import AccountPrincipal
+from services.oss.object_service import ObjectService
+
+router = APIRouter()
+
+
+@router.put('/{key:path}')
+@inject
+async def upload(
+        key: str,
+        request: Request,
+        account: AccountPrincipal = Depends(current_account),
+        object_service: ObjectService = Depends(
+            Provide[AppContainer.service_container.object_service]
+        ),
+) -> OssObject:
+    """
+    上传文件，请求体即文件内容，流式写入，不会整体载入内存
+    对象键位于当前账号的命名空间中，不同账号的同名对象互不影响
+    :param key: 对象键
+    :param request: 请求
+    :param account: 当前账号
+    :param object_service: 账号文件
+    :return: 对象信息
+    """
+    return await object_service.put_object(account.id, key, request.stream(), request.headers.get('content-type'))
+
+
+@router.get('/{key:path}')
+@router.head('/{key:path}')
+@inject
+async def download(
+        key: str,
+        request: Request,
+        account: AccountPrincipal = Depends(current_account),
+        object_service: ObjectService = Depends(
+            Provide[AppContainer.service_container.object_service]
+        ),
+):
+    """
+    下载文件，支持单段 Range 请求，本地存储时使用零拷贝发送
+    :param key: 对象键
+    :param request: 请求
+    :param account: 当前账号
+    :param object_service: 账号文件
+    :return:
+    """
+    oss_object = await object_service.head_object(account.id, key)
+    etag = f'"{oss_object.etag}"'
+    headers = {'accept-ranges': 'bytes', 'etag': etag}
+    if oss_object.last_modified is not None:
+        headers['last-modified'] = formatdate(oss_object.last_modified, usegmt=True)
+
+    # If-Range 不匹配时对象已变更，返回整个对象
+    byte_range = None
+    if request.headers.get('if-range', etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get('range'), oss_object.size)
+        except ValueError:
+            return Response(status_code=416, headers={'content-range': f'bytes */{oss_object.size}'})
+
+    status_code, offset, length = 200, 0, oss_object.size
+    if byte_range is not None:
+        offset, length = byte_range
+        status_code = 206
+        headers['content-range'] = f'bytes {offset}-{offset + length - 1}/{oss_object.size}'
+
+    path = await object_service.local_path(account.id, key)
+    if path is not None:
+        return ZeroCopyFileResponse(path, offset, length, status_code=status_code, headers=headers,
+                                    media_type=oss_object.content_type, whole_file=byte_range is None)
+
+    headers['content-length'] = str(length)
+    if request.method == 'HEAD':
+        return Response(status_code=status_code, headers=headers, media_type=oss_object.content_type)
+    return StreamingResponse(object_service.get_object(account.id, key, offset, length), status_code=status_code,
+                             headers=headers, media_type=oss_object.content_type)
+
+
+@router.delete('/{key:path}')
+@inject
+async def delete(
+        key: str,
+        account: AccountPrincipal = Depends(current_account),
+        object_service: ObjectService = Depends(
+            Provide[AppContainer.service_container.object_service]
+        ),
+):
+    """
+    删除文件
+    :param key: 对象键
+    :param account: 当前账号
+    :param object_service: 账号文件
+    :return:
+    """
+    await object_service.delete_object(account.id, key)
+    return {'key': key}
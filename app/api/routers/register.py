@@ -16,12 +16,15 @@ limitations under the License.
 
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.exceptions import RequestValidationError
 from starlette.responses import JSONResponse
 
+from api.database import unit_of_work
+from api.middlewares import DatabaseRequestScopeMiddleware
+from api.security import internal_access
 from utils.errors.base_error import BaseServiceError
-from . import auth
+from . import auth, chat, internal, knowledge, oss
 
 log = logging.getLogger()
 
@@ -34,8 +37,32 @@ def register(app: FastAPI):
 
     exception_handler(app)
 
-    app.include_router(auth.login.router, prefix='/api', tags=['auth | 认证'])
-    app.include_router(auth.users.router, prefix='/api/user', tags=['user | 用户'])
+    # 业务接口的仓储调用在请求范围的工作单元中执行，首次访问数据库时才取出连接
+    dependencies = [Depends(unit_of_work, scope='function')]
+
+    app.include_router(auth.login.router, prefix='/api', tags=['auth | 认证'], dependencies=dependencies)
+    app.include_router(auth.users.router, prefix='/api/user', tags=['user | 用户'], dependencies=dependencies)
+    app.include_router(chat.completions.router, prefix='/api/chat', tags=['chat | 对话'],
+                       dependencies=dependencies)
+    app.include_router(chat.conversations.router, prefix='/api/chat/conversations', tags=['chat | 对话'],
+                       dependencies=dependencies)
+    app.include_router(knowledge.documents.router, prefix='/api/knowledge/documents', tags=['knowledge | 知识库'],
+                       dependencies=dependencies)
+    app.include_router(knowledge.search.router, prefix='/api/knowledge/search', tags=['knowledge | 知识库'],
+                       dependencies=dependencies)
+    app.include_router(oss.objects.router, prefix='/api/oss/objects', tags=['oss | 文件'],
+                       dependencies=dependencies)
+    app.include_router(internal.metrics.router, prefix='/internal/metrics', tags=['internal | 内部'],
+                       dependencies=[Depends(internal_access)], include_in_schema=False)
+
+
+def middleware(app: FastAPI):
+    """
+    注册中间件
+    :param app:  FastAPI
+    """
+
+    app.add_middleware(DatabaseRequestScopeMiddleware)
 
 
 def exception_handler(app: FastAPI):
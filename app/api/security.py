@@ -0,0 +1,61 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hmac
+from typing import Optional
+
+from dependency_injector.wiring import inject, Provide
+from fastapi import Depends
+from fastapi.security import OAuth2PasswordBearer, HTTPBearer, HTTPAuthorizationCredentials
+
+from app_container import AppContainer
+from services import AccountService
+from services.account.account_token import AccountPrincipal
+from utils.errors.internal_error import InternalAccessError
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/api/login')
+internal_scheme = HTTPBearer(auto_error=False)
+
+
+@inject
+async def current_account(
+        token: str = Depends(oauth2_scheme),
+        account_service: AccountService = Depends(
+            Provide[AppContainer.service_container.account_service]
+        ),
+) -> AccountPrincipal:
+    """
+    当前登录账号，仅校验令牌，不访问数据库
+    :param token: 访问令牌
+    :param account_service: 账号服务
+    :return: 账号信息
+    """
+    return account_service.verify_access_token(token)
+
+
+@inject
+async def internal_access(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(internal_scheme),
+        internal_token: Optional[str] = Depends(Provide[AppContainer.config.security.internal.token]),
+):
+    """
+    内部接口鉴权，未配置令牌时内部接口不可访问；令牌不符时同样返回 404，不暴露内部接口的存在
+    :param credentials: Authorization: Bearer <令牌>
+    :param internal_token: 内部接口令牌
+    """
+    if not internal_token or credentials is None \
+            or not hmac.compare_digest(credentials.credentials.encode('utf8'), str(internal_token).encode('utf8')):
+        raise InternalAccessError()
@@ -0,0 +1,79 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import time
+
+import app_container
+from repositories.data.account.AccountRepositoryPostgres import AccountRepositoryPostgres, AccountModel
+from repositories.data.account.account_models import Account
+from repositories.data.data_base_pg import PgDatabase
+
+_EMAIL = 'benchmark@cube.chat'
+
+
+def orm_lookup(db: PgDatabase, email: str) -> Account:
+    """
+    原有实现：ORM查询、加载实体并通过 as_dict 反射构造 Account
+    """
+    with db.session() as session:
+        account_model = session.query(AccountModel).filter(AccountModel.email == email).first()
+        return Account(**account_model.as_dict())
+
+
+def bench(name: str, func, iterations: int):
+    # 预热
+    for _ in range(min(iterations // 10, 100)):
+        func()
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - started
+    print(f'{name:<12} {iterations} calls, {elapsed * 1e6 / iterations:8.1f} us/call')
+    return elapsed
+
+
+def main():
+    """
+    账号查询基准测试，对比ORM实体加载与Core列查询两种实现
+    使用 config.yml 中的数据库，会在 cube_accounts 中写入一条测试账号
+
+    python -m benchmarks.account_lookup --iterations 5000
+    """
+    parser = argparse.ArgumentParser(description='账号查询基准测试')
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    container = app_container.AppContainer()
+    db: PgDatabase = container.repository_container.data_container.db_pg()
+    repository = AccountRepositoryPostgres(session_factory=db.session)
+
+    with db.session() as session:
+        AccountModel.__table__.create(session.connection(), checkfirst=True)
+        if not session.query(AccountModel).filter(AccountModel.email == _EMAIL).first():
+            session.add(AccountModel(name='benchmark', email=_EMAIL, password='-'))
+            session.commit()
+
+    assert orm_lookup(db, _EMAIL) == repository.find_one_by_email(_EMAIL)
+
+    orm = bench('orm', lambda: orm_lookup(db, _EMAIL), args.iterations)
+    core = bench('fast path', lambda: repository.find_one_by_email(_EMAIL), args.iterations)
+    print(f'speedup: {orm / core:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from repositories.vector.vector_index_local import LocalVectorIndex
+
+
+def dataset(count: int, dimension: int, queries: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    高斯混合分布的合成数据，近似真实embedding的聚簇结构
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(count // 500, 8), dimension)).astype(np.float32)
+    labels = rng.integers(0, len(centers), count + queries)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((count + queries, dimension)).astype(np.float32)
+    return vectors[:count], vectors[count:]
+
+
+def run(path: str, vectors: np.ndarray, queries: np.ndarray, top_k: int, distance: str,
+        quantization: str, pq_m: int, rerank_factor: int) -> tuple[list[set], float, int]:
+    index = LocalVectorIndex(path, dimension=vectors.shape[1], distance=distance, ivf_threshold=len(vectors) + 1,
+                             quantization=quantization, pq_m=pq_m, rerank_factor=rerank_factor)
+    ids = [str(i) for i in range(len(vectors))]
+    for start in range(0, len(vectors), 10000):
+        end = start + 10000
+        index.upsert(ids[start:end], [''] * len(ids[start:end]), [None] * len(ids[start:end]), vectors[start:end])
+
+    started = time.perf_counter()
+    hits = [index.search(query[None, :], top_k)[0] for query in queries]
+    elapsed = time.perf_counter() - started
+    # 常驻内存的检索数据：量化时为编码，否则为原始向量
+    code_size = index.quantizer.code_size if index.quantizer is not None else vectors.shape[1] * 4
+    index.close()
+    return [{doc_id for doc_id, *_ in query_hits} for query_hits in hits], elapsed / len(queries), code_size
+
+
+def main():
+    """
+    向量量化基准测试，对比不同量化编码的 recall@k、每个向量的常驻内存及检索耗时
+    recall@k 以未量化的暴力检索结果为准
+
+    python -m benchmarks.vector_quantization --count 50000 --dimension 768
+    """
+    parser = argparse.ArgumentParser(description='向量量化基准测试')
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--dimension', type=int, default=256)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--distance', default='cosine')
+    parser.add_argument('--pq-m', type=int, nargs='*', default=[0])
+    parser.add_argument('--rerank-factor', type=int, nargs='*', default=[1, 4, 10])
+    args = parser.parse_args()
+
+    vectors, queries = dataset(args.count, args.dimension, args.queries)
+    workdir = tempfile.mkdtemp(prefix='vector_quantization_')
+    try:
+        truth, exact_latency, exact_size = run(f'{workdir}/none', vectors, queries, args.top_k, args.distance,
+                                               'none', 0, 1)
+        print(f'{"encoding":<14} {"rerank":>6} {"recall@" + str(args.top_k):>10} {"bytes/vec":>10} '
+              f'{"compress":>9} {"ms/query":>9}')
+        print(f'{"float32":<14} {"-":>6} {1:>10.3f} {exact_size:>10} {1:>8.1f}x {exact_latency * 1e3:>9.2f}')
+
+        encodings = [('int8', 0)] + [('pq', pq_m) for pq_m in args.pq_m]
+        for quantization, pq_m in encodings:
+            for rerank_factor in args.rerank_factor:
+                name = quantization if quantization == 'int8' else f'pq(m={pq_m or "auto"})'
+                path = f'{workdir}/{quantization}_{pq_m}_{rerank_factor}'
+                hits, latency, size = run(path, vectors, queries, args.top_k, args.distance,
+                                          quantization, pq_m, rerank_factor)
+                recall = np.mean([len(h & t) / args.top_k for h, t in zip(hits, truth)])
+                print(f'{name:<14} {rerank_factor:>6} {recall:>10.3f} {size:>10} {exact_size / size:>8.1f}x '
+                      f'{latency * 1e3:>9.2f}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,7 @@ limitations under the License.
 """
 
 import logging.config
+import os
 from contextlib import asynccontextmanager
 
 import uvicorn
@@ -27,6 +28,10 @@ from api.routers import register
 # 日志配置
 with open('logging.yml', 'r') as f:
     config = yaml.safe_load(f)
+    # 日志目录不纳入版本管理，首次启动时创建
+    for handler in config['handlers'].values():
+        if 'filename' in handler:
+            os.makedirs(os.path.dirname(handler['filename']), exist_ok=True)
     logging.config.dictConfig(config)
 
 
@@ -39,12 +44,38 @@ async def lifespan(fast_app: FastAPI):
 
     # start
     # 应用启动之后
+    # 校验令牌密钥等必需配置，缺失时启动失败
+    fast_app.container.service_container.account_service()
+
+    # 定期从数据库同步令牌吊销记录，多个进程间共享登出状态
+    token_revocation_list = fast_app.container.service_container.token_revocation_list()
+    token_revocation_list.start()
+
+    # 提前创建消息分区，删除超出保留期的分区
+    message_partition_manager = fast_app.container.repository_container.data_container.message_partition_manager()
+    message_partition_manager.start()
+
+    # 启用内容寻址存储时，后台回收无引用的数据块
+    blob_collector = fast_app.container.repository_container.oss_container.blob_collector()
+    if blob_collector is not None:
+        blob_collector.start()
 
     yield
 
     # shutdown
     # 应用关闭之前
+    # 写入缓冲中尚未落库的消息
+    await fast_app.container.service_container.message_writer().close()
+    await message_partition_manager.stop()
+    await token_revocation_list.stop()
+    if blob_collector is not None:
+        await blob_collector.stop()
+    # 关闭模型服务的连接
+    await fast_app.container.service_container.chat_provider().close()
+    await fast_app.container.service_container.embedding_provider().close()
     fast_app.container.shutdown_resources()
+    # 释放数据库连接池
+    await fast_app.container.repository_container.data_container.db_pg().dispose()
 
 
 def create_app() -> FastAPI:
@@ -77,6 +108,9 @@ register.register(app)
 # 注册异常处理
 register.exception_handler(app)
 
+# 注册中间件
+register.middleware(app)
+
 if __name__ == '__main__':
     """
     本地开发使用 python main.py
@@ -15,9 +15,15 @@ limitations under the License.
 """
 
 from .account.AccountRepository import AccountRepository
+from .account.AsyncAccountRepository import AsyncAccountRepository
+from .blob.BlobRepository import BlobRepository
 from .data_repository_container import DataContainer
+from .embedding.EmbeddingCacheRepository import EmbeddingCacheRepository
 
 __all__ = [
     'DataContainer',
     'AccountRepository',
+    'AsyncAccountRepository',
+    'EmbeddingCacheRepository',
+    'BlobRepository',
 ]
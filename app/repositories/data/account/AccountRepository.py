@@ -35,3 +35,12 @@ class AccountRepository(ABC):
         :return: 账号
         """
         pass
+
+    @abstractmethod
+    def update_password(self, email: str, password_hash: str):
+        """
+        更新密码HASH
+        :param email: 邮箱
+        :param password_hash: HASH后的密码
+        """
+        pass
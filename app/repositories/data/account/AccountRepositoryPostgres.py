@@ -14,22 +14,29 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from sqlalchemy import PrimaryKeyConstraint, Index, String
+from sqlalchemy import PrimaryKeyConstraint, Index, String, update, select, bindparam
 from sqlalchemy.orm import Mapped, mapped_column
 
-from repositories.data.data_base_pg import PgBaseModel
+from repositories.data.data_base_pg import PgBaseModel, read_only
 from utils.errors.account_error import AccountLoginError
 from .AccountRepository import AccountRepository
 from .account_models import Account
 
 
 class AccountRepositoryPostgres(AccountRepository):
+    @read_only
     def find_one_by_email(self, email: str) -> Account:
         with self._session_factory() as session:
-            account_model = session.query(AccountModel).filter(AccountModel.email == email).first()
-            if not account_model:
+            # 直接在Core层执行预构建的语句，不经过ORM实体加载及identity map
+            row = session.connection().execute(FIND_ONE_BY_EMAIL, {'email': email}).first()
+            if not row:
                 raise AccountLoginError(message='邮箱或密码错误')
-            return Account(**account_model.as_dict())
+            return Account.from_row(row)
+
+    def update_password(self, email: str, password_hash: str):
+        with self._session_factory() as session:
+            session.execute(update(AccountModel).where(AccountModel.email == email).values(password=password_hash))
+            session.commit()
 
 
 class AccountModel(PgBaseModel):
@@ -42,3 +49,11 @@ class AccountModel(PgBaseModel):
     name: Mapped[str] = mapped_column(String(128), nullable=False, comment='用户名')
     email: Mapped[str] = mapped_column(String(128), nullable=False, comment='邮箱')
     password: Mapped[str] = mapped_column(String(128), nullable=False, comment='密码')
+
+
+# 预构建的查询语句，仅查询 Account 所需的列，复用编译缓存
+FIND_ONE_BY_EMAIL = (
+    select(*AccountModel.columns_of(Account))
+    .where(AccountModel.__table__.c.email == bindparam('email'))
+    .limit(1)
+)
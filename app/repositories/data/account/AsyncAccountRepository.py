@@ -0,0 +1,46 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .account_models import Account
+
+
+class AsyncAccountRepository(ABC):
+    def __init__(self, session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]):
+        self._session_factory = session_factory
+
+    @abstractmethod
+    async def find_one_by_email(self, email: str) -> Account:
+        """
+        通过email查找账号
+        :param email: 邮箱
+        :return: 账号
+        """
+        pass
+
+    @abstractmethod
+    async def update_password(self, email: str, password_hash: str):
+        """
+        更新密码HASH
+        :param email: 邮箱
+        :param password_hash: HASH后的密码
+        """
+        pass
@@ -0,0 +1,52 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from utils.errors.account_error import AccountLoginError
+from .AsyncAccountRepository import AsyncAccountRepository
+from .account_cache import AccountCache, NOT_FOUND
+from .account_models import Account
+
+
+class AsyncAccountRepositoryCached(AsyncAccountRepository):
+    """
+    带缓存的账号仓储（异步），装饰实际的账号仓储
+    """
+
+    def __init__(self, delegate: AsyncAccountRepository, cache: AccountCache):
+        self._delegate = delegate
+        self._cache = cache
+
+    async def find_one_by_email(self, email: str) -> Account:
+        account = self._cache.get(email)
+        if account is NOT_FOUND:
+            raise AccountLoginError(message='邮箱或密码错误')
+        if account is not None:
+            return account
+
+        try:
+            account = await self._delegate.find_one_by_email(email)
+        except AccountLoginError:
+            self._cache.put_not_found(email)
+            raise
+
+        self._cache.put(email, account)
+        return account
+
+    async def update_password(self, email: str, password_hash: str):
+        try:
+            await self._delegate.update_password(email, password_hash)
+        finally:
+            self._cache.invalidate(email)
@@ -0,0 +1,39 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from sqlalchemy import update
+
+from repositories.data.data_base_pg import read_only
+from utils.errors.account_error import AccountLoginError
+from .AccountRepositoryPostgres import AccountModel, FIND_ONE_BY_EMAIL
+from .AsyncAccountRepository import AsyncAccountRepository
+from .account_models import Account
+
+
+class AsyncAccountRepositoryPostgres(AsyncAccountRepository):
+    @read_only
+    async def find_one_by_email(self, email: str) -> Account:
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            row = (await connection.execute(FIND_ONE_BY_EMAIL, {'email': email})).first()
+            if not row:
+                raise AccountLoginError(message='邮箱或密码错误')
+            return Account.from_row(row)
+
+    async def update_password(self, email: str, password_hash: str):
+        async with self._session_factory() as session:
+            await session.execute(update(AccountModel).where(AccountModel.email == email).values(password=password_hash))
+            await session.commit()
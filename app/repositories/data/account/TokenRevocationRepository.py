@@ -0,0 +1,69 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager
+from typing import Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .account_models import RevokedToken
+
+
+class TokenRevocationRepository(ABC):
+    """
+    令牌吊销记录，多个进程共享，重启后不丢失
+    """
+
+    def __init__(self, session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]):
+        self._session_factory = session_factory
+
+    @abstractmethod
+    async def revoke(self, token_id: str, token_type: str, expires_at: int) -> bool:
+        """
+        吊销令牌或会话
+        :param token_id: 令牌ID或会话ID
+        :param token_type: access | refresh | session
+        :param expires_at: 过期时间（时间戳）
+        :return: 是否为本次吊销，已吊销时返回 False
+        """
+        pass
+
+    @abstractmethod
+    async def is_revoked(self, token_ids: list[str]) -> bool:
+        """
+        :param token_ids: 令牌ID或会话ID
+        :return: 任一是否已吊销且未过期
+        """
+        pass
+
+    @abstractmethod
+    async def find_active(self, created_within: Optional[float] = None) -> list[RevokedToken]:
+        """
+        查找未过期的访问令牌及会话的吊销记录，刷新令牌只在换取时查询，不在此列
+        :param created_within: 仅查找最近该秒数内（以数据库时钟为准）的记录，None 时查找全部
+        :return: 吊销记录
+        """
+        pass
+
+    @abstractmethod
+    async def purge_expired(self, limit: int) -> int:
+        """
+        删除已过期的记录
+        :param limit: 单次删除的最大数量
+        :return: 删除的数量
+        """
+        pass
@@ -0,0 +1,96 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import PrimaryKeyConstraint, Index, String, DateTime, select, delete, func, bindparam
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Mapped, mapped_column
+
+from repositories.data.data_base_pg import PgBaseModel
+from .TokenRevocationRepository import TokenRevocationRepository
+from .account_models import RevokedToken
+
+
+class TokenRevocationRepositoryPostgres(TokenRevocationRepository):
+    # 吊销检查不走只读副本，副本延迟期间已吊销的令牌仍可使用
+
+    async def revoke(self, token_id: str, token_type: str, expires_at: int) -> bool:
+        async with self._session_factory() as session:
+            # 刷新令牌依赖唯一索引保证只能换取一次，并发换取时只有一个插入成功
+            inserted = (await session.execute(
+                insert(RevokedTokenModel)
+                .values(token_id=token_id, token_type=token_type,
+                        expires_at=datetime.fromtimestamp(expires_at, timezone.utc))
+                .on_conflict_do_nothing(index_elements=['token_id'])
+                .returning(RevokedTokenModel.id)
+            )).scalar_one_or_none()
+            await session.commit()
+            return inserted is not None
+
+    async def is_revoked(self, token_ids: list[str]) -> bool:
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            return (await connection.execute(IS_REVOKED, {'token_ids': token_ids})).first() is not None
+
+    async def find_active(self, created_within: Optional[float] = None) -> list[RevokedToken]:
+        statement = FIND_ACTIVE
+        if created_within is not None:
+            statement = statement.where(RevokedTokenModel.created_at >= func.now() - timedelta(seconds=created_within))
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            return RevokedToken.from_rows((await connection.execute(statement)).all())
+
+    async def purge_expired(self, limit: int) -> int:
+        async with self._session_factory() as session:
+            expired = (
+                select(RevokedTokenModel.id)
+                .where(RevokedTokenModel.expires_at < func.now())
+                .limit(limit)
+                .scalar_subquery()
+            )
+            result = await session.execute(delete(RevokedTokenModel).where(RevokedTokenModel.id.in_(expired)))
+            await session.commit()
+            return result.rowcount
+
+
+class RevokedTokenModel(PgBaseModel):
+    __tablename__ = 'cube_revoked_tokens'
+    __table_args__ = (
+        PrimaryKeyConstraint('id', name='pk_revoked_token_id'),
+        Index('uk_revoked_token_token_id', 'token_id', unique=True),
+        Index('idx_revoked_token_created', 'created_at'),
+        Index('idx_revoked_token_expires', 'expires_at'),
+    )
+
+    token_id: Mapped[str] = mapped_column(String(64), nullable=False, comment='令牌ID或会话ID')
+    token_type: Mapped[str] = mapped_column(String(16), nullable=False, comment='access | refresh | session')
+    expires_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False, comment='过期时间')
+
+
+IS_REVOKED = (
+    select(RevokedTokenModel.id)
+    .where(RevokedTokenModel.token_id.in_(bindparam('token_ids', expanding=True)))
+    .where(RevokedTokenModel.expires_at > func.now())
+    .limit(1)
+)
+
+FIND_ACTIVE = (
+    select(*RevokedTokenModel.columns_of(RevokedToken))
+    .where(RevokedTokenModel.token_type != 'refresh')
+    .where(RevokedTokenModel.expires_at > func.now())
+)
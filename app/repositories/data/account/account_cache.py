@@ -0,0 +1,69 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import dataclasses
+from typing import Optional
+
+from utils.cache import TTLCache
+from .account_models import Account
+
+# 不存在的账号
+NOT_FOUND = object()
+
+
+class AccountCache:
+    """
+    账号缓存，以邮箱为key
+    同时缓存不存在的邮箱（负缓存），使用单独且更短的过期时间
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300, negative_ttl: float = 30):
+        """
+        :param max_size: 最大条目数
+        :param ttl: 账号缓存过期时间（秒）
+        :param negative_ttl: 不存在账号的缓存过期时间（秒）
+        """
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._negative_ttl = negative_ttl
+
+    def get(self, email: str) -> Optional[Account]:
+        """
+        获取缓存的账号
+        :return: 账号副本；邮箱不存在时返回 NOT_FOUND；未命中时返回 None
+        """
+        account = self._cache.get(email, None)
+        if account is None or account is NOT_FOUND:
+            return account
+        # 返回副本，避免调用方修改缓存中的对象
+        return dataclasses.replace(account)
+
+    def put(self, email: str, account: Account):
+        self._cache.set(email, dataclasses.replace(account))
+
+    def put_not_found(self, email: str):
+        self._cache.set(email, NOT_FOUND, ttl=self._negative_ttl)
+
+    def invalidate(self, email: str):
+        """
+        失效指定账号，密码或资料变更时调用
+        """
+        self._cache.delete(email)
+
+    def invalidate_all(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
@@ -14,23 +14,40 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from dataclasses import dataclass
+from datetime import datetime
 
 from utils.dataclass_tolerant import tolerant_dataclass
 
 
 @tolerant_dataclass
-@dataclass
 class Account:
     """
     账号
 
     Attributes:
+        id: 账号ID
         name: 账号名
         email: 邮箱
         password: 密码
     """
 
+    id: str
     name: str
     email: str
     password: str
+
+
+@tolerant_dataclass
+class RevokedToken:
+    """
+    已吊销的令牌或会话
+
+    Attributes:
+        token_id: 令牌ID（jti）或会话ID（sid）
+        token_type: access | refresh | session
+        expires_at: 过期时间，之后不再需要记录
+    """
+
+    token_id: str
+    token_type: str
+    expires_at: datetime
@@ -0,0 +1,74 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .blob_models import BlobRef
+
+
+class BlobRepository(ABC):
+    """
+    内容寻址存储的引用计数，对象键指向以内容HASH标识的数据块，数据块在无引用后由后台回收
+    """
+
+    def __init__(self, session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]):
+        self._session_factory = session_factory
+
+    @abstractmethod
+    async def find_by_key(self, key: str) -> Optional[BlobRef]:
+        """
+        查找对象键指向的数据块
+        :param key: 对象键
+        :return: 映射，不存在时返回 None
+        """
+        pass
+
+    @abstractmethod
+    async def bind(self, key: str, content_hash: str, size: int, content_type: Optional[str]) -> bool:
+        """
+        将对象键指向数据块，数据块引用数加一，对象键原先指向的数据块引用数减一
+        :param key: 对象键
+        :param content_hash: 内容HASH
+        :param size: 大小
+        :param content_type: 内容类型
+        :return: 数据块是否为新建，新建时调用方需写入数据块
+        """
+        pass
+
+    @abstractmethod
+    async def unbind(self, key: str) -> bool:
+        """
+        删除对象键，所指向的数据块引用数减一
+        :param key: 对象键
+        :return: 对象键是否存在
+        """
+        pass
+
+    @abstractmethod
+    async def collect_garbage(self, delete_blob: Callable[[str], Awaitable], grace_seconds: float,
+                              limit: int) -> int:
+        """
+        回收无引用的数据块，回收期间锁定数据块记录，与并发的 bind 互斥
+        :param delete_blob: 删除数据块内容，参数为内容HASH
+        :param grace_seconds: 引用数归零超过该时间才回收
+        :param limit: 单次回收的最大数量
+        :return: 回收的数量
+        """
+        pass
@@ -0,0 +1,153 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import PrimaryKeyConstraint, Index, String, BigInteger, select, update, delete, func, \
+    bindparam, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Mapped, mapped_column
+
+from repositories.data.data_base_pg import PgBaseModel, read_only
+from .BlobRepository import BlobRepository
+from .blob_models import BlobRef
+
+log = logging.getLogger()
+
+
+class BlobRepositoryPostgres(BlobRepository):
+    @read_only
+    async def find_by_key(self, key: str) -> Optional[BlobRef]:
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            row = (await connection.execute(FIND_BY_KEY, {'key': key})).first()
+            return BlobRef.from_row(row) if row else None
+
+    async def bind(self, key: str, content_hash: str, size: int, content_type: Optional[str]) -> bool:
+        async with self._session_factory() as session:
+            # 键不存在时 FOR UPDATE 锁不到行，同一键的绑定与解绑以事务级咨询锁串行
+            await session.execute(LOCK_KEY, {'key': key})
+            previous = (await session.execute(
+                select(BlobKeyModel.content_hash).where(BlobKeyModel.key == key)
+            )).scalar_one_or_none()
+
+            # 按内容HASH顺序锁定数据块记录，两个键互换内容时不会相互等待
+            # 与回收互斥：回收持有数据块记录的行锁，此处的更新会等待回收提交后重新插入
+            created = False
+            for locked_hash in sorted({content_hash, previous} - {None}):
+                if locked_hash == content_hash:
+                    created = (await session.execute(
+                        insert(BlobModel)
+                        .values(content_hash=content_hash, size=size, ref_count=1)
+                        .on_conflict_do_update(
+                            index_elements=['content_hash'],
+                            set_={'ref_count': BlobModel.ref_count + 1, 'updated_at': func.now()},
+                        )
+                        .returning(literal_column('(xmax = 0)'))
+                    )).scalar_one()
+                if locked_hash == previous:
+                    await session.execute(DECREMENT, {'previous_hash': previous})
+
+            await session.execute(
+                insert(BlobKeyModel)
+                .values(key=key, content_hash=content_hash, size=size, content_type=content_type)
+                .on_conflict_do_update(
+                    index_elements=['key'],
+                    set_={'content_hash': content_hash, 'size': size, 'content_type': content_type,
+                          'updated_at': func.now()},
+                )
+            )
+            await session.commit()
+            return created
+
+    async def unbind(self, key: str) -> bool:
+        async with self._session_factory() as session:
+            await session.execute(LOCK_KEY, {'key': key})
+            previous = (await session.execute(
+                delete(BlobKeyModel).where(BlobKeyModel.key == key).returning(BlobKeyModel.content_hash)
+            )).scalar_one_or_none()
+            if previous is not None:
+                await session.execute(DECREMENT, {'previous_hash': previous})
+            await session.commit()
+            return previous is not None
+
+    async def collect_garbage(self, delete_blob: Callable[[str], Awaitable], grace_seconds: float,
+                              limit: int) -> int:
+        async with self._session_factory() as session:
+            content_hashes = (await session.execute(
+                select(BlobModel.content_hash)
+                .where(BlobModel.ref_count <= 0)
+                .where(BlobModel.updated_at < func.now() - timedelta(seconds=grace_seconds))
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )).scalars().all()
+
+            collected = []
+            for content_hash in content_hashes:
+                try:
+                    await delete_blob(content_hash)
+                    collected.append(content_hash)
+                except Exception as e:
+                    log.warning('Failed to delete blob %s: %s', content_hash, e)
+
+            if collected:
+                await session.execute(delete(BlobModel).where(BlobModel.content_hash.in_(collected)))
+            await session.commit()
+            return len(collected)
+
+
+class BlobModel(PgBaseModel):
+    __tablename__ = 'cube_oss_blobs'
+    __table_args__ = (
+        PrimaryKeyConstraint('id', name='pk_oss_blob_id'),
+        Index('uk_oss_blob_content_hash', 'content_hash', unique=True),
+        Index('idx_oss_blob_unreferenced', 'updated_at', postgresql_where=literal_column('ref_count <= 0')),
+    )
+
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False, comment='内容SHA-256')
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False, comment='大小')
+    ref_count: Mapped[int] = mapped_column(BigInteger, nullable=False, comment='引用数')
+
+
+class BlobKeyModel(PgBaseModel):
+    __tablename__ = 'cube_oss_keys'
+    __table_args__ = (
+        PrimaryKeyConstraint('id', name='pk_oss_key_id'),
+        Index('uk_oss_key_key', 'key', unique=True),
+        Index('idx_oss_key_content_hash', 'content_hash'),
+    )
+
+    key: Mapped[str] = mapped_column(String(1024), nullable=False, comment='对象键')
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False, comment='内容SHA-256')
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False, comment='大小')
+    content_type: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, comment='内容类型')
+
+
+FIND_BY_KEY = (
+    select(*BlobKeyModel.columns_of(BlobRef))
+    .where(BlobKeyModel.__table__.c.key == bindparam('key'))
+)
+
+DECREMENT = (
+    update(BlobModel)
+    .where(BlobModel.content_hash == bindparam('previous_hash'))
+    .values(ref_count=BlobModel.ref_count - 1, updated_at=func.now())
+)
+
+# 同一对象键的绑定与解绑串行执行，事务结束时释放
+LOCK_KEY = select(func.pg_advisory_xact_lock(func.hashtext(bindparam('key'))))
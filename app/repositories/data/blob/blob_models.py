@@ -0,0 +1,33 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from utils.dataclass_tolerant import tolerant_dataclass
+
+
+@tolerant_dataclass
+class BlobRef:
+    """
+    对象键与内容的映射
+    """
+
+    key: str
+    content_hash: str
+    size: int
+    content_type: Optional[str]
+    updated_at: datetime
@@ -0,0 +1,105 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager
+from datetime import date, datetime
+from typing import Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .conversation_models import Conversation, Message
+
+
+class ConversationRepository(ABC):
+    """
+    会话及消息
+    分页均基于排序键的游标（keyset），翻页代价与页码无关
+    """
+
+    def __init__(self, session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]):
+        self._session_factory = session_factory
+
+    @abstractmethod
+    async def create(self, account_id: str, title: str) -> Conversation:
+        """
+        创建会话
+        :param account_id: 账号ID
+        :param title: 标题
+        :return: 会话
+        """
+        pass
+
+    @abstractmethod
+    async def find_by_id(self, conversation_id: str, account_id: str) -> Optional[Conversation]:
+        """
+        查找账号下的会话
+        :param conversation_id: 会话ID
+        :param account_id: 账号ID
+        :return: 会话，不存在或不属于该账号时返回 None
+        """
+        pass
+
+    @abstractmethod
+    async def list_by_account(self, account_id: str, limit: int,
+                              after: Optional[tuple[datetime, str]] = None) -> list[Conversation]:
+        """
+        按最近更新倒序列出账号下的会话
+        :param account_id: 账号ID
+        :param limit: 数量
+        :param after: 上一页最后一条的 (updated_at, id)，为空时从第一页开始
+        :return: 会话
+        """
+        pass
+
+    @abstractmethod
+    async def insert_messages(self, messages: list[dict]):
+        """
+        批量写入消息并更新所属会话的更新时间，不校验会话归属，由调用方保证
+        :param messages: [{id?, conversation_id, role, content, usage, created_at}]，未指定ID时生成 UUIDv7
+        """
+        pass
+
+    @abstractmethod
+    async def list_messages(self, conversation: Conversation, limit: int,
+                            after: Optional[tuple[datetime, str]] = None) -> list[Message]:
+        """
+        按时间正序列出会话中的消息
+        :param conversation: 会话，以其创建时间裁剪无关的分区
+        :param limit: 数量
+        :param after: 上一页最后一条的 (created_at, id)，为空时从第一条开始
+        :return: 消息
+        """
+        pass
+
+    @abstractmethod
+    async def create_partitions(self, start: date, months: int) -> list[str]:
+        """
+        按月创建消息分区，已存在时忽略
+        :param start: 起始月份（取所在月）
+        :param months: 月数
+        :return: 新建的分区
+        """
+        pass
+
+    @abstractmethod
+    async def drop_partitions(self, before: date) -> list[str]:
+        """
+        删除整月早于指定日期的消息分区
+        :param before: 日期，分区的上界不晚于该日期时删除
+        :return: 删除的分区
+        """
+        pass
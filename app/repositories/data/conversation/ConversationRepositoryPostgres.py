@@ -0,0 +1,234 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import re
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import PrimaryKeyConstraint, Index, String, Text, UUID, DateTime, select, insert, update, func, \
+    tuple_, bindparam, text, any_
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from repositories.data.data_base_pg import PgBaseModel, read_only
+from utils.uuid7 import uuid7
+from .ConversationRepository import ConversationRepository
+from .conversation_models import Conversation, Message, month_start
+
+_PARTITION_PATTERN = re.compile(r'cube_messages_p(\d{4})(\d{2})')
+
+# 会话创建时间取自数据库时钟，消息时间取自应用时钟，下界放宽该时长以容忍两者的偏差
+_CLOCK_SKEW_MARGIN = timedelta(days=1)
+
+
+class ConversationRepositoryPostgres(ConversationRepository):
+    async def create(self, account_id: str, title: str) -> Conversation:
+        async with self._session_factory() as session:
+            row = (await session.execute(
+                insert(ConversationModel)
+                # 精确到微秒，按更新时间排序时不会因同一秒内创建而顺序不定
+                .values(account_id=account_id, title=title, created_at=func.now(), updated_at=func.now())
+                .returning(*ConversationModel.columns_of(Conversation))
+            )).first()
+            await session.commit()
+            return Conversation.from_row(row)
+
+    @read_only
+    async def find_by_id(self, conversation_id: str, account_id: str) -> Optional[Conversation]:
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            row = (await connection.execute(FIND_CONVERSATION, {
+                'conversation_id': conversation_id, 'account_id': account_id,
+            })).first()
+            return Conversation.from_row(row) if row else None
+
+    @read_only
+    async def list_by_account(self, account_id: str, limit: int,
+                              after: Optional[tuple[datetime, str]] = None) -> list[Conversation]:
+        params = {'account_id': account_id, 'limit': limit}
+        if after is not None:
+            params['at'], params['id'] = after
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            rows = await connection.execute(
+                LIST_CONVERSATIONS if after is None else LIST_CONVERSATIONS_AFTER, params,
+            )
+            return Conversation.from_rows(rows)
+
+    async def insert_messages(self, messages: list[dict]):
+        if not messages:
+            return
+
+        async with self._session_factory() as session:
+            # 先执行普通语句开启事务，COPY 与更新会话在同一事务中提交
+            await session.execute(TOUCH_CONVERSATIONS, {
+                'conversation_ids': list({message['conversation_id'] for message in messages}),
+            })
+
+            # COPY 二进制协议批量写入，比多行 INSERT 少了SQL解析及参数绑定的开销
+            connection = await (await session.connection()).get_raw_connection()
+            await connection.driver_connection.copy_records_to_table(
+                MessageModel.__tablename__,
+                columns=COPY_MESSAGE_COLUMNS,
+                records=[
+                    (
+                        # ID由应用生成，调用方在写入前即可使用
+                        message.get('id') or uuid7(),
+                        message['conversation_id'], message['role'], message['content'],
+                        json.dumps(message['usage'], ensure_ascii=False) if message.get('usage') else None,
+                        message['created_at'], message['created_at'],
+                    )
+                    for message in messages
+                ],
+            )
+            await session.commit()
+
+    @read_only
+    async def list_messages(self, conversation: Conversation, limit: int,
+                            after: Optional[tuple[datetime, str]] = None) -> list[Message]:
+        # 消息不早于会话创建，以此为下界，只扫描会话存续期间的分区（至多多扫描前一个分区）
+        params = {'conversation_id': conversation.id, 'since': conversation.created_at - _CLOCK_SKEW_MARGIN,
+                  'limit': limit}
+        if after is not None:
+            params['at'], params['id'] = after
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            rows = await connection.execute(LIST_MESSAGES if after is None else LIST_MESSAGES_AFTER, params)
+            return Message.from_rows(rows)
+
+    async def create_partitions(self, start: date, months: int) -> list[str]:
+        async with self._session_factory() as session:
+            existing = set(await self._partitions(session))
+            created = []
+            for i in range(months):
+                lower, upper = month_start(start, i), month_start(start, i + 1)
+                partition = f'{MessageModel.__tablename__}_p{lower:%Y%m}'
+                if partition in existing:
+                    continue
+                # 表名及分区边界无法参数化，均由日期生成
+                await session.execute(text(
+                    f'CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {MessageModel.__tablename__} '
+                    f"FOR VALUES FROM ('{lower.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+                ))
+                created.append(partition)
+            await session.commit()
+            return created
+
+    async def drop_partitions(self, before: date) -> list[str]:
+        async with self._session_factory() as session:
+            dropped = []
+            for partition in await self._partitions(session):
+                match = _PARTITION_PATTERN.fullmatch(partition)
+                if not match or month_start(date(int(match[1]), int(match[2]), 1), 1) > before:
+                    continue
+                # 整个分区删除，不产生逐行删除的 WAL 及表膨胀
+                await session.execute(text(f'ALTER TABLE {MessageModel.__tablename__} DETACH PARTITION {partition}'))
+                await session.execute(text(f'DROP TABLE {partition}'))
+                dropped.append(partition)
+            await session.commit()
+            return dropped
+
+    @staticmethod
+    async def _partitions(session) -> list[str]:
+        return list((await session.execute(LIST_PARTITIONS)).scalars())
+
+
+class ConversationModel(PgBaseModel):
+    __tablename__ = 'cube_conversations'
+    __table_args__ = (
+        PrimaryKeyConstraint('id', name='pk_conversation_id'),
+        Index('idx_conversation_account_updated', 'account_id', 'updated_at', 'id'),
+    )
+
+    account_id: Mapped[str] = mapped_column(UUID, nullable=False, comment='账号ID')
+    title: Mapped[str] = mapped_column(String(255), nullable=False, comment='标题')
+
+
+class MessageModel(PgBaseModel):
+    """
+    消息按创建时间按月分区，分区由 MessagePartitionManager 预先创建及过期删除
+    分区表的主键须包含分区键
+    """
+
+    __tablename__ = 'cube_messages'
+    __table_args__ = (
+        PrimaryKeyConstraint('id', 'created_at', name='pk_message_id'),
+        Index('idx_message_conversation_created', 'conversation_id', 'created_at', 'id'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+
+    # 分区键，同时作为主键的一部分
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), primary_key=True, nullable=False,
+                                                 server_default=text('CURRENT_TIMESTAMP(0)'),
+                                                 comment='创建时间')
+    conversation_id: Mapped[str] = mapped_column(UUID, nullable=False, comment='会话ID')
+    role: Mapped[str] = mapped_column(String(16), nullable=False, comment='角色')
+    content: Mapped[str] = mapped_column(Text, nullable=False, comment='内容')
+    usage: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True, comment='用量')
+
+
+_conversations = ConversationModel.__table__.c
+_messages = MessageModel.__table__.c
+
+FIND_CONVERSATION = (
+    select(*ConversationModel.columns_of(Conversation))
+    .where(_conversations.id == bindparam('conversation_id', type_=UUID))
+    .where(_conversations.account_id == bindparam('account_id', type_=UUID))
+)
+
+LIST_CONVERSATIONS = (
+    select(*ConversationModel.columns_of(Conversation))
+    .where(_conversations.account_id == bindparam('account_id', type_=UUID))
+    .order_by(_conversations.updated_at.desc(), _conversations.id.desc())
+    .limit(bindparam('limit'))
+)
+
+LIST_CONVERSATIONS_AFTER = LIST_CONVERSATIONS.where(
+    tuple_(_conversations.updated_at, _conversations.id)
+    < tuple_(bindparam('at', type_=DateTime(timezone=True)), bindparam('id', type_=UUID))
+)
+
+TOUCH_CONVERSATIONS = (
+    update(ConversationModel)
+    .where(_conversations.id == any_(bindparam('conversation_ids', type_=ARRAY(UUID))))
+    .values(updated_at=func.now())
+)
+
+COPY_MESSAGE_COLUMNS = ('id', 'conversation_id', 'role', 'content', 'usage', 'created_at', 'updated_at')
+
+LIST_MESSAGES = (
+    select(*MessageModel.columns_of(Message))
+    .where(_messages.conversation_id == bindparam('conversation_id', type_=UUID))
+    .where(_messages.created_at >= bindparam('since', type_=DateTime(timezone=True)))
+    .order_by(_messages.created_at, _messages.id)
+    .limit(bindparam('limit'))
+)
+
+# 行比较无法用于分区裁剪，额外给出 created_at 的下界
+LIST_MESSAGES_AFTER = (
+    LIST_MESSAGES
+    .where(_messages.created_at >= bindparam('at', type_=DateTime(timezone=True)))
+    .where(
+        tuple_(_messages.created_at, _messages.id)
+        > tuple_(bindparam('at', type_=DateTime(timezone=True)), bindparam('id', type_=UUID))
+    )
+)
+
+LIST_PARTITIONS = text(
+    'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+    f"WHERE i.inhparent = '{MessageModel.__tablename__}'::regclass ORDER BY c.relname"
+)
@@ -0,0 +1,81 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import base64
+from datetime import date, datetime
+from typing import Optional
+from uuid import UUID
+
+from utils.dataclass_tolerant import tolerant_dataclass
+
+
+@tolerant_dataclass
+class Conversation:
+    """
+    会话
+    """
+
+    id: UUID
+    account_id: UUID
+    title: str
+    created_at: datetime
+    updated_at: datetime
+
+
+@tolerant_dataclass
+class Message:
+    """
+    会话中的消息
+    """
+
+    id: UUID
+    conversation_id: UUID
+    role: str
+    content: str
+    usage: Optional[dict]
+    created_at: datetime
+
+
+def encode_cursor(at: datetime, id: str) -> str:
+    """
+    将排序键编码为不透明的游标
+    :param at: 排序时间
+    :param id: 主键ID
+    """
+    return base64.urlsafe_b64encode(f'{at.isoformat()}|{id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    解析游标，格式错误时抛出 ValueError
+    :param cursor: 游标
+    :return: (排序时间, 主键ID)
+    """
+    try:
+        at, id = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split('|', 1)
+        return datetime.fromisoformat(at), str(UUID(id))
+    except Exception as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+def month_start(day: date, months: int = 0) -> date:
+    """
+    所在月份第一天，可向前或向后偏移若干个月
+    :param day: 日期
+    :param months: 偏移的月数
+    """
+    month = day.year * 12 + day.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
@@ -0,0 +1,83 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from .ConversationRepository import ConversationRepository
+from .conversation_models import month_start
+
+log = logging.getLogger()
+
+
+class MessagePartitionManager:
+    """
+    后台维护消息分区：提前创建之后几个月的分区，删除超出保留期的分区
+    多个实例同时运行时创建及删除均可重复执行
+    """
+
+    def __init__(self, conversation_repository: ConversationRepository,
+                 interval: float = 3600, premake_months: int = 3, retention_months: int = 0):
+        """
+        :param conversation_repository: 会话及消息
+        :param interval: 检查间隔（秒）
+        :param premake_months: 包括当月在内提前创建的月数
+        :param retention_months: 保留的月数（不含当月），0 表示永久保留
+        """
+        self._conversation_repository = conversation_repository
+        self._interval = interval
+        self._premake_months = premake_months
+        self._retention_months = retention_months
+        self._task: Optional[asyncio.Task] = None
+
+    async def maintain(self) -> tuple[list[str], list[str]]:
+        """
+        维护一轮
+        :return: (新建的分区, 删除的分区)
+        """
+        today = datetime.now(timezone.utc).date()
+        created = await self._conversation_repository.create_partitions(today, self._premake_months)
+        dropped = []
+        if self._retention_months > 0:
+            dropped = await self._conversation_repository.drop_partitions(
+                month_start(today, -self._retention_months)
+            )
+        return created, dropped
+
+    async def _run(self):
+        while True:
+            try:
+                created, dropped = await self.maintain()
+                if created or dropped:
+                    log.info('Message partitions created %s, dropped %s', created, dropped)
+            except Exception as e:
+                log.warning('Failed to maintain message partitions: %s', e)
+            await asyncio.sleep(self._interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
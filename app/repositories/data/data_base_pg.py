@@ -13,22 +13,106 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import asyncio
+import dataclasses
+import functools
+import inspect
+import itertools
 import json
 import logging
-from contextlib import contextmanager, AbstractContextManager
-from typing import Callable
+import time
+from contextlib import contextmanager, asynccontextmanager, AbstractContextManager, AbstractAsyncContextManager
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Optional
 
-from sqlalchemy import text, DateTime, UUID, create_engine, QueuePool
+from sqlalchemy import text, DateTime, UUID, create_engine, event, exc, Engine, Column
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession, AsyncConnection
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, scoped_session, sessionmaker, Session
 from sqlalchemy.sql.ddl import CreateTable
 from sqlalchemy.dialects import postgresql
 
+from utils.uuid7 import uuid7
+from .data_pool_pg import InstrumentedQueuePool, InstrumentedAsyncAdaptedQueuePool, register_idle_pre_ping
+
 log = logging.getLogger()
 
+# 当前调用是否为只读，由 read_only 装饰的仓储方法设置
+_read_only: ContextVar[bool] = ContextVar('pg_read_only', default=False)
+# 当前请求范围，记录请求内是否发生过写操作
+_request_scope: ContextVar[Optional[dict]] = ContextVar('pg_request_scope', default=None)
+# 当前工作单元，由 PgDatabase.unit_of_work 设置
+_unit_of_work: ContextVar[Optional['UnitOfWork']] = ContextVar('pg_unit_of_work', default=None)
+
+
+def read_only(func):
+    """
+    声明仓储方法为只读，只读方法中的会话会被路由到健康的只读副本
+    同一请求内发生过写操作后，后续读取仍走主库，保证读己之写
+    """
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token = _read_only.set(True)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _read_only.reset(token)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _read_only.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+
+    return wrapper
+
+
+@contextmanager
+def request_scope():
+    """
+    请求范围，通常由中间件在每个请求开始时开启
+    """
+    token = _request_scope.set({'wrote': False})
+    try:
+        yield
+    finally:
+        _request_scope.reset(token)
+
+
+def _mark_write():
+    scope = _request_scope.get()
+    if scope is not None:
+        # 使用可变对象，线程池中执行的同步代码也能回写到请求范围
+        scope['wrote'] = True
+
+
+class PrimarySession(Session):
+    """
+    主库会话，写操作会标记到当前请求范围
+    """
+
+
+@event.listens_for(PrimarySession, 'after_flush')
+def _on_primary_flush(session, flush_context):
+    _mark_write()
+
+
+@event.listens_for(PrimarySession, 'do_orm_execute')
+def _on_primary_execute(orm_execute_state):
+    if not orm_execute_state.is_select:
+        _mark_write()
+
 
 class PgBaseModel(DeclarativeBase):
+    # 主键由应用生成按时间递增的 UUIDv7，插入前即可知道ID；数据库默认值用于不经过应用的写入
     id: Mapped[str] = mapped_column(UUID, primary_key=True,
-                                    server_default=text('uuid_generate_v4()'),
+                                    default=uuid7,
+                                    server_default=text('uuid_generate_v7()'),
                                     comment='主键ID')
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False,
                                                  server_default=text('CURRENT_TIMESTAMP(0)'),
@@ -44,6 +128,14 @@ class PgBaseModel(DeclarativeBase):
         """
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
 
+    @classmethod
+    def columns_of(cls, target) -> list[Column]:
+        """
+        按领域数据类的字段顺序返回对应的列，用于只查询所需的列并按位置直接构造数据类
+        :param target: 领域数据类
+        """
+        return [cls.__table__.c[field.name] for field in dataclasses.fields(target)]
+
     def create_statement(self) -> str:
         """
         将ORM模型的实例转换为SQL语句
@@ -51,38 +143,290 @@ class PgBaseModel(DeclarativeBase):
         return CreateTable(self.__table__).compile(dialect=postgresql.dialect()).string
 
 
+class UnitOfWorkError(RuntimeError):
+    """
+    工作单元中已成功的写操作因后续出错被回滚，且该错误未向上抛出
+    """
+
+
+class UnitOfWork:
+    """
+    工作单元，范围内对主库的异步仓储调用共用一个连接及事务
+    仓储内的 commit 仅刷新，不再各自提交，由工作单元结束时统一提交或回滚
+    首次访问主库时才取出连接；尚未访问主库前的只读调用仍路由到只读副本
+    仅限开启工作单元的任务使用，其派生的并发任务及结束后仍在运行的后台任务各自使用独立的会话
+    """
+
+    def __init__(self, engine: AsyncEngine, session_factory: async_sessionmaker[AsyncSession]):
+        self._engine = engine
+        self._session_factory = session_factory
+        self._owner = asyncio.current_task()
+        self._connection: Optional[AsyncConnection] = None
+        self._session: Optional[AsyncSession] = None
+        # 当前事务中是否有已成功的写调用
+        self._wrote = False
+        # 是否有已成功的写调用因后续出错被回滚
+        self._lost = False
+        self._closed = False
+
+    @property
+    def begun(self) -> bool:
+        """
+        是否已取出连接
+        """
+        return self._connection is not None
+
+    def usable(self) -> bool:
+        return not self._closed and self._owner is not None and asyncio.current_task() is self._owner
+
+    @asynccontextmanager
+    async def session(self) -> Callable[..., AbstractAsyncContextManager[AsyncSession]]:
+        if self._session is None:
+            self._connection = await self._engine.connect()
+            # 会话加入连接上已开启的事务，commit 不会提交该事务，rollback 会回滚该事务
+            self._session = self._session_factory(bind=self._connection, join_transaction_mode='rollback_only')
+        if not self._connection.in_transaction():
+            await self._connection.begin()
+
+        read_only_call = _read_only.get()
+        try:
+            yield self._session
+        except Exception:
+            log.exception("Unit of work rollback because of exception")
+            # 出错的语句使事务中止，回滚后之后的调用在新事务中继续
+            self._lost = self._lost or self._wrote
+            self._wrote = False
+            await self._session.rollback()
+            if self._connection.in_transaction():
+                await self._connection.rollback()
+            raise
+        else:
+            if not read_only_call:
+                self._wrote = True
+
+    async def close(self, commit: bool):
+        """
+        结束工作单元
+        :param commit: 是否提交，False 时回滚
+        """
+        self._closed = True
+        if self._connection is not None:
+            try:
+                if self._connection.in_transaction():
+                    if commit and not self._lost:
+                        await self._connection.commit()
+                    else:
+                        await self._connection.rollback()
+            finally:
+                await self._session.close()
+                await self._connection.close()
+        if commit and self._lost:
+            raise UnitOfWorkError('Writes in the unit of work were rolled back by an earlier error')
+
+
+class _Replica:
+    """
+    只读副本
+    """
+
+    def __init__(self, name: str, engine: Engine, async_engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.async_session_factory = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
+        # 在此时间之前视为不健康
+        self.unhealthy_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.unhealthy_until <= time.monotonic()
+
+
 class PgDatabase:
-    def __init__(self, host: str, port: int, database: str, username: str, password: str):
-        self._engine = create_engine(
-            f"postgresql+psycopg2://{username}:{password}@{host}:{port}/{database}",
-            json_serializer=lambda obj: json.dumps(obj, ensure_ascii=False),
-            # 指定连接池类
-            poolclass=QueuePool,
-            # 连接池大小
-            pool_size=10,
-            # 连接池中的连接最大闲置时间，超过这个时间的闲置连接将被回收
-            pool_timeout=30,
-            # 空连接回收时间
-            pool_recycle=3600,
-            # 每个连接被使用前预检
-            pool_pre_ping=True,
-        )
+    def __init__(self, host: str, port: int, database: str, username: str, password: str,
+                 driver: str = 'asyncpg',
+                 pool_size: int = 10, max_overflow: int = 10, pool_timeout: float = 30, pool_recycle: int = 3600,
+                 pre_ping_idle_seconds: float = 30,
+                 replicas: Optional[list[dict]] = None, replica_cooldown: float = 30):
+        """
+        :param driver: 异步引擎的驱动，仅支持 asyncpg，同步引擎固定使用 psycopg2
+        :param pool_size: 连接池大小
+        :param max_overflow: 连接池满时允许额外创建的连接数
+        :param pool_timeout: 获取连接的最大等待时间（秒）
+        :param pool_recycle: 连接回收时间（秒）
+        :param pre_ping_idle_seconds: 连接闲置超过该时间（秒）后，取出前先检测可用性，小于0时不检测
+        :param replicas: 只读副本，[{host, port, database?, username?, password?}]，未指定的项与主库相同
+        :param replica_cooldown: 副本连接异常后暂停使用的时间（秒）
+        """
+        # 异步仓储均依赖异步引擎，不支持仅使用同步引擎
+        if driver != 'asyncpg':
+            raise ValueError(f'Unsupported postgres driver: {driver}, only asyncpg is supported')
+
+        self._pool_options = {
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_timeout': pool_timeout,
+            'pool_recycle': pool_recycle,
+        }
+        self._pre_ping_idle_seconds = pre_ping_idle_seconds
+
+        self._engine = self._create_engine(host, port, database, username, password)
         self._session_factory = scoped_session(
             sessionmaker(
                 autocommit=False,
                 autoflush=False,
                 bind=self._engine,
+                class_=PrimarySession,
             ),
         )
 
+        # 异步引擎，不占用线程池，直接在事件循环中完成数据库往返
+        self._async_engine = self._create_async_engine(host, port, database, username, password)
+        self._async_session_factory = async_sessionmaker(
+            autoflush=False,
+            # 提交后不过期对象，避免在会话外访问属性时触发隐式IO
+            expire_on_commit=False,
+            bind=self._async_engine,
+            sync_session_class=PrimarySession,
+        )
+
+        # 只读副本
+        self._replica_cooldown = replica_cooldown
+        self._replicas: list[_Replica] = []
+        for replica in replicas or []:
+            replica_args = (
+                replica['host'], replica.get('port', port), replica.get('database', database),
+                replica.get('username', username), replica.get('password', password),
+            )
+            self._replicas.append(_Replica(
+                name=f"{replica['host']}:{replica.get('port', port)}",
+                engine=self._create_engine(*replica_args),
+                async_engine=self._create_async_engine(*replica_args),
+            ))
+        self._replica_counter = itertools.count()
+
+    def _create_engine(self, host: str, port: int, database: str, username: str, password: str) -> Engine:
+        engine = create_engine(
+            f"postgresql+psycopg2://{username}:{password}@{host}:{port}/{database}",
+            json_serializer=lambda obj: json.dumps(obj, ensure_ascii=False),
+            # 指定连接池类
+            poolclass=InstrumentedQueuePool,
+            **self._pool_options,
+        )
+        # 仅对闲置较久的连接预检
+        register_idle_pre_ping(engine, self._pre_ping_idle_seconds)
+        return engine
+
+    def _create_async_engine(self, host: str, port: int, database: str, username: str, password: str) -> AsyncEngine:
+        engine = create_async_engine(
+            f"postgresql+asyncpg://{username}:{password}@{host}:{port}/{database}",
+            json_serializer=lambda obj: json.dumps(obj, ensure_ascii=False),
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            **self._pool_options,
+        )
+        register_idle_pre_ping(engine.sync_engine, self._pre_ping_idle_seconds)
+        return engine
+
+    def _choose_replica(self) -> Optional[_Replica]:
+        """
+        只读调用且请求内未发生写操作时，轮询选择健康的副本
+        """
+        if not self._replicas or not _read_only.get():
+            return None
+
+        scope = _request_scope.get()
+        if scope is not None and scope['wrote']:
+            return None
+
+        start = next(self._replica_counter)
+        for i in range(len(self._replicas)):
+            replica = self._replicas[(start + i) % len(self._replicas)]
+            if replica.healthy:
+                return replica
+        return None
+
+    def _on_replica_error(self, replica: _Replica, e: Exception):
+        if isinstance(e, (exc.OperationalError, exc.InterfaceError)) or getattr(e, 'connection_invalidated', False):
+            log.warning('Replica %s unavailable for %ss: %s', replica.name, self._replica_cooldown, e)
+            replica.unhealthy_until = time.monotonic() + self._replica_cooldown
+
+    def pool_stats(self) -> dict:
+        """
+        连接池统计
+        """
+        stats = {'sync': self._engine.pool.status_dict(), 'async': self._async_engine.pool.status_dict()}
+        for replica in self._replicas:
+            stats[f'replica:{replica.name}'] = {
+                'healthy': replica.healthy,
+                'sync': replica.engine.pool.status_dict(),
+                'async': replica.async_engine.pool.status_dict(),
+            }
+        return stats
+
     @contextmanager
     def session(self) -> Callable[..., AbstractContextManager[Session]]:
-        session: Session = self._session_factory()
+        replica = self._choose_replica()
+        session: Session = replica.session_factory() if replica else self._session_factory()
         try:
             yield session
-        except Exception:
+        except Exception as e:
             log.exception("Session rollback because of exception")
             session.rollback()
+            if replica:
+                self._on_replica_error(replica, e)
             raise
         finally:
             session.close()
+
+    @asynccontextmanager
+    async def async_session(self) -> Callable[..., AbstractAsyncContextManager[AsyncSession]]:
+        unit_of_work = _unit_of_work.get()
+        if unit_of_work is not None and not unit_of_work.usable():
+            unit_of_work = None
+
+        # 工作单元已访问过主库时，只读调用也走同一连接，保证读己之写
+        replica = None if unit_of_work is not None and unit_of_work.begun else self._choose_replica()
+        if unit_of_work is not None and replica is None:
+            async with unit_of_work.session() as session:
+                yield session
+            return
+
+        session: AsyncSession = replica.async_session_factory() if replica else self._async_session_factory()
+        try:
+            yield session
+        except Exception as e:
+            log.exception("Async session rollback because of exception")
+            await session.rollback()
+            if replica:
+                self._on_replica_error(replica, e)
+            raise
+        finally:
+            await session.close()
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[UnitOfWork]:
+        """
+        开启工作单元，正常结束时提交，出现异常时回滚
+        """
+        unit_of_work = UnitOfWork(self._async_engine, self._async_session_factory)
+        token = _unit_of_work.set(unit_of_work)
+        try:
+            yield unit_of_work
+        except BaseException:
+            await unit_of_work.close(commit=False)
+            raise
+        else:
+            await unit_of_work.close(commit=True)
+        finally:
+            _unit_of_work.reset(token)
+
+    async def dispose(self):
+        """
+        释放连接池
+        """
+        for replica in self._replicas:
+            await replica.async_engine.dispose()
+            replica.engine.dispose()
+        await self._async_engine.dispose()
+        self._engine.dispose()
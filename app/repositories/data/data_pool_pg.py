@@ -0,0 +1,154 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import bisect
+import logging
+import threading
+import time
+
+from sqlalchemy import event, exc, Engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+log = logging.getLogger()
+
+# 获取连接等待耗时直方图的桶上界（毫秒）
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolStats:
+    """
+    连接池统计
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.pings = 0
+        self.ping_failures = 0
+        # 最后一个桶为超过最大上界的计数
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def record_wait(self, wait_ms: float, timeout: bool = False):
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_histogram[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            total = self.checkouts + self.timeouts
+            histogram = {f'le_{bound}ms': count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_histogram)}
+            histogram['gt_max'] = self.wait_histogram[-1]
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'pings': self.pings,
+                'ping_failures': self.ping_failures,
+                'wait_avg_ms': round(self.wait_total_ms / total, 3) if total else 0.0,
+                'wait_max_ms': round(self.wait_max_ms, 3),
+                'wait_histogram': histogram,
+            }
+
+
+class _InstrumentedPoolMixin:
+    """
+    统计获取连接的等待耗时
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_wait((time.perf_counter() - started) * 1000, timeout=True)
+            raise
+        self.stats.record_wait((time.perf_counter() - started) * 1000)
+        return connection
+
+    def status_dict(self) -> dict:
+        return {
+            'size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': self.overflow(),
+            **self.stats.as_dict(),
+        }
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def register_idle_pre_ping(engine: Engine, idle_seconds: float):
+    """
+    仅对闲置超过指定时间的连接在取出前做可用性检测，替代每次取出都检测的 pool_pre_ping
+    :param engine: 同步引擎（异步引擎使用 async_engine.sync_engine）
+    :param idle_seconds: 闲置阈值（秒），小于0时不检测
+    """
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        connection_record.info['checked_in_at'] = time.monotonic()
+        engine.pool.stats.incr('connects')
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info['checked_in_at'] = time.monotonic()
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        engine.pool.stats.incr('invalidations')
+
+    if idle_seconds < 0:
+        return
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get('checked_in_at')
+        if checked_in_at is not None and time.monotonic() - checked_in_at < idle_seconds:
+            return
+
+        engine.pool.stats.incr('pings')
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            engine.pool.stats.incr('ping_failures')
+            log.warning('Connection ping failed, reconnecting: %s', e)
+            # 抛出DisconnectionError后，连接池会丢弃该连接并重新获取
+            raise exc.DisconnectionError() from e
@@ -17,8 +17,26 @@ limitations under the License.
 from dependency_injector import containers, providers
 
 from .account.AccountRepository import AccountRepository
+from .account.AccountRepositoryCached import AccountRepositoryCached
 from .account.AccountRepositoryPostgres import AccountRepositoryPostgres
+from .account.AsyncAccountRepository import AsyncAccountRepository
+from .account.AsyncAccountRepositoryCached import AsyncAccountRepositoryCached
+from .account.AsyncAccountRepositoryPostgres import AsyncAccountRepositoryPostgres
+from .account.TokenRevocationRepository import TokenRevocationRepository
+from .account.TokenRevocationRepositoryPostgres import TokenRevocationRepositoryPostgres
+from .account.account_cache import AccountCache
+from .blob.BlobRepository import BlobRepository
+from .blob.BlobRepositoryPostgres import BlobRepositoryPostgres
+from .conversation.ConversationRepository import ConversationRepository
+from .conversation.ConversationRepositoryPostgres import ConversationRepositoryPostgres
+from .conversation.message_partition_manager import MessagePartitionManager
 from .data_base_pg import PgDatabase
+from .embedding.EmbeddingCacheRepository import EmbeddingCacheRepository
+from .embedding.EmbeddingCacheRepositoryPostgres import EmbeddingCacheRepositoryPostgres
+from .job.JobRepository import JobRepository
+from .job.JobRepositoryPostgres import JobRepositoryPostgres
+from .knowledge.KnowledgeCollectionRepository import KnowledgeCollectionRepository
+from .knowledge.KnowledgeCollectionRepositoryPostgres import KnowledgeCollectionRepositoryPostgres
 
 
 class DataContainer(containers.DeclarativeContainer):
@@ -35,10 +53,91 @@ class DataContainer(containers.DeclarativeContainer):
         database=config.repository.data.postgres.database,
         username=config.repository.data.postgres.username,
         password=config.repository.data.postgres.password,
+        driver=config.repository.data.postgres.driver,
+        pool_size=config.repository.data.postgres.pool.size,
+        max_overflow=config.repository.data.postgres.pool.max_overflow,
+        pool_timeout=config.repository.data.postgres.pool.timeout,
+        pool_recycle=config.repository.data.postgres.pool.recycle,
+        pre_ping_idle_seconds=config.repository.data.postgres.pool.pre_ping_idle_seconds,
+        replicas=config.repository.data.postgres.replicas,
+        replica_cooldown=config.repository.data.postgres.replica_cooldown,
+    )
+
+    # 账号缓存
+    account_cache = providers.Singleton(
+        AccountCache,
+        max_size=config.repository.data.cache.account.max_size,
+        ttl=config.repository.data.cache.account.ttl,
+        negative_ttl=config.repository.data.cache.account.negative_ttl,
     )
 
     # 账号
-    account_repository: AccountRepository = providers.Selector(
+    _account_repository: AccountRepository = providers.Selector(
         config.repository.data.type,
         postgres=providers.Singleton(AccountRepositoryPostgres, session_factory=db_pg.provided.session)
     )
+
+    account_repository: AccountRepository = providers.Selector(
+        config.repository.data.cache.type,
+        none=_account_repository,
+        memory=providers.Singleton(AccountRepositoryCached, delegate=_account_repository, cache=account_cache),
+    )
+
+    # 账号（异步）
+    _async_account_repository: AsyncAccountRepository = providers.Selector(
+        config.repository.data.type,
+        postgres=providers.Singleton(AsyncAccountRepositoryPostgres, session_factory=db_pg.provided.async_session),
+    )
+
+    async_account_repository: AsyncAccountRepository = providers.Selector(
+        config.repository.data.cache.type,
+        none=_async_account_repository,
+        memory=providers.Singleton(AsyncAccountRepositoryCached, delegate=_async_account_repository,
+                                   cache=account_cache),
+    )
+
+    # 令牌吊销记录
+    token_revocation_repository: TokenRevocationRepository = providers.Selector(
+        config.repository.data.type,
+        postgres=providers.Singleton(TokenRevocationRepositoryPostgres, session_factory=db_pg.provided.async_session),
+    )
+
+    # 向量缓存
+    embedding_cache_repository: EmbeddingCacheRepository = providers.Selector(
+        config.repository.data.type,
+        postgres=providers.Singleton(EmbeddingCacheRepositoryPostgres, session_factory=db_pg.provided.async_session),
+    )
+
+    # 内容寻址存储的引用计数
+    blob_repository: BlobRepository = providers.Selector(
+        config.repository.data.type,
+        postgres=providers.Singleton(BlobRepositoryPostgres, session_factory=db_pg.provided.async_session),
+    )
+
+    # 会话及消息
+    conversation_repository: ConversationRepository = providers.Selector(
+        config.repository.data.type,
+        postgres=providers.Singleton(ConversationRepositoryPostgres, session_factory=db_pg.provided.async_session),
+    )
+
+    # 消息分区维护
+    message_partition_manager = providers.Singleton(
+        MessagePartitionManager,
+        conversation_repository=conversation_repository,
+        interval=config.repository.data.partition.messages.interval,
+        premake_months=config.repository.data.partition.messages.premake_months,
+        retention_months=config.repository.data.partition.messages.retention_months,
+    )
+
+    # 后台任务队列
+    job_repository: JobRepository = providers.Selector(
+        config.repository.data.type,
+        postgres=providers.Singleton(JobRepositoryPostgres, session_factory=db_pg.provided.async_session),
+    )
+
+    # 知识库归属
+    knowledge_collection_repository: KnowledgeCollectionRepository = providers.Selector(
+        config.repository.data.type,
+        postgres=providers.Singleton(KnowledgeCollectionRepositoryPostgres,
+                                     session_factory=db_pg.provided.async_session),
+    )
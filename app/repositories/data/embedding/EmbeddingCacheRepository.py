@@ -0,0 +1,45 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class EmbeddingCacheRepository(ABC):
+    def __init__(self, session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]):
+        self._session_factory = session_factory
+
+    @abstractmethod
+    async def find_many(self, model: str, content_hashes: list[str]) -> dict[str, list[float]]:
+        """
+        批量查找已缓存的向量
+        :param model: 模型标识
+        :param content_hashes: 内容HASH
+        :return: 内容HASH -> 向量，未缓存的不返回
+        """
+        pass
+
+    @abstractmethod
+    async def save_many(self, model: str, embeddings: dict[str, list[float]]):
+        """
+        批量保存向量，已存在时忽略
+        :param model: 模型标识
+        :param embeddings: 内容HASH -> 向量
+        """
+        pass
@@ -0,0 +1,77 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import numpy as np
+from sqlalchemy import PrimaryKeyConstraint, Index, String, LargeBinary, select, bindparam, any_
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from repositories.data.data_base_pg import PgBaseModel, read_only
+from .EmbeddingCacheRepository import EmbeddingCacheRepository
+
+
+class EmbeddingCacheRepositoryPostgres(EmbeddingCacheRepository):
+    @read_only
+    async def find_many(self, model: str, content_hashes: list[str]) -> dict[str, list[float]]:
+        if not content_hashes:
+            return {}
+
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            rows = await connection.execute(FIND_MANY, {'model': model, 'content_hashes': content_hashes})
+            return {
+                content_hash: np.frombuffer(embedding, dtype=np.float32).tolist()
+                for content_hash, embedding in rows
+            }
+
+    async def save_many(self, model: str, embeddings: dict[str, list[float]]):
+        if not embeddings:
+            return
+
+        async with self._session_factory() as session:
+            # 向量以 float32 二进制保存，体积约为文本的1/4
+            await session.execute(
+                insert(EmbeddingCacheModel)
+                .values([
+                    {
+                        'model': model,
+                        'content_hash': content_hash,
+                        'embedding': np.asarray(embedding, dtype=np.float32).tobytes(),
+                    }
+                    for content_hash, embedding in embeddings.items()
+                ])
+                .on_conflict_do_nothing(index_elements=['model', 'content_hash'])
+            )
+            await session.commit()
+
+
+class EmbeddingCacheModel(PgBaseModel):
+    __tablename__ = 'cube_embedding_cache'
+    __table_args__ = (
+        PrimaryKeyConstraint('id', name='pk_embedding_cache_id'),
+        Index('uk_embedding_cache_model_hash', 'model', 'content_hash', unique=True),
+    )
+
+    model: Mapped[str] = mapped_column(String(128), nullable=False, comment='模型标识')
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False, comment='内容SHA-256')
+    embedding: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, comment='向量（float32）')
+
+
+FIND_MANY = (
+    select(EmbeddingCacheModel.content_hash, EmbeddingCacheModel.embedding)
+    .where(EmbeddingCacheModel.model == bindparam('model'))
+    .where(EmbeddingCacheModel.content_hash == any_(bindparam('content_hashes', type_=ARRAY(String))))
+)
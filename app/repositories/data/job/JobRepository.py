@@ -0,0 +1,131 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager
+from datetime import timedelta
+from typing import Callable, Optional
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .job_models import Job
+
+
+class JobRepository(ABC):
+    """
+    持久化的后台任务队列
+    多个执行者并发领取时互不阻塞、不重复领取；执行者失联后任务在租约到期时重新可见
+    """
+
+    def __init__(self, session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]):
+        self._session_factory = session_factory
+
+    @abstractmethod
+    async def enqueue(self, queue: str, kind: str, payload: dict, max_attempts: int,
+                      delay: Optional[timedelta] = None, account_id: Optional[str] = None) -> Job:
+        """
+        添加任务
+        :param queue: 队列
+        :param kind: 任务类型
+        :param payload: 处理函数的参数
+        :param max_attempts: 最大执行次数
+        :param delay: 延迟执行的时间
+        :param account_id: 提交任务的账号
+        :return: 任务
+        """
+        pass
+
+    @abstractmethod
+    async def find_by_id(self, job_id: str) -> Optional[Job]:
+        """
+        查找任务
+        :param job_id: 任务ID
+        :return: 任务，不存在时返回 None
+        """
+        pass
+
+    @abstractmethod
+    async def claim(self, queues: list[str], limit: int, worker: str, visibility_timeout: timedelta) -> list[Job]:
+        """
+        批量领取到期的任务，领取次数加一，在租约到期前对其他执行者不可见
+        :param queues: 队列
+        :param limit: 最多领取的数量
+        :param worker: 执行者标识
+        :param visibility_timeout: 租约时长
+        :return: 领取到的任务
+        """
+        pass
+
+    @abstractmethod
+    async def extend(self, job_ids: list[UUID], worker: str, visibility_timeout: timedelta) -> int:
+        """
+        延长执行中任务的租约，租约已被其他执行者接管的任务不受影响
+        :param job_ids: 任务ID
+        :param worker: 执行者标识
+        :param visibility_timeout: 自当前起的租约时长
+        :return: 延长的数量
+        """
+        pass
+
+    @abstractmethod
+    async def complete(self, job_id: UUID, worker: str, result: Optional[dict] = None) -> bool:
+        """
+        标记任务完成
+        :param job_id: 任务ID
+        :param worker: 执行者标识
+        :param result: 执行结果
+        :return: 是否仍由该执行者持有，租约被接管时返回 False
+        """
+        pass
+
+    @abstractmethod
+    async def fail(self, job_id: UUID, worker: str, error: str, retry_delay: Optional[timedelta]) -> bool:
+        """
+        标记任务失败
+        :param job_id: 任务ID
+        :param worker: 执行者标识
+        :param error: 失败原因
+        :param retry_delay: 重试的延迟，None 时不再重试
+        :return: 是否仍由该执行者持有
+        """
+        pass
+
+    @abstractmethod
+    async def release(self, job_ids: list[UUID], worker: str) -> int:
+        """
+        归还未执行完的任务，立即可被重新领取且不计入执行次数，用于执行者正常退出
+        :param job_ids: 任务ID
+        :param worker: 执行者标识
+        :return: 归还的数量
+        """
+        pass
+
+    @abstractmethod
+    async def purge(self, older_than: timedelta) -> int:
+        """
+        删除完成或最终失败已久的任务
+        :param older_than: 结束超过该时长的任务
+        :return: 删除的数量
+        """
+        pass
+
+    @abstractmethod
+    async def stats(self) -> list[dict]:
+        """
+        各队列各状态的任务数
+        :return: [{queue, status, count}]
+        """
+        pass
@@ -0,0 +1,205 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from datetime import timedelta
+from typing import Optional
+from uuid import UUID as PyUUID
+
+from sqlalchemy import PrimaryKeyConstraint, Index, String, Text, Integer, UUID, DateTime, Interval, select, \
+    insert, update, delete, func, bindparam, any_, literal_column
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from repositories.data.data_base_pg import PgBaseModel, read_only
+from .JobRepository import JobRepository
+from .job_models import Job, JOB_PENDING, JOB_RUNNING, JOB_DONE, JOB_FAILED
+
+
+class JobRepositoryPostgres(JobRepository):
+    async def enqueue(self, queue: str, kind: str, payload: dict, max_attempts: int,
+                      delay: Optional[timedelta] = None, account_id: Optional[str] = None) -> Job:
+        async with self._session_factory() as session:
+            row = (await session.execute(
+                insert(JobModel)
+                .values(queue=queue, kind=kind, payload=payload, status=JOB_PENDING, attempts=0,
+                        max_attempts=max_attempts, run_at=func.now() + (delay or timedelta()), account_id=account_id)
+                .returning(*JobModel.columns_of(Job))
+            )).first()
+            await session.commit()
+            return Job.from_row(row)
+
+    async def find_by_id(self, job_id: str) -> Optional[Job]:
+        # 任务状态变化频繁，不读副本
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            row = (await connection.execute(FIND_JOB, {'job_id': job_id})).first()
+            return Job.from_row(row) if row else None
+
+    async def claim(self, queues: list[str], limit: int, worker: str, visibility_timeout: timedelta) -> list[Job]:
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            rows = await connection.execute(CLAIM_JOBS, {
+                'queues': queues, 'limit': limit, 'worker': worker, 'visibility_timeout': visibility_timeout,
+            })
+            jobs = Job.from_rows(rows)
+            await session.commit()
+            return jobs
+
+    async def extend(self, job_ids: list[PyUUID], worker: str, visibility_timeout: timedelta) -> int:
+        if not job_ids:
+            return 0
+        return await self._execute(EXTEND_JOBS, {
+            'job_ids': job_ids, 'worker': worker, 'visibility_timeout': visibility_timeout,
+        })
+
+    async def complete(self, job_id: PyUUID, worker: str, result: Optional[dict] = None) -> bool:
+        return await self._execute(COMPLETE_JOB, {'job_id': job_id, 'worker': worker, 'job_result': result}) > 0
+
+    async def fail(self, job_id: PyUUID, worker: str, error: str, retry_delay: Optional[timedelta]) -> bool:
+        if retry_delay is None:
+            return await self._execute(FAIL_JOB, {'job_id': job_id, 'worker': worker, 'error': error}) > 0
+        return await self._execute(RETRY_JOB, {
+            'job_id': job_id, 'worker': worker, 'error': error, 'retry_delay': retry_delay,
+        }) > 0
+
+    async def release(self, job_ids: list[PyUUID], worker: str) -> int:
+        if not job_ids:
+            return 0
+        return await self._execute(RELEASE_JOBS, {'job_ids': job_ids, 'worker': worker})
+
+    async def purge(self, older_than: timedelta) -> int:
+        return await self._execute(PURGE_JOBS, {'older_than': older_than})
+
+    @read_only
+    async def stats(self) -> list[dict]:
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            rows = await connection.execute(COUNT_JOBS)
+            return [{'queue': queue, 'status': status, 'count': count} for queue, status, count in rows]
+
+    async def _execute(self, statement, params: dict) -> int:
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            rowcount = (await connection.execute(statement, params)).rowcount
+            await session.commit()
+            return rowcount
+
+
+class JobModel(PgBaseModel):
+    """
+    待执行及执行中的任务共用 run_at：前者为最早可执行时间，后者为租约到期时间
+    领取条件统一为 run_at 已到，失联执行者的任务无需额外扫描即可被重新领取
+    """
+
+    __tablename__ = 'cube_jobs'
+    __table_args__ = (
+        PrimaryKeyConstraint('id', name='pk_job_id'),
+        # 仅索引未结束的任务，完成的任务再多也不影响领取
+        Index('idx_job_claim', 'queue', 'run_at',
+              postgresql_where=literal_column(f"status IN ('{JOB_PENDING}', '{JOB_RUNNING}')")),
+        Index('idx_job_finished_updated', 'updated_at',
+              postgresql_where=literal_column(f"status IN ('{JOB_DONE}', '{JOB_FAILED}')")),
+    )
+
+    queue: Mapped[str] = mapped_column(String(64), nullable=False, comment='队列')
+    kind: Mapped[str] = mapped_column(String(64), nullable=False, comment='任务类型')
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False, comment='参数')
+    status: Mapped[str] = mapped_column(String(16), nullable=False, comment='状态')
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, comment='已领取次数')
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, comment='最大执行次数')
+    run_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False,
+                                             comment='最早可执行时间或租约到期时间')
+    locked_by: Mapped[Optional[str]] = mapped_column(String(128), nullable=True, comment='执行者')
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True, comment='最近一次失败的原因')
+    result: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True, comment='执行结果')
+    account_id: Mapped[Optional[PyUUID]] = mapped_column(UUID, nullable=True, comment='提交任务的账号')
+
+
+_jobs = JobModel.__table__.c
+_job_id = bindparam('job_id', type_=UUID)
+_job_ids = bindparam('job_ids', type_=ARRAY(UUID))
+_held = (_jobs.status == JOB_RUNNING) & (_jobs.locked_by == bindparam('worker'))
+
+FIND_JOB = select(*JobModel.columns_of(Job)).where(_jobs.id == _job_id)
+
+# 行锁被其他执行者持有的任务直接跳过，并发领取互不等待
+_CLAIMABLE = (
+    select(_jobs.id)
+    .where(_jobs.queue == any_(bindparam('queues', type_=ARRAY(String))))
+    .where(_jobs.status.in_((JOB_PENDING, JOB_RUNNING)))
+    .where(_jobs.run_at <= func.now())
+    .order_by(_jobs.run_at)
+    .limit(bindparam('limit'))
+    .with_for_update(skip_locked=True)
+    .cte('claimable')
+)
+
+CLAIM_JOBS = (
+    update(JobModel)
+    .where(_jobs.id == _CLAIMABLE.c.id)
+    .values(status=JOB_RUNNING, attempts=_jobs.attempts + 1, locked_by=bindparam('worker'),
+            run_at=func.now() + bindparam('visibility_timeout', type_=Interval), updated_at=func.now())
+    .returning(*JobModel.columns_of(Job))
+)
+
+EXTEND_JOBS = (
+    update(JobModel)
+    .where(_jobs.id == any_(_job_ids))
+    .where(_held)
+    .values(run_at=func.now() + bindparam('visibility_timeout', type_=Interval))
+)
+
+COMPLETE_JOB = (
+    update(JobModel)
+    .where(_jobs.id == _job_id)
+    .where(_held)
+    .values(status=JOB_DONE, locked_by=None, last_error=None, result=bindparam('job_result', type_=JSONB),
+            updated_at=func.now())
+)
+
+RETRY_JOB = (
+    update(JobModel)
+    .where(_jobs.id == _job_id)
+    .where(_held)
+    .values(status=JOB_PENDING, locked_by=None, last_error=bindparam('error'),
+            run_at=func.now() + bindparam('retry_delay', type_=Interval), updated_at=func.now())
+)
+
+FAIL_JOB = (
+    update(JobModel)
+    .where(_jobs.id == _job_id)
+    .where(_held)
+    .values(status=JOB_FAILED, locked_by=None, last_error=bindparam('error'), updated_at=func.now())
+)
+
+RELEASE_JOBS = (
+    update(JobModel)
+    .where(_jobs.id == any_(_job_ids))
+    .where(_held)
+    .values(status=JOB_PENDING, attempts=_jobs.attempts - 1, locked_by=None, run_at=func.now(),
+            updated_at=func.now())
+)
+
+PURGE_JOBS = (
+    delete(JobModel)
+    .where(_jobs.status.in_((JOB_DONE, JOB_FAILED)))
+    .where(_jobs.updated_at < func.now() - bindparam('older_than', type_=Interval))
+)
+
+COUNT_JOBS = (
+    select(_jobs.queue, _jobs.status, func.count())
+    .group_by(_jobs.queue, _jobs.status)
+    .order_by(_jobs.queue, _jobs.status)
+)
@@ -0,0 +1,60 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from utils.dataclass_tolerant import tolerant_dataclass
+
+# 等待执行，run_at 为最早可执行时间
+JOB_PENDING = 'pending'
+# 执行中，run_at 为租约到期时间，到期未完成视为执行者已失联，可被重新领取
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+# 重试次数用尽
+JOB_FAILED = 'failed'
+
+
+@tolerant_dataclass
+class Job:
+    """
+    后台任务
+
+    Attributes:
+        queue: 队列，不同队列可由不同的执行进程处理
+        kind: 任务类型，决定由哪个处理函数执行
+        payload: 处理函数的参数
+        attempts: 已领取的次数
+        max_attempts: 最大执行次数
+        run_at: 等待时为最早可执行时间，执行中为租约到期时间
+        last_error: 最近一次失败的原因
+        result: 执行结果
+        account_id: 提交任务的账号，系统任务为空
+    """
+
+    id: UUID
+    queue: str
+    kind: str
+    payload: dict
+    status: str
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    last_error: Optional[str]
+    result: Optional[dict]
+    account_id: Optional[UUID]
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,50 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager
+from typing import Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .knowledge_models import KnowledgeCollection
+
+
+class KnowledgeCollectionRepository(ABC):
+    """
+    知识库的归属，向量集合名全局唯一，首个写入的账号成为所有者
+    """
+
+    def __init__(self, session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]):
+        self._session_factory = session_factory
+
+    @abstractmethod
+    async def find_by_name(self, name: str) -> Optional[KnowledgeCollection]:
+        """
+        :param name: 集合名
+        :return: 知识库，不存在时返回 None
+        """
+        pass
+
+    @abstractmethod
+    async def create(self, name: str, account_id: str) -> KnowledgeCollection:
+        """
+        创建知识库，已存在时不修改
+        :param name: 集合名
+        :param account_id: 所有者账号ID
+        :return: 知识库，已存在时为已有的记录，所有者可能不是 account_id
+        """
+        pass
@@ -0,0 +1,67 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from typing import Optional
+
+from sqlalchemy import PrimaryKeyConstraint, Index, String, UUID, select, bindparam
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Mapped, mapped_column
+
+from repositories.data.data_base_pg import PgBaseModel
+from .KnowledgeCollectionRepository import KnowledgeCollectionRepository
+from .knowledge_models import KnowledgeCollection
+
+
+class KnowledgeCollectionRepositoryPostgres(KnowledgeCollectionRepository):
+    # 归属校验不走只读副本，刚创建的知识库在副本追上前也能立即检索
+
+    async def find_by_name(self, name: str) -> Optional[KnowledgeCollection]:
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            row = (await connection.execute(FIND_BY_NAME, {'name': name})).first()
+            return KnowledgeCollection.from_row(row) if row else None
+
+    async def create(self, name: str, account_id: str) -> KnowledgeCollection:
+        async with self._session_factory() as session:
+            # 并发创建时只有一个成功，其余读取已提交的记录
+            row = (await session.execute(
+                insert(KnowledgeCollectionModel)
+                .values(name=name, account_id=account_id)
+                .on_conflict_do_nothing(index_elements=['name'])
+                .returning(*KnowledgeCollectionModel.columns_of(KnowledgeCollection))
+            )).first()
+            if row is None:
+                row = (await session.execute(FIND_BY_NAME, {'name': name})).first()
+            await session.commit()
+            return KnowledgeCollection.from_row(row)
+
+
+class KnowledgeCollectionModel(PgBaseModel):
+    __tablename__ = 'cube_knowledge_collections'
+    __table_args__ = (
+        PrimaryKeyConstraint('id', name='pk_knowledge_collection_id'),
+        Index('uk_knowledge_collection_name', 'name', unique=True),
+        Index('idx_knowledge_collection_account', 'account_id'),
+    )
+
+    name: Mapped[str] = mapped_column(String(64), nullable=False, comment='向量集合名')
+    account_id: Mapped[str] = mapped_column(UUID, nullable=False, comment='所有者账号ID')
+
+
+FIND_BY_NAME = (
+    select(*KnowledgeCollectionModel.columns_of(KnowledgeCollection))
+    .where(KnowledgeCollectionModel.__table__.c.name == bindparam('name'))
+)
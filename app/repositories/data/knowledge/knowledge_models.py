@@ -0,0 +1,32 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from datetime import datetime
+from uuid import UUID
+
+from utils.dataclass_tolerant import tolerant_dataclass
+
+
+@tolerant_dataclass
+class KnowledgeCollection:
+    """
+    知识库（向量集合）的归属
+    """
+
+    id: UUID
+    name: str
+    account_id: UUID
+    created_at: datetime
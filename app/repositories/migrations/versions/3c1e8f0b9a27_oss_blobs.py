@@ -0,0 +1,59 @@
+"""oss blobs
+
+Revision ID: 3c1e8f0b9a27
+Revises: f5a6cb7d836d
+Create Date: 2026-10-16 15:40:12.511842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1e8f0b9a27'
+down_revision: Union[str, None] = 'f5a6cb7d836d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _base_columns() -> list[sa.Column]:
+    return [
+        sa.Column('id', sa.UUID(), server_default=sa.text('uuid_generate_v4()'), nullable=False, comment='主键ID'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='更新时间'),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'cube_oss_blobs',
+        *_base_columns(),
+        sa.Column('content_hash', sa.String(length=64), nullable=False, comment='内容SHA-256'),
+        sa.Column('size', sa.BigInteger(), nullable=False, comment='大小'),
+        sa.Column('ref_count', sa.BigInteger(), nullable=False, comment='引用数'),
+        sa.PrimaryKeyConstraint('id', name='pk_oss_blob_id'),
+    )
+    op.create_index('uk_oss_blob_content_hash', 'cube_oss_blobs', ['content_hash'], unique=True)
+    op.create_index('idx_oss_blob_unreferenced', 'cube_oss_blobs', ['updated_at'],
+                    postgresql_where=sa.text('ref_count <= 0'))
+
+    op.create_table(
+        'cube_oss_keys',
+        *_base_columns(),
+        sa.Column('key', sa.String(length=1024), nullable=False, comment='对象键'),
+        sa.Column('content_hash', sa.String(length=64), nullable=False, comment='内容SHA-256'),
+        sa.Column('size', sa.BigInteger(), nullable=False, comment='大小'),
+        sa.Column('content_type', sa.String(length=255), nullable=True, comment='内容类型'),
+        sa.PrimaryKeyConstraint('id', name='pk_oss_key_id'),
+    )
+    op.create_index('uk_oss_key_key', 'cube_oss_keys', ['key'], unique=True)
+    op.create_index('idx_oss_key_content_hash', 'cube_oss_keys', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_table('cube_oss_keys')
+    op.drop_table('cube_oss_blobs')
@@ -0,0 +1,38 @@
+"""knowledge collections
+
+Revision ID: 4f8c2d1a6b39
+Revises: e3a91f5c7b20
+Create Date: 2026-10-18 09:41:07.215830
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f8c2d1a6b39'
+down_revision: Union[str, None] = 'e3a91f5c7b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'cube_knowledge_collections',
+        sa.Column('id', sa.UUID(), server_default=sa.text('uuid_generate_v7()'), nullable=False, comment='主键ID'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='更新时间'),
+        sa.Column('name', sa.String(length=64), nullable=False, comment='向量集合名'),
+        sa.Column('account_id', sa.UUID(), nullable=False, comment='所有者账号ID'),
+        sa.PrimaryKeyConstraint('id', name='pk_knowledge_collection_id'),
+    )
+    op.create_index('uk_knowledge_collection_name', 'cube_knowledge_collections', ['name'], unique=True)
+    op.create_index('idx_knowledge_collection_account', 'cube_knowledge_collections', ['account_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('cube_knowledge_collections')
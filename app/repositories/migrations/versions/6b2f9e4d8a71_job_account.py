@@ -0,0 +1,33 @@
+"""job account
+
+Revision ID: 6b2f9e4d8a71
+Revises: 9a6d3e7f2c14
+Create Date: 2026-10-19 09:41:26.183054
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b2f9e4d8a71'
+down_revision: Union[str, None] = '9a6d3e7f2c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('cube_jobs', sa.Column('account_id', sa.UUID(), nullable=True, comment='提交任务的账号'))
+    op.drop_index('idx_job_done_updated', table_name='cube_jobs', postgresql_where=sa.text("status = 'done'"))
+    op.create_index('idx_job_finished_updated', 'cube_jobs', ['updated_at'],
+                    postgresql_where=sa.text("status IN ('done', 'failed')"))
+
+
+def downgrade() -> None:
+    op.drop_index('idx_job_finished_updated', table_name='cube_jobs',
+                  postgresql_where=sa.text("status IN ('done', 'failed')"))
+    op.create_index('idx_job_done_updated', 'cube_jobs', ['updated_at'],
+                    postgresql_where=sa.text("status = 'done'"))
+    op.drop_column('cube_jobs', 'account_id')
@@ -0,0 +1,74 @@
+"""conversations
+
+Revision ID: 8d2b6f4e1c53
+Revises: 3c1e8f0b9a27
+Create Date: 2026-10-16 23:40:05.118203
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2b6f4e1c53'
+down_revision: Union[str, None] = '3c1e8f0b9a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _base_columns() -> list[sa.Column]:
+    return [
+        sa.Column('id', sa.UUID(), server_default=sa.text('uuid_generate_v4()'), nullable=False, comment='主键ID'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='更新时间'),
+    ]
+
+
+def _month_start(day: date, months: int = 0) -> date:
+    month = day.year * 12 + day.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'cube_conversations',
+        *_base_columns(),
+        sa.Column('account_id', sa.UUID(), nullable=False, comment='账号ID'),
+        sa.Column('title', sa.String(length=255), nullable=False, comment='标题'),
+        sa.PrimaryKeyConstraint('id', name='pk_conversation_id'),
+    )
+    op.create_index('idx_conversation_account_updated', 'cube_conversations', ['account_id', 'updated_at', 'id'])
+
+    # 按创建时间按月分区，之后的分区由应用在运行时提前创建
+    op.create_table(
+        'cube_messages',
+        *_base_columns(),
+        sa.Column('conversation_id', sa.UUID(), nullable=False, comment='会话ID'),
+        sa.Column('role', sa.String(length=16), nullable=False, comment='角色'),
+        sa.Column('content', sa.Text(), nullable=False, comment='内容'),
+        sa.Column('usage', postgresql.JSONB(), nullable=True, comment='用量'),
+        sa.PrimaryKeyConstraint('id', 'created_at', name='pk_message_id'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    op.create_index('idx_message_conversation_created', 'cube_messages', ['conversation_id', 'created_at', 'id'])
+
+    # 创建当月及之后两个月的分区，保证应用首次启动前即可写入
+    today = datetime.now(timezone.utc).date()
+    for i in range(3):
+        lower, upper = _month_start(today, i), _month_start(today, i + 1)
+        op.execute(
+            f'CREATE TABLE IF NOT EXISTS cube_messages_p{lower:%Y%m} PARTITION OF cube_messages '
+            f"FOR VALUES FROM ('{lower.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+        )
+
+
+def downgrade() -> None:
+    # 删除分区表时一并删除所有分区
+    op.drop_table('cube_messages')
+    op.drop_table('cube_conversations')
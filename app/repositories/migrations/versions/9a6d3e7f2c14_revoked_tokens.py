@@ -0,0 +1,40 @@
+"""revoked tokens
+
+Revision ID: 9a6d3e7f2c14
+Revises: 4f8c2d1a6b39
+Create Date: 2026-10-18 11:26:53.408172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a6d3e7f2c14'
+down_revision: Union[str, None] = '4f8c2d1a6b39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'cube_revoked_tokens',
+        sa.Column('id', sa.UUID(), server_default=sa.text('uuid_generate_v7()'), nullable=False, comment='主键ID'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='更新时间'),
+        sa.Column('token_id', sa.String(length=64), nullable=False, comment='令牌ID或会话ID'),
+        sa.Column('token_type', sa.String(length=16), nullable=False, comment='access | refresh | session'),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False, comment='过期时间'),
+        sa.PrimaryKeyConstraint('id', name='pk_revoked_token_id'),
+    )
+    op.create_index('uk_revoked_token_token_id', 'cube_revoked_tokens', ['token_id'], unique=True)
+    op.create_index('idx_revoked_token_created', 'cube_revoked_tokens', ['created_at'])
+    op.create_index('idx_revoked_token_expires', 'cube_revoked_tokens', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('cube_revoked_tokens')
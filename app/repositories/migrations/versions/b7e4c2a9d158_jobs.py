@@ -0,0 +1,49 @@
+"""jobs
+
+Revision ID: b7e4c2a9d158
+Revises: 8d2b6f4e1c53
+Create Date: 2026-10-17 10:12:44.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4c2a9d158'
+down_revision: Union[str, None] = '8d2b6f4e1c53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'cube_jobs',
+        sa.Column('id', sa.UUID(), server_default=sa.text('uuid_generate_v4()'), nullable=False, comment='主键ID'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='更新时间'),
+        sa.Column('queue', sa.String(length=64), nullable=False, comment='队列'),
+        sa.Column('kind', sa.String(length=64), nullable=False, comment='任务类型'),
+        sa.Column('payload', postgresql.JSONB(), nullable=False, comment='参数'),
+        sa.Column('status', sa.String(length=16), nullable=False, comment='状态'),
+        sa.Column('attempts', sa.Integer(), nullable=False, comment='已领取次数'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, comment='最大执行次数'),
+        sa.Column('run_at', sa.DateTime(timezone=True), nullable=False, comment='最早可执行时间或租约到期时间'),
+        sa.Column('locked_by', sa.String(length=128), nullable=True, comment='执行者'),
+        sa.Column('last_error', sa.Text(), nullable=True, comment='最近一次失败的原因'),
+        sa.Column('result', postgresql.JSONB(), nullable=True, comment='执行结果'),
+        sa.PrimaryKeyConstraint('id', name='pk_job_id'),
+    )
+    op.create_index('idx_job_claim', 'cube_jobs', ['queue', 'run_at'],
+                    postgresql_where=sa.text("status IN ('pending', 'running')"))
+    op.create_index('idx_job_done_updated', 'cube_jobs', ['updated_at'],
+                    postgresql_where=sa.text("status = 'done'"))
+
+
+def downgrade() -> None:
+    op.drop_table('cube_jobs')
@@ -0,0 +1,42 @@
+"""accounts
+
+Revision ID: c81d4b7e2f95
+Revises: 6b2f9e4d8a71
+Create Date: 2026-10-20 10:18:42.905316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81d4b7e2f95'
+down_revision: Union[str, None] = '6b2f9e4d8a71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 早期部署的账号表不由迁移创建，已存在时保持不变
+    if sa.inspect(op.get_bind()).has_table('cube_accounts'):
+        return
+    op.create_table(
+        'cube_accounts',
+        sa.Column('id', sa.UUID(), server_default=sa.text('uuid_generate_v7()'), nullable=False, comment='主键ID'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='更新时间'),
+        sa.Column('name', sa.String(length=128), nullable=False, comment='用户名'),
+        sa.Column('email', sa.String(length=128), nullable=False, comment='邮箱'),
+        sa.Column('password', sa.String(length=128), nullable=False, comment='密码'),
+        sa.PrimaryKeyConstraint('id', name='pk_id'),
+    )
+    op.create_index('idx_email', 'cube_accounts', ['email'])
+
+
+def downgrade() -> None:
+    # 无法区分账号表是否由本迁移创建，降级时保留账号数据
+    pass
@@ -0,0 +1,51 @@
+"""uuid v7
+
+Revision ID: e3a91f5c7b20
+Revises: b7e4c2a9d158
+Create Date: 2026-10-17 14:05:31.662094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a91f5c7b20'
+down_revision: Union[str, None] = 'b7e4c2a9d158'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 主键默认值改为 UUIDv7 的表，分区表的修改会同步到所有分区及之后创建的分区
+# cube_accounts 不由此前的迁移创建，新建的数据库中尚不存在，由 c81d4b7e2f95 创建
+TABLES = [
+    'cube_accounts',
+    'cube_embedding_cache',
+    'cube_oss_blobs',
+    'cube_oss_keys',
+    'cube_conversations',
+    'cube_messages',
+    'cube_jobs',
+]
+
+
+def upgrade() -> None:
+    # 应用写入时自行生成 UUIDv7，数据库默认值仅用于不经过应用的写入
+    # 以随机的 v4 为基础，前48位替换为毫秒时间戳，版本位由 0100 改为 0111
+    op.execute(
+        'CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$ '
+        'SELECT encode(set_bit(set_bit(overlay(uuid_send(gen_random_uuid()) PLACING '
+        "substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3) "
+        "FROM 1 FOR 6), 52, 1), 53, 1), 'hex')::uuid "
+        '$$ LANGUAGE sql VOLATILE'
+    )
+    # 已有数据的主键保持不变，只修改默认值，不重写表
+    for table in TABLES:
+        op.execute(f'ALTER TABLE IF EXISTS {table} ALTER COLUMN id SET DEFAULT uuid_generate_v7()')
+
+
+def downgrade() -> None:
+    # uuid_generate_v4() 依赖 uuid-ossp 扩展，改用内置的 gen_random_uuid()，同为随机 UUIDv4
+    for table in TABLES:
+        op.execute(f'ALTER TABLE IF EXISTS {table} ALTER COLUMN id SET DEFAULT gen_random_uuid()')
+    op.execute('DROP FUNCTION IF EXISTS uuid_generate_v7()')
@@ -0,0 +1,39 @@
+"""embedding cache
+
+Revision ID: f5a6cb7d836d
+Revises: 725e9355cd2c
+Create Date: 2026-10-16 10:12:41.208316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a6cb7d836d'
+down_revision: Union[str, None] = '725e9355cd2c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'cube_embedding_cache',
+        sa.Column('id', sa.UUID(), server_default=sa.text('uuid_generate_v4()'), nullable=False, comment='主键ID'),
+        sa.Column('model', sa.String(length=128), nullable=False, comment='模型标识'),
+        sa.Column('content_hash', sa.String(length=64), nullable=False, comment='内容SHA-256'),
+        sa.Column('embedding', sa.LargeBinary(), nullable=False, comment='向量（float32）'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP(0)'),
+                  nullable=False, comment='更新时间'),
+        sa.PrimaryKeyConstraint('id', name='pk_embedding_cache_id'),
+    )
+    op.create_index('uk_embedding_cache_model_hash', 'cube_embedding_cache', ['model', 'content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uk_embedding_cache_model_hash', table_name='cube_embedding_cache')
+    op.drop_table('cube_embedding_cache')
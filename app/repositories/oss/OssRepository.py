@@ -0,0 +1,103 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from utils.errors.oss_error import OssKeyError
+from .oss_models import OssObject
+
+
+def validate_key(key: str) -> str:
+    """
+    校验对象键，键为 / 分隔的相对路径，不允许 . 与 .. 路径段
+    """
+    if not key or len(key) > 1024 or key.startswith('/') or '\\' in key or '\0' in key:
+        raise OssKeyError()
+    if any(part in ('', '.', '..') for part in key.split('/')):
+        raise OssKeyError()
+    return key
+
+
+class OssRepository(ABC):
+    @abstractmethod
+    async def put_object(self, key: str, stream: AsyncIterable[bytes],
+                         content_type: Optional[str] = None) -> OssObject:
+        """
+        流式写入对象，已存在时覆盖
+        :param key: 对象键
+        :param stream: 内容，逐块读取，不会整体载入内存
+        :param content_type: 内容类型
+        :return: 对象信息
+        """
+        pass
+
+    @abstractmethod
+    async def head_object(self, key: str) -> OssObject:
+        """
+        获取对象信息，不存在时抛出 OssObjectNotFoundError
+        :param key: 对象键
+        """
+        pass
+
+    @abstractmethod
+    def get_object(self, key: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        流式读取对象
+        :param key: 对象键
+        :param offset: 起始位置
+        :param length: 读取长度，None 时读取到末尾
+        :return: 内容块
+        """
+        pass
+
+    @abstractmethod
+    async def delete_object(self, key: str):
+        """
+        删除对象，不存在时忽略
+        :param key: 对象键
+        """
+        pass
+
+    async def put_file(self, key: str, path: str, content_type: Optional[str] = None) -> OssObject:
+        """
+        写入本地文件，写入后本地文件不再保留
+        :param key: 对象键
+        :param path: 本地文件路径
+        :param content_type: 内容类型
+        :return: 对象信息
+        """
+        oss_object = await self.put_object(key, read_file(path), content_type)
+        await asyncio.to_thread(os.remove, path)
+        return oss_object
+
+    async def local_path(self, key: str) -> Optional[str]:
+        """
+        对象在本地文件系统中的路径，用于零拷贝下载，非本地存储返回 None
+        :param key: 对象键
+        """
+        return None
+
+
+async def read_file(path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    """
+    分块读取本地文件
+    """
+    with open(path, 'rb') as f:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
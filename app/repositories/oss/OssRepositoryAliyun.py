@@ -0,0 +1,370 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from utils.errors.oss_error import OssObjectNotFoundError
+from .OssRepository import OssRepository, validate_key
+from .oss_models import OssObject
+
+log = logging.getLogger()
+
+_MIB = 1024 * 1024
+
+
+@dataclass
+class _UploadState:
+    """
+    进行中的分片上传，持有状态文件的锁，同一对象的其他上传不会续传该上传
+    """
+
+    upload_id: str
+    # 已上传的分片 编号 -> MD5
+    uploaded: dict[int, str]
+    path: str
+    fd: int
+
+
+class OssRepositoryAliyun(OssRepository):
+    """
+    阿里云OSS，通过OSS的S3兼容接口访问，也可用于其他S3兼容存储（如测试用的 MinIO、moto）
+    大文件分片并行上传，上传状态持久化到本地，中断后重新上传同一对象时跳过已上传且内容一致的分片
+    大范围读取时分段并行下载，按顺序输出
+    """
+
+    def __init__(self, endpoint: str, bucket: str, access_key_id: str, access_key_secret: str,
+                 region: Optional[str] = None, part_size: int = 8 * _MIB, max_concurrency: int = 4,
+                 state_path: str = 'data/oss-uploads', download_part_size: int = 8 * _MIB,
+                 download_concurrency: int = 4, addressing_style: str = 'virtual'):
+        """
+        :param endpoint: 接口地址，如 https://oss-cn-hangzhou.aliyuncs.com
+        :param bucket: 存储空间
+        :param access_key_id: AccessKey ID
+        :param access_key_secret: AccessKey Secret
+        :param region: 地域，如 oss-cn-hangzhou
+        :param part_size: 分片大小，不超过该大小的对象直接上传，OSS要求除最后一片外不小于100KB
+        :param max_concurrency: 单个对象同时上传的分片数，同时决定上传占用的内存上限 (max_concurrency + 1) * part_size
+        :param state_path: 分片上传状态目录
+        :param download_part_size: 分段下载的大小，不超过两段时直接下载
+        :param download_concurrency: 单个对象同时下载的分段数
+        :param addressing_style: virtual（阿里云OSS）| path（MinIO等本地兼容存储）
+        """
+        self._bucket = bucket
+        self._part_size = part_size
+        self._max_concurrency = max_concurrency
+        self._state_path = state_path
+        self._download_part_size = download_part_size
+        self._download_concurrency = download_concurrency
+        self._client = boto3.client(
+            's3',
+            endpoint_url=endpoint,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=access_key_secret,
+            config=Config(
+                s3={'addressing_style': addressing_style},
+                signature_version='s3v4',
+                # 上传与下载并发时均需足够的连接
+                max_pool_connections=max(max_concurrency, download_concurrency) * 4,
+                retries={'max_attempts': 3, 'mode': 'standard'},
+            ),
+        )
+
+    @staticmethod
+    def _not_found(e: ClientError) -> bool:
+        return e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    async def put_object(self, key: str, stream: AsyncIterable[bytes],
+                         content_type: Optional[str] = None) -> OssObject:
+        validate_key(key)
+        chunks = _rechunk(stream, self._part_size)
+
+        first = await anext(chunks, b'')
+        second = await anext(chunks, None) if len(first) == self._part_size else None
+        if second is None:
+            # 小对象直接上传
+            response = await asyncio.to_thread(
+                self._client.put_object, Bucket=self._bucket, Key=key, Body=first,
+                ContentType=content_type or 'application/octet-stream',
+            )
+            return OssObject(key=key, size=len(first), etag=response['ETag'].strip('"'), content_type=content_type)
+
+        state = await self._resume_or_create(key, content_type)
+        upload_id, uploaded = state.upload_id, state.uploaded
+        parts: dict[int, str] = {}
+        size = 0
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        tasks: list[asyncio.Task] = []
+
+        async def upload_part(number: int, body: bytes):
+            try:
+                etag = uploaded.get(number)
+                if etag is not None and etag == hashlib.md5(body).hexdigest():
+                    # 断点续传：分片已上传且内容一致
+                    parts[number] = etag
+                    return
+                response = await asyncio.to_thread(
+                    self._client.upload_part, Bucket=self._bucket, Key=key, UploadId=upload_id,
+                    PartNumber=number, Body=body,
+                )
+                parts[number] = response['ETag'].strip('"').lower()
+            finally:
+                semaphore.release()
+
+        async def bodies():
+            yield first
+            yield second
+            async for chunk in chunks:
+                yield chunk
+
+        try:
+            number = 0
+            async for body in bodies():
+                number += 1
+                size += len(body)
+                # 并发上传的分片数达到上限时暂停读取，形成背压
+                await semaphore.acquire()
+                tasks.append(asyncio.create_task(upload_part(number, body)))
+                # 尽早发现失败的分片
+                for task in tasks:
+                    if task.done() and task.exception() is not None:
+                        raise task.exception()
+            await asyncio.gather(*tasks)
+
+            response = await asyncio.to_thread(
+                self._client.complete_multipart_upload, Bucket=self._bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={'Parts': [{'PartNumber': n, 'ETag': f'"{parts[n]}"'} for n in sorted(parts)]},
+            )
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            os.close(state.fd)
+            raise
+        except Exception:
+            # 等待已在上传的分片完成，保留分片及上传状态，重新上传时续传
+            await asyncio.gather(*tasks, return_exceptions=True)
+            os.close(state.fd)
+            log.warning('Multipart upload of %s interrupted after %d parts, upload id %s',
+                        key, len(parts), upload_id)
+            raise
+
+        await asyncio.to_thread(_remove, state.path)
+        os.close(state.fd)
+        return OssObject(key=key, size=size, etag=response['ETag'].strip('"'), content_type=content_type)
+
+    def _state_dir(self, key: str) -> str:
+        name = hashlib.sha256(f'{self._bucket}/{key}'.encode('utf8')).hexdigest()
+        return os.path.join(self._state_path, name)
+
+    async def _resume_or_create(self, key: str, content_type: Optional[str]) -> _UploadState:
+        """
+        继续未完成且未被其他上传使用的分片上传，或新建分片上传
+        同一对象可能同时有多个上传，状态按上传ID分别保存，并以文件锁（进程退出时自动释放）标记使用中
+        :return: 上传状态，使用完毕后需关闭 fd
+        """
+        state_dir = self._state_dir(key)
+        for name in await asyncio.to_thread(_list_dir, state_dir):
+            state_file = os.path.join(state_dir, name)
+            fd = await asyncio.to_thread(_lock, state_file)
+            if fd is None:
+                continue
+            state = await asyncio.to_thread(_read_json, state_file)
+            if state and state['part_size'] == self._part_size:
+                try:
+                    uploaded = await asyncio.to_thread(self._list_parts, key, state['upload_id'])
+                    log.info('Resuming multipart upload of %s with %d uploaded parts', key, len(uploaded))
+                    return _UploadState(upload_id=state['upload_id'], uploaded=uploaded, path=state_file, fd=fd)
+                except ClientError as e:
+                    # 上传已完成、已取消或已过期
+                    log.info('Multipart upload %s of %s is gone: %s', state['upload_id'], key, e)
+            if state is not None:
+                await asyncio.to_thread(_remove, state_file)
+            os.close(fd)
+
+        response = await asyncio.to_thread(
+            self._client.create_multipart_upload, Bucket=self._bucket, Key=key,
+            ContentType=content_type or 'application/octet-stream',
+        )
+        upload_id = response['UploadId']
+        # 上传ID可能含文件名不允许的字符
+        state_file = os.path.join(state_dir, f'{hashlib.sha256(upload_id.encode("utf8")).hexdigest()}.json')
+        fd = await asyncio.to_thread(_create_locked, state_file, {
+            'key': key, 'upload_id': upload_id, 'part_size': self._part_size,
+        })
+        return _UploadState(upload_id=upload_id, uploaded={}, path=state_file, fd=fd)
+
+    def _list_parts(self, key: str, upload_id: str) -> dict[int, str]:
+        uploaded = {}
+        paginator = self._client.get_paginator('list_parts')
+        for page in paginator.paginate(Bucket=self._bucket, Key=key, UploadId=upload_id):
+            for part in page.get('Parts', []):
+                # 分片的 ETag 为分片内容的 MD5
+                uploaded[part['PartNumber']] = part['ETag'].strip('"').lower()
+        return uploaded
+
+    async def head_object(self, key: str) -> OssObject:
+        try:
+            response = await asyncio.to_thread(self._client.head_object, Bucket=self._bucket, Key=validate_key(key))
+        except ClientError as e:
+            if self._not_found(e):
+                raise OssObjectNotFoundError()
+            raise
+        return OssObject(
+            key=key,
+            size=response['ContentLength'],
+            etag=response['ETag'].strip('"'),
+            content_type=response.get('ContentType'),
+            last_modified=response['LastModified'].timestamp(),
+        )
+
+    async def get_object(self, key: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        validate_key(key)
+        if length is None:
+            length = (await self.head_object(key)).size - offset
+        if length <= 0:
+            return
+
+        if length <= 2 * self._download_part_size:
+            async for chunk in self._get_stream(key, offset, length):
+                yield chunk
+            return
+
+        # 分段并行下载，最多预取 download_concurrency 段，按顺序输出
+        ranges = [(start, min(self._download_part_size, offset + length - start))
+                  for start in range(offset, offset + length, self._download_part_size)]
+        pending: list[asyncio.Task] = []
+        try:
+            for start, size in ranges:
+                pending.append(asyncio.create_task(self._get_range(key, start, size)))
+                if len(pending) >= self._download_concurrency:
+                    yield await pending.pop(0)
+            while pending:
+                yield await pending.pop(0)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _get_range(self, key: str, start: int, size: int) -> bytes:
+        try:
+            response = await asyncio.to_thread(
+                self._client.get_object, Bucket=self._bucket, Key=key, Range=f'bytes={start}-{start + size - 1}',
+            )
+            return await asyncio.to_thread(response['Body'].read)
+        except ClientError as e:
+            if self._not_found(e):
+                raise OssObjectNotFoundError()
+            raise
+
+    async def _get_stream(self, key: str, start: int, size: int) -> AsyncIterator[bytes]:
+        try:
+            response = await asyncio.to_thread(
+                self._client.get_object, Bucket=self._bucket, Key=key, Range=f'bytes={start}-{start + size - 1}',
+            )
+        except ClientError as e:
+            if self._not_found(e):
+                raise OssObjectNotFoundError()
+            raise
+
+        body = response['Body']
+        try:
+            while chunk := await asyncio.to_thread(body.read, 256 * 1024):
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete_object(self, key: str):
+        await asyncio.to_thread(self._client.delete_object, Bucket=self._bucket, Key=validate_key(key))
+
+
+async def _rechunk(stream: AsyncIterable[bytes], size: int) -> AsyncIterator[bytes]:
+    """
+    将任意大小的块重新切分为固定大小，最后一块可能较小
+    """
+    buffer = bytearray()
+    async for chunk in stream:
+        buffer += chunk
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        # 写入中断的状态文件
+        return {}
+
+
+def _list_dir(path: str) -> list[str]:
+    try:
+        return sorted(name for name in os.listdir(path) if name.endswith('.json'))
+    except FileNotFoundError:
+        return []
+
+
+def _lock(path: str) -> Optional[int]:
+    """
+    以非阻塞方式锁定文件
+    :return: 文件描述符，文件不存在或已被锁定时返回 None
+    """
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _create_locked(path: str, data: dict) -> int:
+    """
+    写入临时文件并在锁定后重命名，其他进程看到文件时已无法锁定
+    :return: 文件描述符
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    os.write(fd, json.dumps(data).encode('utf8'))
+    os.replace(tmp_path, path)
+    return fd
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,160 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from repositories.data.blob.BlobRepository import BlobRepository
+from repositories.data.blob.blob_models import BlobRef
+from utils.errors.oss_error import OssObjectNotFoundError
+from .OssRepository import OssRepository, validate_key
+from .oss_models import OssObject
+
+
+class OssRepositoryDedup(OssRepository):
+    """
+    内容寻址存储，相同内容只保存一份
+    上传时边接收边计算SHA-256并暂存到本地，内容已存在时不再写入底层存储
+    对象键到数据块的映射及数据块引用数保存在数据库，无引用的数据块由 OssBlobCollector 在后台回收
+    """
+
+    def __init__(self, delegate: OssRepository, blob_repository: BlobRepository, spool_path: str,
+                 prefix: str = 'blobs', write_buffer_size: int = 1024 * 1024):
+        """
+        :param delegate: 底层存储
+        :param blob_repository: 引用计数
+        :param spool_path: 上传暂存目录，与本地存储位于同一文件系统时写入无需复制
+        :param prefix: 数据块在底层存储中的键前缀
+        :param write_buffer_size: 暂存时合并小块的缓冲大小
+        """
+        self._delegate = delegate
+        self._blob_repository = blob_repository
+        self._spool_path = spool_path
+        self._prefix = prefix
+        self._write_buffer_size = write_buffer_size
+
+    def blob_key(self, content_hash: str) -> str:
+        return f'{self._prefix}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}'
+
+    async def put_object(self, key: str, stream: AsyncIterable[bytes],
+                         content_type: Optional[str] = None) -> OssObject:
+        validate_key(key)
+        await asyncio.to_thread(os.makedirs, self._spool_path, exist_ok=True)
+        spool_file = os.path.join(self._spool_path, f'{uuid.uuid4().hex}.tmp')
+
+        try:
+            content_hash, size = await self._spool(stream, spool_file)
+            # 先绑定再写入，引用数大于零的数据块不会在写入期间被回收；写入失败时恢复对象键原先的映射
+            previous = await self._blob_repository.find_by_key(key)
+            created = await self._blob_repository.bind(key, content_hash, size, content_type)
+
+            blob_key = self.blob_key(content_hash)
+            # 非新建时通常已写入，仍检查一次，防止首个上传方写入失败
+            if created or not await self._exists(blob_key):
+                try:
+                    await self._delegate.put_file(blob_key, spool_file, content_type)
+                except Exception:
+                    await self._restore(key, previous)
+                    raise
+        finally:
+            await asyncio.to_thread(_remove, spool_file)
+
+        return OssObject(key=key, size=size, etag=content_hash, content_type=content_type,
+                         last_modified=time.time(), content_hash=content_hash)
+
+    async def _restore(self, key: str, previous: Optional[BlobRef]):
+        """
+        恢复对象键在覆盖前的映射，覆盖写入失败时原对象仍然可用
+        :param key: 对象键
+        :param previous: 原先的映射，None 时对象键原本不存在
+        """
+        if previous is None:
+            await self._blob_repository.unbind(key)
+        else:
+            await self._blob_repository.bind(key, previous.content_hash, previous.size, previous.content_type)
+
+    async def _spool(self, stream: AsyncIterable[bytes], path: str) -> tuple[str, int]:
+        """
+        暂存上传内容，同时计算内容HASH
+        :return: (内容HASH, 大小)
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'wb') as f:
+            buffer = bytearray()
+            async for chunk in stream:
+                buffer += chunk
+                size += len(chunk)
+                if len(buffer) >= self._write_buffer_size:
+                    await asyncio.to_thread(_write, f, digest, buffer)
+                    buffer = bytearray()
+            if buffer:
+                await asyncio.to_thread(_write, f, digest, buffer)
+        return digest.hexdigest(), size
+
+    async def _exists(self, blob_key: str) -> bool:
+        try:
+            await self._delegate.head_object(blob_key)
+            return True
+        except OssObjectNotFoundError:
+            return False
+
+    async def head_object(self, key: str) -> OssObject:
+        blob_ref = await self._blob_repository.find_by_key(validate_key(key))
+        if blob_ref is None:
+            raise OssObjectNotFoundError()
+        return OssObject(
+            key=key,
+            size=blob_ref.size,
+            etag=blob_ref.content_hash,
+            content_type=blob_ref.content_type,
+            last_modified=blob_ref.updated_at.timestamp(),
+            content_hash=blob_ref.content_hash,
+        )
+
+    async def get_object(self, key: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        oss_object = await self.head_object(key)
+        async for chunk in self._delegate.get_object(self.blob_key(oss_object.content_hash), offset, length):
+            yield chunk
+
+    async def delete_object(self, key: str):
+        await self._blob_repository.unbind(validate_key(key))
+
+    async def local_path(self, key: str) -> Optional[str]:
+        oss_object = await self.head_object(key)
+        return await self._delegate.local_path(self.blob_key(oss_object.content_hash))
+
+    async def delete_blob(self, content_hash: str):
+        """
+        删除数据块内容，仅由回收调用
+        """
+        await self._delegate.delete_object(self.blob_key(content_hash))
+
+
+def _write(f, digest, buffer: bytearray):
+    digest.update(buffer)
+    f.write(buffer)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
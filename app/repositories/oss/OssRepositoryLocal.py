@@ -0,0 +1,133 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import errno
+import mimetypes
+import os
+import uuid
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from utils.errors.oss_error import OssObjectNotFoundError
+from .OssRepository import OssRepository, validate_key
+from .oss_models import OssObject
+
+
+class OssRepositoryLocal(OssRepository):
+    """
+    本地文件系统存储，对象键即相对于根目录的路径
+    写入先落到同目录的临时文件，完成后原子替换，读取方不会看到写了一半的文件
+    """
+
+    def __init__(self, path: str, write_buffer_size: int = 1024 * 1024, read_chunk_size: int = 256 * 1024):
+        """
+        :param path: 根目录
+        :param write_buffer_size: 写入缓冲大小，上传的小块合并到该大小后再落盘
+        :param read_chunk_size: 流式读取时每块的大小
+        """
+        self._root = os.path.abspath(path)
+        self._write_buffer_size = write_buffer_size
+        self._read_chunk_size = read_chunk_size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._root, *validate_key(key).split('/'))
+
+    async def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+    @staticmethod
+    def _object(key: str, stat_result: os.stat_result) -> OssObject:
+        return OssObject(
+            key=key,
+            size=stat_result.st_size,
+            etag=f'{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}',
+            content_type=mimetypes.guess_type(key)[0] or 'application/octet-stream',
+            last_modified=stat_result.st_mtime,
+        )
+
+    async def put_object(self, key: str, stream: AsyncIterable[bytes],
+                         content_type: Optional[str] = None) -> OssObject:
+        path = self._path(key)
+        directory, name = os.path.split(path)
+        await asyncio.to_thread(os.makedirs, directory, exist_ok=True)
+
+        tmp_path = os.path.join(directory, f'.{name}.{uuid.uuid4().hex}.tmp')
+        f = await asyncio.to_thread(open, tmp_path, 'wb')
+        try:
+            buffer = bytearray()
+            async for chunk in stream:
+                buffer += chunk
+                if len(buffer) >= self._write_buffer_size:
+                    await asyncio.to_thread(f.write, buffer)
+                    buffer = bytearray()
+            if buffer:
+                await asyncio.to_thread(f.write, buffer)
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, tmp_path, path)
+        except BaseException:
+            f.close()
+            await asyncio.to_thread(_remove, tmp_path)
+            raise
+
+        return self._object(key, await asyncio.to_thread(os.stat, path))
+
+    async def put_file(self, key: str, path: str, content_type: Optional[str] = None) -> OssObject:
+        target = self._path(key)
+        await asyncio.to_thread(os.makedirs, os.path.dirname(target), exist_ok=True)
+        try:
+            # 同一文件系统内直接移动，无需复制
+            await asyncio.to_thread(os.replace, path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            return await super().put_file(key, path, content_type)
+        return self._object(key, await asyncio.to_thread(os.stat, target))
+
+    async def head_object(self, key: str) -> OssObject:
+        try:
+            stat_result = await asyncio.to_thread(os.stat, self._path(key))
+        except FileNotFoundError:
+            raise OssObjectNotFoundError()
+        return self._object(key, stat_result)
+
+    async def get_object(self, key: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        try:
+            fd = await asyncio.to_thread(os.open, self._path(key), os.O_RDONLY)
+        except FileNotFoundError:
+            raise OssObjectNotFoundError()
+
+        try:
+            remaining = length if length is not None else os.fstat(fd).st_size - offset
+            while remaining > 0:
+                # pread 不改变文件偏移，无需 seek
+                chunk = await asyncio.to_thread(os.pread, fd, min(self._read_chunk_size, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            os.close(fd)
+
+    async def delete_object(self, key: str):
+        await asyncio.to_thread(_remove, self._path(key))
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
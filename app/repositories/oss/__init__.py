@@ -14,8 +14,10 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+from .OssRepository import OssRepository
 from .oss_repository_container import OssContainer
 
 __all__ = [
     'OssContainer',
+    'OssRepository',
 ]
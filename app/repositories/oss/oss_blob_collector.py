@@ -0,0 +1,88 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from repositories.data.blob.BlobRepository import BlobRepository
+from .OssRepositoryDedup import OssRepositoryDedup
+
+log = logging.getLogger()
+
+
+class OssBlobCollector:
+    """
+    后台回收无引用的数据块
+    多个实例同时运行时通过行锁（SKIP LOCKED）互不重复
+    """
+
+    def __init__(self, oss_repository: OssRepositoryDedup, blob_repository: BlobRepository,
+                 interval: float = 300, grace_seconds: float = 3600, batch_size: int = 100):
+        """
+        :param oss_repository: 内容寻址存储
+        :param blob_repository: 引用计数
+        :param interval: 回收间隔（秒）
+        :param grace_seconds: 引用数归零超过该时间才回收，期间重新上传相同内容可直接复用
+        :param batch_size: 每批回收的数量
+        """
+        self._oss_repository = oss_repository
+        self._blob_repository = blob_repository
+        self._interval = interval
+        self._grace_seconds = grace_seconds
+        self._batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+        self.collected = 0
+
+    async def collect(self) -> int:
+        """
+        回收一轮，直到没有可回收的数据块
+        :return: 回收的数量
+        """
+        total = 0
+        while True:
+            collected = await self._blob_repository.collect_garbage(
+                self._oss_repository.delete_blob, self._grace_seconds, self._batch_size,
+            )
+            total += collected
+            if collected < self._batch_size:
+                break
+        self.collected += total
+        return total
+
+    async def _run(self):
+        while True:
+            try:
+                collected = await self.collect()
+                if collected:
+                    log.info('Collected %d unreferenced blobs', collected)
+            except Exception as e:
+                log.warning('Failed to collect unreferenced blobs: %s', e)
+            await asyncio.sleep(self._interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,35 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from typing import Optional
+
+from utils.dataclass_tolerant import tolerant_dataclass
+
+
+@tolerant_dataclass
+class OssObject:
+    """
+    对象信息
+    """
+
+    key: str
+    size: int
+    etag: str
+    content_type: Optional[str] = None
+    # 最后修改时间（秒级时间戳）
+    last_modified: Optional[float] = None
+    # 内容SHA-256，启用内容寻址存储时提供，下游可据此跳过已处理过的内容
+    content_hash: Optional[str] = None
@@ -16,6 +16,12 @@ limitations under the License.
 
 from dependency_injector import containers, providers
 
+from .OssRepository import OssRepository
+from .OssRepositoryAliyun import OssRepositoryAliyun
+from .OssRepositoryDedup import OssRepositoryDedup
+from .OssRepositoryLocal import OssRepositoryLocal
+from .oss_blob_collector import OssBlobCollector
+
 
 class OssContainer(containers.DeclarativeContainer):
     """
@@ -23,3 +29,56 @@ class OssContainer(containers.DeclarativeContainer):
     """
 
     config = providers.Configuration()
+
+    data_container = providers.DependenciesContainer()
+
+    # 对象存储
+    _oss_repository: OssRepository = providers.Selector(
+        config.repository.oss.type,
+        local=providers.Singleton(
+            OssRepositoryLocal,
+            path=config.repository.oss.local.path,
+            write_buffer_size=config.repository.oss.local.write_buffer_size,
+            read_chunk_size=config.repository.oss.local.read_chunk_size,
+        ),
+        aliyun=providers.Singleton(
+            OssRepositoryAliyun,
+            endpoint=config.repository.oss.aliyun.endpoint,
+            region=config.repository.oss.aliyun.region,
+            bucket=config.repository.oss.aliyun.bucket,
+            access_key_id=config.repository.oss.aliyun.access_key_id,
+            access_key_secret=config.repository.oss.aliyun.access_key_secret,
+            addressing_style=config.repository.oss.aliyun.addressing_style,
+            part_size=config.repository.oss.aliyun.multipart.part_size,
+            max_concurrency=config.repository.oss.aliyun.multipart.max_concurrency,
+            state_path=config.repository.oss.aliyun.multipart.state_path,
+            download_part_size=config.repository.oss.aliyun.download.part_size,
+            download_concurrency=config.repository.oss.aliyun.download.max_concurrency,
+        ),
+    )
+
+    # 内容寻址存储，相同内容只保存一份
+    oss_repository: OssRepository = providers.Selector(
+        config.repository.oss.dedup.type,
+        none=_oss_repository,
+        postgres=providers.Singleton(
+            OssRepositoryDedup,
+            delegate=_oss_repository,
+            blob_repository=data_container.blob_repository,
+            spool_path=config.repository.oss.dedup.spool_path,
+        ),
+    )
+
+    # 无引用数据块回收
+    blob_collector: OssBlobCollector = providers.Selector(
+        config.repository.oss.dedup.type,
+        none=providers.Object(None),
+        postgres=providers.Singleton(
+            OssBlobCollector,
+            oss_repository=oss_repository,
+            blob_repository=data_container.blob_repository,
+            interval=config.repository.oss.dedup.gc.interval,
+            grace_seconds=config.repository.oss.dedup.gc.grace_seconds,
+            batch_size=config.repository.oss.dedup.gc.batch_size,
+        ),
+    )
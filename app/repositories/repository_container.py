@@ -36,10 +36,12 @@ class RepositoryContainer(containers.DeclarativeContainer):
     oss_container: oss.OssContainer = providers.Container(
         oss.OssContainer,
         config=config,
+        data_container=data_container,
     )
 
     # vector
     vector_container: vector.VectorContainer = providers.Container(
         vector.VectorContainer,
         config=config,
+        data_container=data_container,
     )
@@ -0,0 +1,166 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import inspect
+import re
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional, Union
+
+from .vector_fusion import reciprocal_rank_fusion
+from .vector_models import VectorDocument, VectorSearchResult
+
+_COLLECTION_PATTERN = re.compile(r'[a-z][a-z0-9_]{0,47}')
+
+# 重排：(查询文本, 候选) -> 重新排序后的结果
+Reranker = Callable[[str, list[VectorSearchResult]], Awaitable[list[VectorSearchResult]]]
+
+
+def validate_collection(collection: str) -> str:
+    """
+    校验集合名，集合名会用于表名或目录名
+    """
+    if not _COLLECTION_PATTERN.fullmatch(collection):
+        raise ValueError(f'Invalid vector collection name: {collection}')
+    return collection
+
+
+class VectorRepository(ABC):
+    @abstractmethod
+    async def create_collection(self, collection: str, dimension: int):
+        """
+        创建集合及索引，已存在时忽略
+        :param collection: 集合名
+        :param dimension: 向量维度
+        """
+        pass
+
+    @abstractmethod
+    async def drop_collection(self, collection: str):
+        """
+        删除集合
+        :param collection: 集合名
+        """
+        pass
+
+    @abstractmethod
+    async def upsert(self, collection: str, documents: list[VectorDocument]):
+        """
+        批量写入，ID已存在时覆盖
+        :param collection: 集合名
+        :param documents: 文档
+        """
+        pass
+
+    @abstractmethod
+    async def delete(self, collection: str, ids: list[str]):
+        """
+        批量删除
+        :param collection: 集合名
+        :param ids: 文档ID
+        """
+        pass
+
+    @abstractmethod
+    async def delete_by_metadata(self, collection: str, filters: dict) -> int:
+        """
+        删除元数据包含所有给定键值的文档，集合不存在时忽略
+        :param collection: 集合名
+        :param filters: 元数据过滤
+        :return: 删除的数量
+        """
+        pass
+
+    @abstractmethod
+    async def search(self, collection: str, embedding: list[float], top_k: int = 10,
+                     filters: Optional[dict] = None, **options) -> list[VectorSearchResult]:
+        """
+        相似度检索
+        :param collection: 集合名
+        :param embedding: 查询向量
+        :param top_k: 返回数量
+        :param filters: 元数据过滤，要求元数据包含所有给定的键值
+        :param options: 各实现的检索参数，如 ef_search
+        :return: 按相似度降序排列的结果
+        """
+        pass
+
+    async def search_batch(self, collection: str, embeddings: list[list[float]], top_k: int = 10,
+                           filters: Optional[dict] = None, **options) -> list[list[VectorSearchResult]]:
+        """
+        批量相似度检索，默认逐条检索，实现可覆盖为一次性计算
+        :param collection: 集合名
+        :param embeddings: 查询向量
+        :param top_k: 每个查询的返回数量
+        :param filters: 元数据过滤
+        :return: 与查询向量一一对应的结果
+        """
+        return [await self.search(collection, embedding, top_k, filters, **options) for embedding in embeddings]
+
+    @abstractmethod
+    async def lexical_search(self, collection: str, query: str, top_k: int = 10,
+                             filters: Optional[dict] = None) -> list[VectorSearchResult]:
+        """
+        全文检索，弥补向量检索对专有名词、编号、代码标识等精确词项不敏感的问题
+        :param collection: 集合名
+        :param query: 查询文本
+        :param top_k: 返回数量
+        :param filters: 元数据过滤，要求元数据包含所有给定的键值
+        :return: 按相关度降序排列的结果，得分的量纲由实现决定
+        """
+        pass
+
+    async def hybrid_search(self, collection: str, query: str,
+                            embedding: Union[list[float], Awaitable[list[float]]], top_k: int = 10,
+                            filters: Optional[dict] = None, candidates: Optional[int] = None,
+                            rrf_k: int = 60, weights: Optional[tuple[float, float]] = None,
+                            rerank: Optional[Reranker] = None, rerank_candidates: Optional[int] = None,
+                            **options) -> list[VectorSearchResult]:
+        """
+        混合检索，全文检索与向量检索并发执行，耗时取决于较慢的一路，结果按倒数排名融合
+        :param collection: 集合名
+        :param query: 查询文本
+        :param embedding: 查询向量，也可传入生成向量的协程，全文检索无需等待向量生成
+        :param top_k: 返回数量
+        :param filters: 元数据过滤
+        :param candidates: 每一路的候选数，默认 top_k * 4
+        :param rrf_k: 倒数排名融合的平滑常数
+        :param weights: (向量检索, 全文检索) 的融合权重，默认相同
+        :param rerank: 重排，融合后的候选交由其重新排序
+        :param rerank_candidates: 交给重排的候选数，重排代价高时先截断，默认 top_k * 2
+        :param options: 向量检索参数，如 ef_search
+        :return: 融合（或重排）后的结果，未重排时 score 为融合得分
+        """
+        candidates = max(candidates or top_k * 4, top_k)
+
+        async def vector_leg() -> list[VectorSearchResult]:
+            vector = await embedding if inspect.isawaitable(embedding) else embedding
+            return await self.search(collection, vector, candidates, filters, **options)
+
+        # 等待两路都结束再抛出异常，不遗留仍在执行的检索
+        vector_hits, lexical_hits = await asyncio.gather(
+            vector_leg(),
+            self.lexical_search(collection, query, candidates, filters),
+            return_exceptions=True,
+        )
+        for hits in (vector_hits, lexical_hits):
+            if isinstance(hits, BaseException):
+                raise hits
+
+        fused = reciprocal_rank_fusion([vector_hits, lexical_hits], k=rrf_k, weights=weights)
+        if rerank is not None and fused:
+            fused = await rerank(query, fused[:max(rerank_candidates or top_k * 2, top_k)])
+        return fused[:top_k]
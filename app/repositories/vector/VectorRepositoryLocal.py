@@ -0,0 +1,159 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import os
+import shutil
+from typing import Optional
+
+import numpy as np
+
+from .VectorRepository import VectorRepository, validate_collection
+from .vector_index_local import LocalVectorIndex
+from .vector_models import VectorDocument, VectorSearchResult
+
+
+class VectorRepositoryLocal(VectorRepository):
+    """
+    进程内的向量仓储，适用于单机部署及开发环境，每个集合一个目录
+    计算在线程中执行，不阻塞事件循环
+    """
+
+    def __init__(self, path: str, distance: str = 'cosine', ivf_threshold: int = 50000, nprobe: int = 8,
+                 quantization: str = 'none', pq_m: int = 0, rerank_factor: int = 4):
+        """
+        :param path: 数据目录
+        :param distance: 距离 cosine | l2 | ip
+        :param ivf_threshold: 向量数超过该值时使用IVF分区检索
+        :param nprobe: 默认的IVF检索分区数
+        :param quantization: 量化编码 none | int8 | pq
+        :param pq_m: PQ子空间数，0 时每4维一个子空间
+        :param rerank_factor: 量化检索时精确重排 top_k * rerank_factor 个候选
+        """
+        self._path = path
+        self._distance = distance
+        self._ivf_threshold = ivf_threshold
+        self._nprobe = nprobe
+        self._quantization = quantization
+        self._pq_m = pq_m
+        self._rerank_factor = rerank_factor
+        self._indexes: dict[str, LocalVectorIndex] = {}
+        self._lock = asyncio.Lock()
+
+    def _collection_path(self, collection: str) -> str:
+        return os.path.join(self._path, validate_collection(collection))
+
+    def _open(self, collection: str, dimension: Optional[int] = None) -> LocalVectorIndex:
+        return LocalVectorIndex(
+            self._collection_path(collection),
+            dimension=dimension,
+            distance=self._distance,
+            ivf_threshold=self._ivf_threshold,
+            nprobe=self._nprobe,
+            quantization=self._quantization,
+            pq_m=self._pq_m,
+            rerank_factor=self._rerank_factor,
+        )
+
+    async def _index(self, collection: str) -> LocalVectorIndex:
+        index = self._indexes.get(collection)
+        if index is None:
+            async with self._lock:
+                index = self._indexes.get(collection)
+                if index is None:
+                    index = await asyncio.to_thread(self._open, collection)
+                    self._indexes[collection] = index
+        return index
+
+    async def create_collection(self, collection: str, dimension: int):
+        async with self._lock:
+            if collection not in self._indexes:
+                self._indexes[collection] = await asyncio.to_thread(self._open, collection, dimension)
+
+    async def drop_collection(self, collection: str):
+        path = self._collection_path(collection)
+        async with self._lock:
+            index = self._indexes.pop(collection, None)
+            if index is not None:
+                index.close()
+            await asyncio.to_thread(shutil.rmtree, path, True)
+
+    async def upsert(self, collection: str, documents: list[VectorDocument]):
+        if not documents:
+            return
+
+        index = await self._index(collection)
+        await asyncio.to_thread(
+            index.upsert,
+            [document.id for document in documents],
+            [document.content for document in documents],
+            [document.metadata for document in documents],
+            np.asarray([document.embedding for document in documents], dtype=np.float32),
+        )
+
+    async def delete(self, collection: str, ids: list[str]):
+        if not ids:
+            return
+
+        index = await self._index(collection)
+        await asyncio.to_thread(index.delete, ids)
+
+    async def delete_by_metadata(self, collection: str, filters: dict) -> int:
+        if collection not in self._indexes and not os.path.isdir(self._collection_path(collection)):
+            return 0
+
+        index = await self._index(collection)
+        return await asyncio.to_thread(index.delete_by_metadata, filters)
+
+    async def search(self, collection: str, embedding: list[float], top_k: int = 10,
+                     filters: Optional[dict] = None, **options) -> list[VectorSearchResult]:
+        return (await self.search_batch(collection, [embedding], top_k, filters, **options))[0]
+
+    async def search_batch(self, collection: str, embeddings: list[list[float]], top_k: int = 10,
+                           filters: Optional[dict] = None, nprobe: Optional[int] = None,
+                           **options) -> list[list[VectorSearchResult]]:
+        """
+        :param nprobe: IVF检索的分区数，越大召回越高、耗时越长
+        """
+        if not embeddings:
+            return []
+
+        index = await self._index(collection)
+        hits = await asyncio.to_thread(
+            index.search, np.asarray(embeddings, dtype=np.float32), top_k, filters, nprobe,
+        )
+        return [
+            [VectorSearchResult(id=doc_id, content=content, metadata=metadata, score=score)
+             for doc_id, content, metadata, score in query_hits]
+            for query_hits in hits
+        ]
+
+    async def lexical_search(self, collection: str, query: str, top_k: int = 10,
+                             filters: Optional[dict] = None) -> list[VectorSearchResult]:
+        """
+        基于内存倒排索引的全文检索，score 为 BM25 得分
+        """
+        index = await self._index(collection)
+        hits = await asyncio.to_thread(index.lexical_search, query, top_k, filters)
+        return [
+            VectorSearchResult(id=doc_id, content=content, metadata=metadata, score=score)
+            for doc_id, content, metadata, score in hits
+        ]
+
+    def close(self):
+        for index in self._indexes.values():
+            index.close()
+        self._indexes.clear()
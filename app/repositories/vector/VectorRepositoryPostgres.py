@@ -0,0 +1,281 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import json
+import re
+from contextlib import AbstractAsyncContextManager
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repositories.data.data_base_pg import read_only
+from .VectorRepository import VectorRepository, validate_collection
+from .vector_models import VectorDocument, VectorSearchResult
+
+# 距离 -> (操作符, 索引操作符类, 距离转换为相似度)
+_DISTANCES = {
+    'cosine': ('<=>', 'vector_cosine_ops', '1 - ({})'),
+    'l2': ('<->', 'vector_l2_ops', '-({})'),
+    'ip': ('<#>', 'vector_ip_ops', '-({})'),
+}
+
+# 标识符的最大长度（字节），超出部分被截断
+_MAX_IDENTIFIER_LENGTH = 63
+
+# 全文检索配置名会写入生成列定义，无法参数化
+_TEXT_SEARCH_CONFIG_PATTERN = re.compile(r'[a-z_][a-z0-9_]*(\.[a-z_][a-z0-9_]*)?')
+
+# 查询语法 -> 查询表达式
+_QUERY_EXPRESSIONS = {
+    # 包含任一词项即匹配，由 ts_rank_cd 按命中词项的多少及紧密程度排序，适合自然语言查询
+    'any': "CAST(replace(CAST(plainto_tsquery(CAST(:config AS regconfig), :query) AS text), ' & ', ' | ') AS tsquery)",
+    'websearch': 'websearch_to_tsquery(CAST(:config AS regconfig), :query)',
+    'plain': 'plainto_tsquery(CAST(:config AS regconfig), :query)',
+}
+
+
+def _vector_literal(embedding: list[float]) -> str:
+    return '[' + ','.join(map(str, embedding)) + ']'
+
+
+class VectorRepositoryPostgres(VectorRepository):
+    """
+    基于 pgvector 的向量仓储，每个集合一张表
+    """
+
+    def __init__(self, session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+                 distance: str = 'cosine', index_type: str = 'hnsw',
+                 hnsw_m: int = 16, hnsw_ef_construction: int = 64, ivfflat_lists: int = 100,
+                 ef_search: int = 40, probes: int = 10, batch_size: int = 500,
+                 text_search_config: str = 'simple', query_syntax: str = 'any'):
+        """
+        :param session_factory: 异步会话
+        :param distance: 距离 cosine | l2 | ip
+        :param index_type: 索引 hnsw | ivfflat
+        :param hnsw_m: HNSW每个节点的最大连接数
+        :param hnsw_ef_construction: HNSW构建时的候选列表大小
+        :param ivfflat_lists: IVFFlat聚类数
+        :param ef_search: 默认的HNSW检索候选列表大小
+        :param probes: 默认的IVFFlat检索聚类数
+        :param batch_size: 批量写入时每条INSERT语句的行数
+        :param text_search_config: 全文检索配置，simple 不做词干提取，适合标识符、编号等精确词项
+        :param query_syntax: 全文检索查询语法 any（任一词项）| websearch（支持引号、OR、-排除）| plain（全部词项）
+        """
+        if distance not in _DISTANCES:
+            raise ValueError(f'Unknown vector distance: {distance}')
+        if index_type not in ('hnsw', 'ivfflat'):
+            raise ValueError(f'Unknown vector index type: {index_type}')
+        if not _TEXT_SEARCH_CONFIG_PATTERN.fullmatch(text_search_config):
+            raise ValueError(f'Invalid text search config: {text_search_config}')
+        if query_syntax not in _QUERY_EXPRESSIONS:
+            raise ValueError(f'Unknown text search query syntax: {query_syntax}')
+
+        self._session_factory = session_factory
+        self._distance = distance
+        self._index_type = index_type
+        self._hnsw_m = hnsw_m
+        self._hnsw_ef_construction = hnsw_ef_construction
+        self._ivfflat_lists = ivfflat_lists
+        self._ef_search = ef_search
+        self._probes = probes
+        self._batch_size = batch_size
+        self._text_search_config = text_search_config
+        self._query_expression = _QUERY_EXPRESSIONS[query_syntax]
+
+    @staticmethod
+    def _table(collection: str) -> str:
+        # 表名无法参数化，仅允许安全的集合名
+        return f'cube_vectors_{validate_collection(collection)}'
+
+    @staticmethod
+    def _index_name(table: str, suffix: str) -> str:
+        # 标识符超出长度限制时会被截断，长集合名的各索引截断后同名，改为截短表名并附加表名HASH
+        name = f'idx_{table}_{suffix}'
+        if len(name) <= _MAX_IDENTIFIER_LENGTH:
+            return name
+        digest = hashlib.sha1(table.encode()).hexdigest()[:8]
+        return f'idx_{table[:_MAX_IDENTIFIER_LENGTH - len(suffix) - 14]}_{digest}_{suffix}'
+
+    async def create_collection(self, collection: str, dimension: int):
+        table = self._table(collection)
+        async with self._session_factory() as session:
+            # 先查询表结构，只执行缺少的DDL；DDL即使带 IF NOT EXISTS 也会锁表，阻塞并发的检索及写入
+            columns = set((await session.execute(TABLE_COLUMNS, {'table': table})).scalars())
+            indexes = set((await session.execute(TABLE_INDEXES, {'table': table})).scalars())
+            for statement in self._collection_ddl(table, dimension, columns, indexes):
+                await session.execute(text(statement))
+            await session.commit()
+
+    def _collection_ddl(self, table: str, dimension: int, columns: set[str], indexes: set[str]) -> list[str]:
+        """
+        集合缺少的表、列及索引的DDL
+        :param table: 表名
+        :param dimension: 向量维度
+        :param columns: 已有的列
+        :param indexes: 已有的索引
+        """
+        # 全文检索使用生成列，写入时计算
+        content_tsv = f"content_tsv tsvector GENERATED ALWAYS AS " \
+                      f"(to_tsvector('{self._text_search_config}'::regconfig, content)) STORED"
+        statements = []
+        if not columns:
+            statements.append('CREATE EXTENSION IF NOT EXISTS vector')
+            statements.append(
+                f'CREATE TABLE IF NOT EXISTS {table} ('
+                f'id TEXT PRIMARY KEY, '
+                f'content TEXT NOT NULL, '
+                f"metadata JSONB NOT NULL DEFAULT '{{}}', "
+                f'embedding vector({int(dimension)}) NOT NULL, '
+                f'created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP(0), '
+                f'{content_tsv})'
+            )
+        elif 'content_tsv' not in columns:
+            # 早于全文检索创建的集合补齐生成列，仅执行一次，会重写整表
+            statements.append(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {content_tsv}')
+
+        _, ops, _ = _DISTANCES[self._distance]
+        if self._index_type == 'hnsw':
+            embedding_index = f'USING hnsw (embedding {ops}) WITH (m = {int(self._hnsw_m)}, ' \
+                              f'ef_construction = {int(self._hnsw_ef_construction)})'
+        else:
+            embedding_index = f'USING ivfflat (embedding {ops}) WITH (lists = {int(self._ivfflat_lists)})'
+        for suffix, definition in (
+                ('embedding', embedding_index),
+                # 元数据过滤使用 @> 包含查询
+                ('metadata', 'USING gin (metadata jsonb_path_ops)'),
+                ('content_tsv', 'USING gin (content_tsv)'),
+        ):
+            index = self._index_name(table, suffix)
+            # 长集合名按旧的命名截断后只建成了首个（向量）索引，已存在时不再重复创建
+            legacy = f'idx_{table}_{suffix}'[:_MAX_IDENTIFIER_LENGTH] if suffix == 'embedding' else None
+            if index not in indexes and legacy not in indexes:
+                statements.append(f'CREATE INDEX IF NOT EXISTS {index} ON {table} {definition}')
+        return statements
+
+    async def drop_collection(self, collection: str):
+        async with self._session_factory() as session:
+            await session.execute(text(f'DROP TABLE IF EXISTS {self._table(collection)}'))
+            await session.commit()
+
+    async def upsert(self, collection: str, documents: list[VectorDocument]):
+        if not documents:
+            return
+
+        table = self._table(collection)
+        async with self._session_factory() as session:
+            for start in range(0, len(documents), self._batch_size):
+                batch = documents[start:start + self._batch_size]
+
+                # 多行INSERT，一批只需一次往返
+                values, params = [], {}
+                for i, document in enumerate(batch):
+                    values.append(f'(:id_{i}, :content_{i}, CAST(:metadata_{i} AS jsonb), CAST(:embedding_{i} AS vector))')
+                    params[f'id_{i}'] = document.id
+                    params[f'content_{i}'] = document.content
+                    params[f'metadata_{i}'] = json.dumps(document.metadata or {}, ensure_ascii=False)
+                    params[f'embedding_{i}'] = _vector_literal(document.embedding)
+
+                await session.execute(text(
+                    f'INSERT INTO {table} (id, content, metadata, embedding) VALUES {", ".join(values)} '
+                    f'ON CONFLICT (id) DO UPDATE SET '
+                    f'content = EXCLUDED.content, metadata = EXCLUDED.metadata, embedding = EXCLUDED.embedding'
+                ), params)
+            await session.commit()
+
+    async def delete(self, collection: str, ids: list[str]):
+        if not ids:
+            return
+
+        async with self._session_factory() as session:
+            await session.execute(text(f'DELETE FROM {self._table(collection)} WHERE id = ANY(:ids)'), {'ids': ids})
+            await session.commit()
+
+    async def delete_by_metadata(self, collection: str, filters: dict) -> int:
+        table = self._table(collection)
+        async with self._session_factory() as session:
+            if (await session.execute(text('SELECT to_regclass(:table)'), {'table': table})).scalar() is None:
+                return 0
+            result = await session.execute(
+                text(f'DELETE FROM {table} WHERE metadata @> CAST(:filters AS jsonb)'),
+                {'filters': json.dumps(filters, ensure_ascii=False)},
+            )
+            await session.commit()
+            return result.rowcount
+
+    @read_only
+    async def search(self, collection: str, embedding: list[float], top_k: int = 10,
+                     filters: Optional[dict] = None, ef_search: Optional[int] = None,
+                     probes: Optional[int] = None, **options) -> list[VectorSearchResult]:
+        """
+        :param ef_search: HNSW检索候选列表大小，越大召回越高、耗时越长，需不小于 top_k
+        :param probes: IVFFlat检索的聚类数
+        """
+        table = self._table(collection)
+        operator, _, score = _DISTANCES[self._distance]
+
+        where, params = '', {'embedding': _vector_literal(embedding), 'top_k': top_k}
+        if filters:
+            where = 'WHERE metadata @> CAST(:filters AS jsonb)'
+            params['filters'] = json.dumps(filters, ensure_ascii=False)
+
+        async with self._session_factory() as session:
+            # 检索参数仅在当前事务内生效
+            if self._index_type == 'hnsw':
+                # pgvector 限制 ef_search 不超过1000
+                ef_search = min(max(ef_search or self._ef_search, top_k), 1000)
+                await session.execute(text(f'SET LOCAL hnsw.ef_search = {int(ef_search)}'))
+            else:
+                await session.execute(text(f'SET LOCAL ivfflat.probes = {int(probes or self._probes)}'))
+
+            distance = f'embedding {operator} CAST(:embedding AS vector)'
+            rows = await session.execute(text(
+                f'SELECT id, content, metadata, {score.format(distance)} AS score FROM {table} {where} '
+                f'ORDER BY {distance} LIMIT :top_k'
+            ), params)
+            return VectorSearchResult.from_rows(rows)
+
+    @read_only
+    async def lexical_search(self, collection: str, query: str, top_k: int = 10,
+                             filters: Optional[dict] = None) -> list[VectorSearchResult]:
+        """
+        基于 tsvector / GIN 索引的全文检索，score 为 ts_rank_cd
+        """
+        table = self._table(collection)
+
+        where = 'content_tsv @@ query'
+        params = {'config': self._text_search_config, 'query': query, 'top_k': top_k}
+        if filters:
+            where += ' AND metadata @> CAST(:filters AS jsonb)'
+            params['filters'] = json.dumps(filters, ensure_ascii=False)
+
+        async with self._session_factory() as session:
+            rows = await session.execute(text(
+                f'SELECT id, content, metadata, ts_rank_cd(content_tsv, query) AS score '
+                f'FROM {table}, {self._query_expression} query '
+                f'WHERE {where} ORDER BY score DESC LIMIT :top_k'
+            ), params)
+            return VectorSearchResult.from_rows(rows)
+
+TABLE_COLUMNS = text(
+    'SELECT column_name FROM information_schema.columns '
+    'WHERE table_schema = current_schema() AND table_name = :table'
+)
+
+TABLE_INDEXES = text(
+    'SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table'
+)
@@ -14,8 +14,10 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+from .VectorRepository import VectorRepository
 from .vector_repository_container import VectorContainer
 
 __all__ = [
     'VectorContainer',
+    'VectorRepository',
 ]
@@ -0,0 +1,53 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from typing import Optional, Sequence
+
+from .vector_models import VectorSearchResult
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[list[VectorSearchResult]], k: int = 60,
+                           weights: Optional[Sequence[float]] = None) -> list[VectorSearchResult]:
+    """
+    倒数排名融合（RRF），文档得分为各路结果中 weight / (k + 排名) 之和
+    只使用排名，不依赖各路得分的量纲，向量相似度与全文检索得分无需归一化即可合并
+    :param result_lists: 各路检索结果，每路按相关度降序排列
+    :param k: 平滑常数，越大排名靠后的结果影响越大
+    :param weights: 各路权重，None 时权重相同
+    :return: 按融合得分降序排列的结果，score 为融合得分
+    """
+    if weights is None:
+        weights = [1.0] * len(result_lists)
+    if len(weights) != len(result_lists):
+        raise ValueError('The number of weights must match the number of result lists')
+
+    scores: dict[str, float] = {}
+    documents: dict[str, VectorSearchResult] = {}
+    for results, weight in zip(result_lists, weights):
+        for rank, result in enumerate(results, start=1):
+            scores[result.id] = scores.get(result.id, 0.0) + weight / (k + rank)
+            documents.setdefault(result.id, result)
+
+    # 稳定排序，得分相同时保持先出现的顺序
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [
+        VectorSearchResult(
+            id=doc_id,
+            content=documents[doc_id].content,
+            metadata=documents[doc_id].metadata,
+            score=score,
+        )
+        for doc_id, score in ranked
+    ]
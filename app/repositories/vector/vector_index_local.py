@@ -0,0 +1,604 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+
+from .vector_quantization import VectorQuantizer, create_quantizer
+
+log = logging.getLogger()
+
+_META = 'meta.json'
+_VECTORS = 'vectors.f32'
+_ASSIGNMENTS = 'assignments.i32'
+_CENTROIDS = 'centroids.npy'
+_CODES = 'codes.u8'
+_QUANTIZER = 'quantizer.npz'
+_DOCS = 'docs.jsonl'
+
+# 分批计算时每批的行数，控制临时矩阵的内存
+_CHUNK_ROWS = 65536
+
+# 向量数达到该值后训练量化编码
+_QUANTIZER_MIN_TRAIN = 1024
+# 量化编码训练的最大样本数
+_QUANTIZER_MAX_SAMPLES = 65536
+
+# 全文检索分词：中日文逐字切分，其余按单词（含下划线，保留代码标识符）切分
+_TOKEN_PATTERN = re.compile(r'[\u3040-\u30ff\u4e00-\u9fff]|[^\W\u3040-\u30ff\u4e00-\u9fff]+')
+# BM25 参数
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def _tokenize(content: Optional[str]) -> list[str]:
+    return _TOKEN_PATTERN.findall(content.lower()) if content else []
+
+
+def _match(metadata: Optional[dict], filters: dict) -> bool:
+    metadata = metadata or {}
+    return all(metadata.get(key) == value for key, value in filters.items())
+
+
+class LocalVectorIndex:
+    """
+    进程内向量索引
+    向量保存在内存映射文件中，重启后按需分页加载；文档信息以追加日志的方式持久化
+    向量数较少时暴力检索，超过阈值后训练IVF分区，仅检索最近的若干分区
+    启用量化时在常驻内存的压缩编码上筛选候选，再读取原始向量精确重排
+    """
+
+    def __init__(self, path: str, dimension: Optional[int] = None, distance: str = 'cosine',
+                 ivf_threshold: int = 50000, nprobe: int = 8,
+                 quantization: str = 'none', pq_m: int = 0, rerank_factor: int = 4):
+        """
+        :param path: 集合目录
+        :param dimension: 向量维度，新建集合时必填
+        :param distance: 距离 cosine | l2 | ip
+        :param ivf_threshold: 向量数超过该值时使用IVF分区
+        :param nprobe: IVF检索的分区数
+        :param quantization: 量化编码 none | int8 | pq
+        :param pq_m: PQ子空间数，0 时每4维一个子空间
+        :param rerank_factor: 量化检索时精确重排 top_k * rerank_factor 个候选
+        """
+        if distance not in ('cosine', 'l2', 'ip'):
+            raise ValueError(f'Unknown vector distance: {distance}')
+
+        self._path = path
+        self._ivf_threshold = ivf_threshold
+        self._nprobe = nprobe
+        self._quantization = quantization
+        self._pq_m = pq_m
+        self._rerank_factor = max(rerank_factor, 1)
+        self._lock = threading.RLock()
+
+        meta_path = os.path.join(path, _META)
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        else:
+            if not dimension:
+                raise ValueError(f'Vector collection not found: {path}')
+            os.makedirs(path, exist_ok=True)
+            meta = {'dimension': dimension, 'distance': distance, 'count': 0, 'trained_count': 0}
+
+        self._dimension: int = meta['dimension']
+        self._distance: str = meta['distance']
+        # 已分配的行数，删除的行不复用
+        self._count: int = meta['count']
+        self._trained_count: int = meta['trained_count']
+        self._quantized_count: int = meta.get('quantized_count', 0)
+
+        # 量化编码，与配置不一致时重新训练
+        self._quantizer: Optional[VectorQuantizer] = None
+        quantizer_path = os.path.join(path, _QUANTIZER)
+        if os.path.exists(quantizer_path):
+            with np.load(quantizer_path) as state:
+                quantizer = VectorQuantizer.from_state(dict(state))
+            if quantizer.kind == quantization:
+                self._quantizer = quantizer
+        if self._quantizer is None:
+            self._quantized_count = 0
+
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._assignments: Optional[np.memmap] = None
+        self._codes: Optional[np.memmap] = None
+        self._ensure_capacity(max(self._count, 1024))
+
+        self._centroids: Optional[np.ndarray] = None
+        centroids_path = os.path.join(path, _CENTROIDS)
+        if os.path.exists(centroids_path):
+            self._centroids = np.load(centroids_path)
+        # 倒排列表 (按分区排序的行号, 分区偏移)，写入后重建
+        self._inverted: Optional[tuple[np.ndarray, np.ndarray]] = None
+        # l2距离使用的向量平方和
+        self._sq_norms: Optional[np.ndarray] = None
+
+        # 文档信息
+        self._ids: list[Optional[str]] = [None] * self._count
+        self._contents: list[Optional[str]] = [None] * self._count
+        self._metadata: list[Optional[dict]] = [None] * self._count
+        self._rows: dict[str, int] = {}
+        self._alive = np.zeros(self._capacity, dtype=np.bool_)
+        self._replay_docs()
+
+        # 全文检索倒排索引 词 -> {行号: 词频}，首次全文检索时构建，之后随写入增量维护
+        self._postings: Optional[dict[str, dict[int, int]]] = None
+        # 行号 -> 词数
+        self._lengths: dict[int, int] = {}
+        self._total_length = 0
+
+        self._docs_file = open(os.path.join(path, _DOCS), 'a', encoding='utf8')
+        self._maybe_train_quantizer()
+        self._write_meta()
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    @property
+    def quantizer(self) -> Optional[VectorQuantizer]:
+        """
+        向量压缩编码，未启用量化时为 None
+        """
+        return self._quantizer
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _replay_docs(self):
+        docs_path = os.path.join(self._path, _DOCS)
+        if not os.path.exists(docs_path):
+            return
+
+        # 文档日志与 meta.json 不是原子写入，按回放出的行号扩展，写入中断的末行截断丢弃
+        offset = 0
+        with open(docs_path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line) if line.strip() else None
+                except ValueError:
+                    log.warning('Truncate broken vector document log %s at offset %d', docs_path, offset)
+                    break
+                offset += len(line)
+                if entry is None:
+                    continue
+                if entry['op'] == 'put':
+                    row = entry['row']
+                    if row >= self._count:
+                        self._grow(row + 1)
+                    self._ids[row] = entry['id']
+                    self._contents[row] = entry['content']
+                    self._metadata[row] = entry['metadata']
+                    self._rows[entry['id']] = row
+                    self._alive[row] = True
+                else:
+                    row = self._rows.pop(entry['id'], None)
+                    if row is not None:
+                        self._alive[row] = False
+        if offset < os.path.getsize(docs_path):
+            os.truncate(docs_path, offset)
+
+    def _grow(self, count: int):
+        """
+        扩展已分配的行数
+        :param count: 新的行数
+        """
+        added = count - self._count
+        self._ids.extend([None] * added)
+        self._contents.extend([None] * added)
+        self._metadata.extend([None] * added)
+        self._count = count
+        self._ensure_capacity(count)
+
+    def _write_meta(self):
+        meta = {
+            'dimension': self._dimension,
+            'distance': self._distance,
+            'count': self._count,
+            'trained_count': self._trained_count,
+            'quantized_count': self._quantized_count,
+        }
+        tmp_path = os.path.join(self._path, _META + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self._path, _META))
+
+    def _open_memmap(self, name: str, dtype, shape: tuple) -> np.memmap:
+        file_path = os.path.join(self._path, name)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(file_path, 'a+b') as f:
+            if os.fstat(f.fileno()).st_size < size:
+                f.truncate(size)
+        return np.memmap(file_path, dtype=dtype, mode='r+', shape=shape)
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self._capacity:
+            return
+
+        capacity = max(needed, self._capacity * 2)
+        if self._vectors is not None:
+            self._flush()
+
+        # 扩容时仅扩展文件并重新映射，不读取已有数据
+        self._vectors = self._open_memmap(_VECTORS, np.float32, (capacity, self._dimension))
+        self._assignments = self._open_memmap(_ASSIGNMENTS, np.int32, (capacity,))
+        code_size = self._code_size()
+        if code_size:
+            self._codes = self._open_memmap(_CODES, np.uint8, (capacity, code_size))
+        if self._capacity:
+            alive = np.zeros(capacity, dtype=np.bool_)
+            alive[:self._capacity] = self._alive
+            self._alive = alive
+        self._capacity = capacity
+
+    def _code_size(self) -> int:
+        if self._quantizer is not None:
+            return self._quantizer.code_size
+        quantizer = create_quantizer(self._quantization, self._dimension, self._pq_m)
+        return quantizer.code_size if quantizer is not None else 0
+
+    def _flush(self):
+        self._vectors.flush()
+        self._assignments.flush()
+        if self._codes is not None:
+            self._codes.flush()
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self._dimension:
+            raise ValueError(f'Expected vectors of dimension {self._dimension}')
+        if self._distance == 'cosine':
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors
+
+    def _score(self, vectors: np.ndarray, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        计算相似度，越大越相似
+        :return: (向量数, 查询数)
+        """
+        scores = vectors @ queries.T
+        if self._distance != 'l2':
+            return scores
+
+        sq_norms = self._get_sq_norms()
+        sq_norms = sq_norms[rows] if rows is not None else sq_norms[:len(vectors)]
+        sq_distances = sq_norms[:, None] - 2 * scores + np.einsum('ij,ij->i', queries, queries)[None, :]
+        return -np.sqrt(np.maximum(sq_distances, 0))
+
+    def _get_sq_norms(self) -> np.ndarray:
+        if self._sq_norms is None or len(self._sq_norms) < self._count:
+            sq_norms = np.empty(self._count, dtype=np.float32)
+            for start in range(0, self._count, _CHUNK_ROWS):
+                end = min(start + _CHUNK_ROWS, self._count)
+                chunk = self._vectors[start:end]
+                sq_norms[start:end] = np.einsum('ij,ij->i', chunk, chunk)
+            self._sq_norms = sq_norms
+        return self._sq_norms
+
+    def upsert(self, ids: list[str], contents: list[str], metadata: list[Optional[dict]], vectors: np.ndarray):
+        vectors = self._prepare(vectors)
+        with self._lock:
+            rows = []
+            count = self._count
+            for doc_id in ids:
+                row = self._rows.get(doc_id)
+                if row is None:
+                    row = count
+                    count += 1
+                rows.append(row)
+            self._grow(count)
+
+            rows = np.asarray(rows, dtype=np.int64)
+            self._vectors[rows] = vectors
+            if self._centroids is not None:
+                self._assignments[rows] = self._assign(vectors)
+            if self._quantizer is not None:
+                self._codes[rows] = self._quantizer.encode(vectors)
+            self._flush()
+            # 先写向量与行数，再追加文档日志，中断时只留下未引用的空行
+            self._write_meta()
+
+            for row, doc_id, content, meta in zip(rows.tolist(), ids, contents, metadata):
+                if self._postings is not None:
+                    self._unindex_text(row)
+                    self._index_text(row, content)
+                self._ids[row] = doc_id
+                self._contents[row] = content
+                self._metadata[row] = meta
+                self._rows[doc_id] = row
+                self._docs_file.write(json.dumps(
+                    {'op': 'put', 'row': row, 'id': doc_id, 'content': content, 'metadata': meta},
+                    ensure_ascii=False,
+                ) + '\n')
+            self._docs_file.flush()
+            self._alive[rows] = True
+
+            self._inverted = None
+            self._sq_norms = None
+            if len(self._rows) >= self._ivf_threshold and self._count >= 2 * self._trained_count:
+                self._train_ivf()
+            self._maybe_train_quantizer()
+            self._write_meta()
+
+    def delete(self, ids: list[str]):
+        with self._lock:
+            for doc_id in ids:
+                row = self._rows.pop(doc_id, None)
+                if row is None:
+                    continue
+                self._alive[row] = False
+                if self._postings is not None:
+                    self._unindex_text(row)
+                self._docs_file.write(json.dumps({'op': 'del', 'id': doc_id}, ensure_ascii=False) + '\n')
+            self._docs_file.flush()
+
+    def delete_by_metadata(self, filters: dict) -> int:
+        with self._lock:
+            ids = [doc_id for doc_id, row in self._rows.items() if _match(self._metadata[row], filters)]
+            self.delete(ids)
+            return len(ids)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(self._score_centroids(vectors), axis=1).astype(np.int32)
+
+    def _score_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        scores = vectors @ self._centroids.T
+        if self._distance == 'l2':
+            scores = 2 * scores - np.einsum('ij,ij->i', self._centroids, self._centroids)[None, :]
+        return scores
+
+    def _train_ivf(self, iterations: int = 10):
+        """
+        训练IVF分区（k-means），并为所有向量分配分区
+        """
+        live_rows = np.flatnonzero(self._alive[:self._count])
+        nlist = int(min(max(np.sqrt(len(live_rows)), 16), 4096))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(live_rows, size=min(len(live_rows), nlist * 256), replace=False))
+        sample = np.asarray(self._vectors[sample_rows])
+
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            self._centroids = centroids
+            labels = self._assign(sample)
+            for c in range(nlist):
+                members = sample[labels == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            if self._distance == 'cosine':
+                centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        self._centroids = centroids
+        for start in range(0, self._count, _CHUNK_ROWS):
+            end = min(start + _CHUNK_ROWS, self._count)
+            self._assignments[start:end] = self._assign(np.asarray(self._vectors[start:end]))
+        self._assignments.flush()
+        np.save(os.path.join(self._path, _CENTROIDS), centroids)
+        self._trained_count = self._count
+        self._inverted = None
+        log.info('Trained IVF index %s with %d lists on %d vectors', self._path, nlist, len(live_rows))
+
+    def _maybe_train_quantizer(self):
+        """
+        向量数达到阈值后训练量化编码，向量数翻倍时重新训练，并重新编码所有向量
+        """
+        if self._quantization == 'none' or len(self._rows) < _QUANTIZER_MIN_TRAIN:
+            return
+        if self._quantizer is not None and self._count < 2 * self._quantized_count:
+            return
+
+        live_rows = np.flatnonzero(self._alive[:self._count])
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(live_rows, size=min(len(live_rows), _QUANTIZER_MAX_SAMPLES), replace=False))
+        quantizer = create_quantizer(self._quantization, self._dimension, self._pq_m)
+        quantizer.train(np.asarray(self._vectors[sample_rows]))
+
+        self._quantizer = quantizer
+        self._ensure_capacity(self._count)
+        if self._codes is None:
+            self._codes = self._open_memmap(_CODES, np.uint8, (self._capacity, quantizer.code_size))
+        for start in range(0, self._count, _CHUNK_ROWS):
+            end = min(start + _CHUNK_ROWS, self._count)
+            self._codes[start:end] = quantizer.encode(np.asarray(self._vectors[start:end]))
+        self._codes.flush()
+        np.savez(os.path.join(self._path, _QUANTIZER), **quantizer.state())
+        self._quantized_count = self._count
+        log.info('Trained %s quantizer for %s on %d vectors', quantizer.kind, self._path, len(sample_rows))
+
+    def _get_inverted(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._inverted is None:
+            assignments = np.asarray(self._assignments[:self._count])
+            order = np.argsort(assignments, kind='stable')
+            offsets = np.zeros(len(self._centroids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(assignments, minlength=len(self._centroids)), out=offsets[1:])
+            self._inverted = (order, offsets)
+        return self._inverted
+
+    def search(self, queries: np.ndarray, top_k: int, filters: Optional[dict] = None,
+               nprobe: Optional[int] = None) -> list[list[tuple[str, Optional[str], Optional[dict], float]]]:
+        """
+        批量检索
+        :param queries: 查询向量 (查询数, 维度)
+        :param top_k: 每个查询的返回数量
+        :param filters: 元数据过滤，要求元数据包含所有给定的键值
+        :param nprobe: IVF检索的分区数
+        :return: 每个查询的 [(id, content, metadata, score)]
+        """
+        queries = self._prepare(queries)
+        with self._lock:
+            if self._count == 0:
+                return [[] for _ in queries]
+
+            if self._centroids is not None and len(self._rows) >= self._ivf_threshold:
+                return self._search_ivf(queries, top_k, filters, nprobe or self._nprobe)
+
+            # 暴力检索，所有查询一次矩阵乘法完成
+            rows = np.arange(self._count)
+            if self._quantizer is not None:
+                scores = self._quantizer.score(self._codes[:self._count], queries, self._distance)
+                return [self._rerank(rows, scores[:, i], queries[i], top_k, filters) for i in range(len(queries))]
+
+            scores = self._score(self._vectors[:self._count], queries)
+            return [self._top(rows, scores[:, i], top_k, filters) for i in range(len(queries))]
+
+    def _search_ivf(self, queries: np.ndarray, top_k: int, filters: Optional[dict], nprobe: int):
+        order, offsets = self._get_inverted()
+        nprobe = min(nprobe, len(self._centroids))
+        probes = np.argpartition(-self._score_centroids(queries), nprobe - 1, axis=1)[:, :nprobe]
+
+        results = []
+        for i, probe in enumerate(probes):
+            rows = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probe])
+            rows.sort()
+            if self._quantizer is not None:
+                scores = self._quantizer.score(self._codes[rows], queries[i:i + 1], self._distance)[:, 0]
+                results.append(self._rerank(rows, scores, queries[i], top_k, filters))
+            else:
+                scores = self._score(self._vectors[rows], queries[i:i + 1], rows)[:, 0]
+                results.append(self._top(rows, scores, top_k, filters))
+        return results
+
+    def _rerank(self, rows: np.ndarray, approx_scores: np.ndarray, query: np.ndarray,
+                top_k: int, filters: Optional[dict]):
+        """
+        按近似相似度选出候选，读取候选的原始向量精确计算后排序
+        """
+        approx_scores = np.where(self._alive[rows], approx_scores, -np.inf)
+
+        limit = top_k * self._rerank_factor * (4 if filters else 1)
+        while True:
+            limit = min(limit, len(rows))
+            candidates = np.argpartition(-approx_scores, limit - 1)[:limit] if limit < len(rows) else np.arange(len(rows))
+            candidates = candidates[approx_scores[candidates] > -np.inf]
+            if filters:
+                candidates = candidates[[_match(self._metadata[int(rows[i])], filters) for i in candidates]]
+
+            candidate_rows = np.sort(rows[candidates])
+            scores = self._score(self._vectors[candidate_rows], query[None, :], candidate_rows)[:, 0]
+            results = self._top(candidate_rows, scores, top_k, None)
+
+            if len(results) >= top_k or limit >= len(rows):
+                return results
+            limit *= 4
+
+    def _top(self, rows: np.ndarray, scores: np.ndarray, top_k: int, filters: Optional[dict]):
+        scores = np.where(self._alive[rows], scores, -np.inf)
+
+        # 有过滤条件时逐步扩大候选范围，直到凑够 top_k 或候选用尽
+        limit = top_k if not filters else top_k * 4
+        while True:
+            limit = min(limit, len(scores))
+            candidates = np.argpartition(-scores, limit - 1)[:limit] if limit < len(scores) else np.arange(len(scores))
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+            results = []
+            for i in candidates:
+                if scores[i] == -np.inf:
+                    break
+                row = int(rows[i])
+                if filters and not _match(self._metadata[row], filters):
+                    continue
+                results.append((self._ids[row], self._contents[row], self._metadata[row], float(scores[i])))
+                if len(results) >= top_k:
+                    break
+
+            if len(results) >= top_k or limit >= len(scores):
+                return results
+            limit *= 4
+
+    def _index_text(self, row: int, content: Optional[str]):
+        tokens = _tokenize(content)
+        for token, tf in Counter(tokens).items():
+            self._postings.setdefault(token, {})[row] = tf
+        self._lengths[row] = len(tokens)
+        self._total_length += len(tokens)
+
+    def _unindex_text(self, row: int):
+        length = self._lengths.pop(row, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for token in set(_tokenize(self._contents[row])):
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(row, None)
+                if not posting:
+                    del self._postings[token]
+
+    def _get_postings(self) -> dict[str, dict[int, int]]:
+        if self._postings is None:
+            self._postings = {}
+            for row in self._rows.values():
+                self._index_text(row, self._contents[row])
+        return self._postings
+
+    def lexical_search(self, query: str, top_k: int,
+                       filters: Optional[dict] = None) -> list[tuple[str, Optional[str], Optional[dict], float]]:
+        """
+        全文检索，按 BM25 打分
+        :param query: 查询文本
+        :param top_k: 返回数量
+        :param filters: 元数据过滤，要求元数据包含所有给定的键值
+        :return: [(id, content, metadata, score)]
+        """
+        with self._lock:
+            postings = self._get_postings()
+            if not self._lengths:
+                return []
+
+            count = len(self._lengths)
+            avg_length = self._total_length / count or 1.0
+            scores: dict[int, float] = {}
+            for token in set(_tokenize(query)):
+                posting = postings.get(token)
+                if not posting:
+                    continue
+                idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for row, tf in posting.items():
+                    norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * self._lengths[row] / avg_length)
+                    scores[row] = scores.get(row, 0.0) + idf * tf * (_BM25_K1 + 1) / (tf + norm)
+
+            # 无过滤条件时只需部分排序
+            if filters:
+                ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            else:
+                ranked = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+            results = []
+            for row, score in ranked:
+                if filters and not _match(self._metadata[row], filters):
+                    continue
+                results.append((self._ids[row], self._contents[row], self._metadata[row], score))
+                if len(results) >= top_k:
+                    break
+            return results
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._docs_file.close()
@@ -0,0 +1,55 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from typing import Optional
+
+from utils.dataclass_tolerant import tolerant_dataclass
+
+
+@tolerant_dataclass
+class VectorDocument:
+    """
+    向量文档
+
+    Attributes:
+        id: 文档ID
+        content: 文本内容
+        embedding: 向量
+        metadata: 元数据，可用于过滤
+    """
+
+    id: str
+    content: str
+    embedding: list[float]
+    metadata: Optional[dict] = None
+
+
+@tolerant_dataclass
+class VectorSearchResult:
+    """
+    向量检索结果
+
+    Attributes:
+        id: 文档ID
+        content: 文本内容
+        metadata: 元数据
+        score: 相似度，越大越相似
+    """
+
+    id: str
+    content: str
+    metadata: Optional[dict]
+    score: float
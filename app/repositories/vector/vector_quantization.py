@@ -0,0 +1,234 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import numpy as np
+
+# 分批计算时每批的行数，控制临时矩阵的内存
+_CHUNK_ROWS = 16384
+
+
+def kmeans(samples: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    k-means（欧氏距离）
+    :param samples: 样本 (样本数, 维度)
+    :param k: 聚类数，不超过样本数
+    :param iterations: 迭代次数
+    :param seed: 随机种子
+    :return: 聚类中心 (k, 维度)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = samples[rng.choice(len(samples), size=k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        labels = assign(samples, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=samples[:, d], minlength=k)
+                         for d in range(samples.shape[1])], axis=1)
+        # 空簇保留原中心
+        filled = counts > 0
+        centroids[filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+    return centroids
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    为每个向量分配欧氏距离最近的中心
+    """
+    distances = np.einsum('ij,ij->i', centroids, centroids)[None, :] - 2 * (vectors @ centroids.T)
+    return np.argmin(distances, axis=1)
+
+
+class VectorQuantizer(ABC):
+    """
+    向量压缩编码，检索时先在编码上计算近似相似度，再用原始向量重排
+    """
+
+    kind: str = ''
+
+    # 每个向量的编码字节数
+    code_size: int = 0
+
+    @abstractmethod
+    def train(self, samples: np.ndarray):
+        """
+        用样本训练编码参数
+        :param samples: 样本 (样本数, 维度)
+        """
+        pass
+
+    @abstractmethod
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        :param vectors: 向量 (向量数, 维度)
+        :return: 编码 (向量数, code_size)
+        """
+        pass
+
+    @abstractmethod
+    def score(self, codes: np.ndarray, queries: np.ndarray, distance: str) -> np.ndarray:
+        """
+        近似相似度，越大越相似，仅用于排序
+        :param codes: 编码 (向量数, code_size)
+        :param queries: 查询向量 (查询数, 维度)
+        :param distance: 距离 cosine | l2 | ip
+        :return: (向量数, 查询数)
+        """
+        pass
+
+    @abstractmethod
+    def state(self) -> dict:
+        """
+        编码参数，用于持久化后通过 from_state 恢复
+        """
+        pass
+
+    @staticmethod
+    def from_state(state: dict) -> 'VectorQuantizer':
+        kind = str(state['kind'])
+        if kind == ScalarQuantizer.kind:
+            quantizer = ScalarQuantizer(state['low'].shape[0])
+            quantizer._low, quantizer._scale = state['low'], state['scale']
+        elif kind == ProductQuantizer.kind:
+            codebooks = state['codebooks']
+            quantizer = ProductQuantizer(codebooks.shape[0] * codebooks.shape[2], codebooks.shape[0])
+            quantizer._codebooks = codebooks
+        else:
+            raise ValueError(f'Unknown vector quantization: {kind}')
+        return quantizer
+
+
+def create_quantizer(kind: str, dimension: int, pq_m: int = 0) -> Optional[VectorQuantizer]:
+    """
+    :param kind: none | int8 | pq
+    :param dimension: 向量维度
+    :param pq_m: PQ子空间数，0 时每4维一个子空间（压缩16倍）
+    """
+    if kind == 'none':
+        return None
+    if kind == ScalarQuantizer.kind:
+        return ScalarQuantizer(dimension)
+    if kind == ProductQuantizer.kind:
+        return ProductQuantizer(dimension, pq_m or _default_pq_m(dimension))
+    raise ValueError(f'Unknown vector quantization: {kind}')
+
+
+def _default_pq_m(dimension: int) -> int:
+    # 不超过 dimension / 4 的最大约数
+    for m in range(max(dimension // 4, 1), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+class ScalarQuantizer(VectorQuantizer):
+    """
+    标量量化，每一维按训练样本的取值范围线性映射到 0~255，压缩4倍
+    """
+
+    kind = 'int8'
+
+    def __init__(self, dimension: int):
+        self.code_size = dimension
+        self._low: Optional[np.ndarray] = None
+        self._scale: Optional[np.ndarray] = None
+
+    def train(self, samples: np.ndarray):
+        low, high = samples.min(axis=0), samples.max(axis=0)
+        self._low = low.astype(np.float32)
+        self._scale = np.maximum((high - low) / 255, 1e-12).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint((vectors - self._low) / self._scale), 0, 255).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self._scale + self._low
+
+    def score(self, codes: np.ndarray, queries: np.ndarray, distance: str) -> np.ndarray:
+        # (codes * scale + low) · q = codes · (scale * q) + low · q，无需解码
+        scaled_queries = (queries * self._scale).T
+        offsets = queries @ self._low
+        scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+        for start in range(0, len(codes), _CHUNK_ROWS):
+            chunk = codes[start:start + _CHUNK_ROWS].astype(np.float32)
+            chunk_scores = chunk @ scaled_queries + offsets[None, :]
+            if distance == 'l2':
+                vectors = chunk * self._scale + self._low
+                chunk_scores = 2 * chunk_scores - np.einsum('ij,ij->i', vectors, vectors)[:, None]
+            scores[start:start + len(chunk)] = chunk_scores
+        return scores
+
+    def state(self) -> dict:
+        return {'kind': self.kind, 'low': self._low, 'scale': self._scale}
+
+
+class ProductQuantizer(VectorQuantizer):
+    """
+    乘积量化，向量切分为 m 个子空间，每个子空间用256个中心之一的编号表示，每个向量 m 字节
+    检索时为每个查询预先计算子空间查找表（ADC），编码上的相似度为查表求和
+    """
+
+    kind = 'pq'
+
+    def __init__(self, dimension: int, m: int):
+        if dimension % m:
+            raise ValueError(f'Vector dimension {dimension} is not divisible by pq_m {m}')
+        self.code_size = m
+        self._m = m
+        self._sub_dimension = dimension // m
+        # (m, 256, 子空间维度)
+        self._codebooks: Optional[np.ndarray] = None
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        # (m, 向量数, 子空间维度)
+        return np.ascontiguousarray(vectors.reshape(len(vectors), self._m, self._sub_dimension).transpose(1, 0, 2))
+
+    def train(self, samples: np.ndarray):
+        # 每个中心约30个样本即可收敛
+        if len(samples) > 256 * 30:
+            samples = samples[np.random.default_rng(0).choice(len(samples), size=256 * 30, replace=False)]
+        k = min(256, len(samples))
+        codebooks = np.zeros((self._m, 256, self._sub_dimension), dtype=np.float32)
+        subspaces = self._split(samples)
+        for j in range(self._m):
+            # 样本不足256时，多余的编号不会被使用
+            codebooks[j, :k] = kmeans(subspaces[j], k, seed=j)
+        self._codebooks = codebooks
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        subspaces = self._split(vectors)
+        codes = np.empty((len(vectors), self._m), dtype=np.uint8)
+        for j in range(self._m):
+            codes[:, j] = assign(subspaces[j], self._codebooks[j])
+        return codes
+
+    def score(self, codes: np.ndarray, queries: np.ndarray, distance: str) -> np.ndarray:
+        # 查找表 (查询数, m, 256)
+        tables = np.einsum('mqd,mkd->qmk', self._split(queries), self._codebooks)
+        if distance == 'l2':
+            tables = 2 * tables - np.einsum('mkd,mkd->mk', self._codebooks, self._codebooks)[None, :, :]
+
+        scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+        subspaces = np.arange(self._m)[None, :]
+        for start in range(0, len(codes), _CHUNK_ROWS):
+            chunk = codes[start:start + _CHUNK_ROWS]
+            for i, table in enumerate(tables):
+                scores[start:start + len(chunk), i] = table[subspaces, chunk].sum(axis=1)
+        return scores
+
+    def state(self) -> dict:
+        return {'kind': self.kind, 'codebooks': self._codebooks}
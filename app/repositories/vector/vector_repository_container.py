@@ -16,6 +16,10 @@ limitations under the License.
 
 from dependency_injector import containers, providers
 
+from .VectorRepository import VectorRepository
+from .VectorRepositoryLocal import VectorRepositoryLocal
+from .VectorRepositoryPostgres import VectorRepositoryPostgres
+
 
 class VectorContainer(containers.DeclarativeContainer):
     """
@@ -23,3 +27,34 @@ class VectorContainer(containers.DeclarativeContainer):
     """
 
     config = providers.Configuration()
+
+    data_container = providers.DependenciesContainer()
+
+    # 向量
+    vector_repository: VectorRepository = providers.Selector(
+        config.repository.vector.type,
+        postgres=providers.Singleton(
+            VectorRepositoryPostgres,
+            session_factory=data_container.db_pg.provided.async_session,
+            distance=config.repository.vector.postgres.distance,
+            index_type=config.repository.vector.postgres.index.type,
+            hnsw_m=config.repository.vector.postgres.index.hnsw.m,
+            hnsw_ef_construction=config.repository.vector.postgres.index.hnsw.ef_construction,
+            ivfflat_lists=config.repository.vector.postgres.index.ivfflat.lists,
+            ef_search=config.repository.vector.postgres.search.ef_search,
+            probes=config.repository.vector.postgres.search.probes,
+            batch_size=config.repository.vector.postgres.batch_size,
+            text_search_config=config.repository.vector.postgres.text_search.config,
+            query_syntax=config.repository.vector.postgres.text_search.query_syntax,
+        ),
+        local=providers.Singleton(
+            VectorRepositoryLocal,
+            path=config.repository.vector.local.path,
+            distance=config.repository.vector.local.distance,
+            ivf_threshold=config.repository.vector.local.ivf_threshold,
+            nprobe=config.repository.vector.local.nprobe,
+            quantization=config.repository.vector.local.quantization.type,
+            pq_m=config.repository.vector.local.quantization.pq_m,
+            rerank_factor=config.repository.vector.local.quantization.rerank_factor,
+        ),
+    )
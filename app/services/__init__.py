@@ -15,9 +15,19 @@ limitations under the License.
 """
 
 from .account.account_service import AccountService
+from .chat.chat_service import ChatService
+from .chat.conversation_service import ConversationService
+from .embedding.embedding_service import EmbeddingService
+from .ingestion.ingestion_pipeline import IngestionPipeline
+from .job.job_service import JobService
 from .service_container import ServiceContainer
 
 __all__ = [
     'ServiceContainer',
     'AccountService',
+    'EmbeddingService',
+    'IngestionPipeline',
+    'ChatService',
+    'ConversationService',
+    'JobService',
 ]
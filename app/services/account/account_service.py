@@ -14,10 +14,27 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from repositories.data.account import AccountRepository
+import dataclasses
+import logging
+import time
+import uuid
+from typing import Optional, Union
+
+from jose import jwt, JWTError
+
+from repositories.data import AsyncAccountRepository
 from repositories.data.account.account_models import Account
-from utils.errors.account_error import AccountLoginError
-from utils import password as password_util
+from utils.cache import TTLCache
+from utils.errors.account_error import AccountLoginError, AccountTokenError
+from utils.password_hasher import PasswordHasher
+from .account_token import AccountToken, AccountPrincipal, TokenRevocationList
+
+log = logging.getLogger()
+
+
+def _without_secrets(account: Account) -> Account:
+    # 返回副本，不修改缓存中的账号
+    return dataclasses.replace(account, password='')
 
 
 class AccountService:
@@ -25,24 +42,151 @@ class AccountService:
     账号服务
     """
 
-    def __init__(self, account_repository: AccountRepository):
-        self._account_repository = account_repository
+    def __init__(self, async_account_repository: AsyncAccountRepository, password_hasher: PasswordHasher,
+                 token_secret_key: str, token_algorithm: str,
+                 access_token_expire_minutes: int, refresh_token_expire_minutes: int,
+                 token_cache: TTLCache, token_revocation_list: TokenRevocationList):
+        if not token_secret_key:
+            raise ValueError('security.token.secret_key is not set, please set TOKEN_SECRET_KEY')
+
+        self._password_hasher = password_hasher
+        self._async_account_repository = async_account_repository
 
-    def authenticate(self, email: str, password: str) -> Account:
+        self._token_secret_key = token_secret_key
+        self._token_algorithm = token_algorithm
+        self._access_token_expire_seconds = access_token_expire_minutes * 60
+        self._refresh_token_expire_seconds = refresh_token_expire_minutes * 60
+        # 已校验的访问令牌，避免重复验签
+        self._token_cache = token_cache
+        self._token_revocation_list = token_revocation_list
+
+    async def authenticate_async(self, email: str, password: str) -> Account:
         """
-        账号认证
+        账号认证（异步）
         :param email: 邮箱
         :param password: 密码
         :return: 账号信息
         """
 
-        account = self._account_repository.find_one_by_email(email)
+        account = await self._async_account_repository.find_one_by_email(email)
 
         if not account:
             raise AccountLoginError(message='用户名或密码错误')
 
-        if not password_util.verify_password(password, account.password):
+        # 密码校验为CPU密集型操作，交由独立的执行器处理，不阻塞事件循环
+        verified, new_hash = await self._password_hasher.verify_and_update(password, account.password)
+        if not verified:
             raise AccountLoginError(message='用户名或密码错误')
 
-        # TODO 需要移除敏感信息
-        return account
+        if new_hash:
+            # 登录成功时按当前配置迁移密码HASH，失败不影响登录
+            try:
+                await self._async_account_repository.update_password(account.email, new_hash)
+                account.password = new_hash
+            except Exception:
+                log.exception('Rehash password failed')
+
+        return _without_secrets(account)
+
+    def issue_token(self, account: Union[Account, AccountPrincipal], sid: Optional[str] = None) -> AccountToken:
+        """
+        签发令牌
+        :param account: 账号信息
+        :param sid: 会话ID，刷新时沿用原会话，None 时开始新的会话
+        :return: 访问令牌及刷新令牌
+        """
+
+        now = int(time.time())
+        claims = {'sub': str(account.id), 'name': account.name, 'email': account.email, 'iat': now,
+                  'sid': sid or uuid.uuid4().hex}
+
+        access_token = jwt.encode(
+            {**claims, 'type': 'access', 'jti': uuid.uuid4().hex, 'exp': now + self._access_token_expire_seconds},
+            self._token_secret_key, algorithm=self._token_algorithm,
+        )
+        refresh_token = jwt.encode(
+            {**claims, 'type': 'refresh', 'jti': uuid.uuid4().hex, 'exp': now + self._refresh_token_expire_seconds},
+            self._token_secret_key, algorithm=self._token_algorithm,
+        )
+
+        return AccountToken(
+            access_token=access_token,
+            refresh_token=refresh_token,
+            expires_in=self._access_token_expire_seconds,
+        )
+
+    def verify_access_token(self, token: str) -> AccountPrincipal:
+        """
+        校验访问令牌，不访问数据库
+        :param token: 访问令牌
+        :return: 令牌中的账号信息
+        """
+
+        principal = self._token_cache.get(token, None)
+        if principal is None:
+            principal = self._decode_token(token, 'access')
+            self._token_cache.set(token, principal)
+            return principal
+
+        # 缓存命中时仍需检查过期及吊销
+        if principal.exp <= time.time() or self._token_revocation_list.is_revoked(principal.jti, principal.sid):
+            self._token_cache.delete(token)
+            raise AccountTokenError()
+
+        return principal
+
+    async def refresh_token(self, refresh_token: str) -> AccountToken:
+        """
+        使用刷新令牌换取新的令牌，旧的刷新令牌随即失效，新令牌沿用原会话
+        :param refresh_token: 刷新令牌
+        :return: 访问令牌及刷新令牌
+        """
+
+        principal = self._decode_token(refresh_token, 'refresh')
+        # 以数据库为准，其他进程刚登出的会话可能尚未同步到本进程
+        if principal.sid and await self._token_revocation_list.is_revoked_async(principal.sid):
+            raise AccountTokenError()
+        # 刷新令牌只能换取一次，并发换取同一令牌时只有一个成功
+        if not await self._token_revocation_list.revoke(principal.jti, 'refresh', principal.exp):
+            raise AccountTokenError()
+        return self.issue_token(principal, principal.sid or None)
+
+    async def revoke_token(self, token: str):
+        """
+        吊销令牌所属的会话，同一次登录签发及之后刷新得到的访问令牌和刷新令牌均随之失效
+        :param token: 访问令牌或刷新令牌
+        """
+
+        try:
+            claims = jwt.decode(token, self._token_secret_key, algorithms=[self._token_algorithm])
+        except JWTError:
+            # 无效的令牌无需吊销
+            return
+
+        if claims.get('sid'):
+            # 会话中的令牌均签发于此刻之前，过期时间不会晚于此刻加刷新令牌有效期
+            await self._token_revocation_list.revoke(
+                claims['sid'], 'session', int(time.time()) + self._refresh_token_expire_seconds,
+            )
+        else:
+            await self._token_revocation_list.revoke(claims['jti'], claims.get('type', 'access'), claims['exp'])
+        self._token_cache.delete(token)
+
+    def _decode_token(self, token: str, token_type: str) -> AccountPrincipal:
+        try:
+            claims = jwt.decode(token, self._token_secret_key, algorithms=[self._token_algorithm])
+        except JWTError:
+            raise AccountTokenError()
+
+        if claims.get('type') != token_type \
+                or self._token_revocation_list.is_revoked(claims['jti'], claims.get('sid', '')):
+            raise AccountTokenError()
+
+        return AccountPrincipal(
+            id=claims['sub'],
+            name=claims['name'],
+            email=claims['email'],
+            jti=claims['jti'],
+            exp=claims['exp'],
+            sid=claims.get('sid', ''),
+        )
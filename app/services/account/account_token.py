@@ -0,0 +1,184 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from repositories.data.account.TokenRevocationRepository import TokenRevocationRepository
+
+log = logging.getLogger()
+
+# 增量同步时额外回看的时间（秒）
+_SYNC_LOOKBACK_SECONDS = 60
+
+
+@dataclass
+class AccountToken:
+    """
+    账号令牌
+
+    Attributes:
+        access_token: 访问令牌
+        refresh_token: 刷新令牌
+        token_type: 令牌类型
+        expires_in: 访问令牌有效期（秒）
+    """
+
+    access_token: str
+    refresh_token: str
+    token_type: str = 'bearer'
+    expires_in: int = 0
+
+
+@dataclass
+class AccountPrincipal:
+    """
+    令牌中携带的账号信息，校验令牌后无需再查询数据库
+
+    Attributes:
+        id: 账号ID
+        name: 账号名
+        email: 邮箱
+        jti: 令牌ID
+        exp: 令牌过期时间（时间戳）
+        sid: 会话ID，同一次登录签发及刷新得到的令牌共用，登出时吊销整个会话
+    """
+
+    id: str
+    name: str
+    email: str
+    jti: str
+    exp: int
+    sid: str = ''
+
+
+class TokenRevocationList:
+    """
+    令牌吊销列表
+    吊销记录保存在数据库中，多个进程共享且重启后不丢失；每个进程在内存中保留未过期记录的副本并定期同步，
+    校验访问令牌时只查内存，其他进程的吊销最迟在一个同步周期后生效
+    """
+
+    def __init__(self, repository: TokenRevocationRepository, sync_interval: float = 5,
+                 purge_interval: float = 3600, purge_batch_size: int = 1000):
+        """
+        :param repository: 吊销记录
+        :param sync_interval: 同步间隔（秒）
+        :param purge_interval: 删除数据库中过期记录的间隔（秒）
+        :param purge_batch_size: 每批删除的数量
+        """
+        self._repository = repository
+        self._sync_interval = sync_interval
+        self._purge_interval = purge_interval
+        self._purge_batch_size = purge_batch_size
+        # 令牌ID或会话ID -> exp
+        self._revoked: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        # 上次成功同步的开始时间（单调时钟），None 时下次全量加载
+        self._synced_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def revoke(self, token_id: str, token_type: str, exp: int) -> bool:
+        """
+        吊销令牌或会话
+        :param token_id: 令牌ID或会话ID
+        :param token_type: access | refresh | session，刷新令牌只记录在数据库中
+        :param exp: 过期时间（时间戳），之后无需再记录
+        :return: 是否为本次吊销，已吊销时返回 False
+        """
+        if token_type != 'refresh':
+            self._add(token_id, exp)
+        return await self._repository.revoke(token_id, token_type, exp)
+
+    def is_revoked(self, *token_ids: str) -> bool:
+        """
+        按内存中的副本检查，不访问数据库
+        :param token_ids: 令牌ID或会话ID
+        :return: 任一是否已吊销
+        """
+        now = time.time()
+        return any((exp := self._revoked.get(token_id)) is not None and exp > now for token_id in token_ids)
+
+    async def is_revoked_async(self, *token_ids: str) -> bool:
+        """
+        按数据库检查，包含其他进程尚未同步过来的吊销
+        :param token_ids: 令牌ID或会话ID
+        :return: 任一是否已吊销
+        """
+        return await self._repository.is_revoked(list(token_ids))
+
+    async def sync(self):
+        """
+        从数据库同步吊销记录，首次全量加载，之后只加载上次同步以来新增的记录
+        """
+        started = time.monotonic()
+        created_within = None
+        if self._synced_at is not None:
+            # 记录的创建时间为事务开始时间，多回看一段时间覆盖提交延迟，重复加载的记录不影响结果
+            created_within = started - self._synced_at + _SYNC_LOOKBACK_SECONDS
+        for revoked in await self._repository.find_active(created_within):
+            self._add(revoked.token_id, revoked.expires_at.timestamp())
+        self._synced_at = started
+
+    def _add(self, token_id: str, exp: float):
+        now = time.time()
+        if exp <= now:
+            return
+        with self._lock:
+            self._revoked[token_id] = exp
+            if now >= self._next_purge:
+                self._purge(now)
+
+    def _purge(self, now: float):
+        self._revoked = {token_id: exp for token_id, exp in self._revoked.items() if exp > now}
+        self._next_purge = now + 60
+
+    async def _purge_expired(self):
+        while await self._repository.purge_expired(self._purge_batch_size) >= self._purge_batch_size:
+            pass
+
+    async def _run(self):
+        next_purge = 0.0
+        while True:
+            try:
+                await self.sync()
+                if time.monotonic() >= next_purge:
+                    await self._purge_expired()
+                    next_purge = time.monotonic() + self._purge_interval
+            except Exception as e:
+                log.warning('Failed to sync token revocations: %s', e)
+            await asyncio.sleep(self._sync_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def __len__(self):
+        return len(self._revoked)
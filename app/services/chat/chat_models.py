@@ -0,0 +1,42 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class ChatMessage:
+    """
+    对话消息
+    """
+
+    role: str
+    content: str
+
+
+@dataclass
+class ChatChunk:
+    """
+    流式输出的片段
+    """
+
+    # 增量内容
+    content: str = ''
+    # 结束原因，仅最后一个片段提供
+    finish_reason: Optional[str] = None
+    # 用量，仅最后一个片段提供
+    usage: Optional[dict] = None
@@ -0,0 +1,119 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from utils.errors.chat_error import ChatProviderError
+from .chat_models import ChatMessage, ChatChunk
+
+log = logging.getLogger()
+
+
+class ChatProvider(ABC):
+    """
+    对话模型服务
+    """
+
+    @abstractmethod
+    def stream(self, messages: list[ChatMessage], **options) -> AsyncIterator[ChatChunk]:
+        """
+        流式生成回复，关闭返回的迭代器即取消上游请求
+        :param messages: 对话消息
+        :param options: 生成参数，如 temperature、max_tokens
+        :return: 回复片段
+        """
+        pass
+
+    async def close(self):
+        """
+        释放连接
+        """
+        pass
+
+
+class OpenAIChatProvider(ChatProvider):
+    """
+    兼容 OpenAI /chat/completions 接口的对话模型服务
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str], model: str,
+                 connect_timeout: float = 10, read_timeout: float = 60, max_connections: int = 100):
+        """
+        :param base_url: 接口地址，如 https://api.openai.com/v1
+        :param api_key: API Key
+        :param model: 模型
+        :param connect_timeout: 连接超时（秒）
+        :param read_timeout: 两个片段之间的最长等待时间（秒）
+        :param max_connections: 最大连接数，连接保持复用，省去首个片段前的建连耗时
+        """
+        self._model = model
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip('/'),
+            headers={'Authorization': f'Bearer {api_key}'} if api_key else None,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def stream(self, messages: list[ChatMessage], **options) -> AsyncIterator[ChatChunk]:
+        payload = {
+            'model': options.pop('model', None) or self._model,
+            'messages': [{'role': message.role, 'content': message.content} for message in messages],
+            'stream': True,
+            'stream_options': {'include_usage': True},
+            **{key: value for key, value in options.items() if value is not None},
+        }
+
+        try:
+            # 退出上下文即关闭连接，上游随之停止生成
+            async with self._client.stream('POST', '/chat/completions', json=payload) as response:
+                if response.is_error:
+                    await response.aread()
+                    log.error('Chat request failed: %s %s', response.status_code, response.text)
+                    raise ChatProviderError()
+
+                # 结束原因在用量片段中一并返回，不返回用量的服务在结束时单独返回
+                finish_reason, reported = None, False
+                async for line in response.aiter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        break
+
+                    event = json.loads(data)
+                    # 先处理 choices，结束原因与用量可能在同一事件中
+                    for choice in event.get('choices') or []:
+                        content = (choice.get('delta') or {}).get('content')
+                        if content:
+                            yield ChatChunk(content=content)
+                        if choice.get('finish_reason'):
+                            finish_reason = choice['finish_reason']
+                    if event.get('usage'):
+                        yield ChatChunk(finish_reason=finish_reason, usage=event['usage'])
+                        reported = finish_reason is not None
+                if finish_reason is not None and not reported:
+                    yield ChatChunk(finish_reason=finish_reason)
+        except httpx.HTTPError as e:
+            log.error('Chat request failed: %s', e)
+            raise ChatProviderError() from e
+
+    async def close(self):
+        await self._client.aclose()
@@ -0,0 +1,122 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Optional
+
+from .chat_models import ChatMessage, ChatChunk
+from .chat_provider import ChatProvider
+from .chat_stream import ChatStream, ChatStreamRegistry
+from .conversation_service import ConversationService
+
+log = logging.getLogger()
+
+
+class ChatService:
+    """
+    对话服务
+    """
+
+    def __init__(self, provider: ChatProvider, stream_registry: ChatStreamRegistry,
+                 conversation_service: ConversationService):
+        """
+        :param provider: 对话模型服务
+        :param stream_registry: 可续传的流式回复
+        :param conversation_service: 会话服务
+        """
+        self._provider = provider
+        self._stream_registry = stream_registry
+        self._conversation_service = conversation_service
+
+    async def stream(self, messages: list[ChatMessage], **options) -> AsyncIterator[ChatChunk]:
+        """
+        流式生成回复
+        按需拉取：调用方取走一个片段后才会读取下一个，调用方写出变慢时上游读取随之放缓，
+        不在中间堆积片段；关闭返回的迭代器即关闭上游连接
+        :param messages: 对话消息
+        :param options: 生成参数
+        :return: 回复片段
+        """
+        stream = self._provider.stream(messages, **options)
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def start_stream(self, owner: str, messages: list[ChatMessage], conversation_id: Optional[str] = None,
+                           **options) -> ChatStream:
+        """
+        发起可续传的流式回复，生成在后台进行，与客户端连接解耦
+        先取得首个片段再返回，模型服务不可用时直接抛出异常
+        :param owner: 所属账号ID
+        :param messages: 对话消息
+        :param conversation_id: 会话ID，指定时将最后一条消息及回复记录到会话
+        :param options: 生成参数
+        :return: 流
+        """
+        chunks = self.stream(messages, **options)
+        if conversation_id is not None:
+            chunks = self._record(owner, conversation_id, messages[-1], chunks)
+        try:
+            first = await anext(chunks, None)
+        except BaseException:
+            await chunks.aclose()
+            raise
+        return self._stream_registry.create(owner, chunks, first)
+
+    def get_stream(self, owner: str, stream_id: str) -> ChatStream:
+        """
+        获取进行中或最近完成的流式回复，用于断线重连
+        :param owner: 所属账号ID
+        :param stream_id: 流ID
+        :return: 流
+        """
+        return self._stream_registry.get(stream_id, owner)
+
+    async def _record(self, owner: str, conversation_id: str, message: ChatMessage,
+                      chunks: AsyncIterator[ChatChunk]) -> AsyncIterator[ChatChunk]:
+        # 校验会话与等待首个片段并行，不增加首个片段的延迟；会话不存在时在首个片段前抛出
+        checking = asyncio.create_task(self._conversation_service.get(owner, conversation_id))
+        checked, content, usage = False, [], None
+        try:
+            async for chunk in chunks:
+                if not checked:
+                    await self._checked(checking, conversation_id, message)
+                    checked = True
+                content.append(chunk.content)
+                usage = chunk.usage or usage
+                yield chunk
+            if not checked:
+                await self._checked(checking, conversation_id, message)
+                checked = True
+        finally:
+            if not checking.done():
+                checking.cancel()
+            await chunks.aclose()
+            # 中途出错或取消时记录已生成的部分
+            if checked and any(content):
+                try:
+                    await self._conversation_service.record(conversation_id, [
+                        {'role': 'assistant', 'content': ''.join(content), 'usage': usage},
+                    ])
+                except Exception as e:
+                    log.warning('Failed to record reply of conversation %s: %s', conversation_id, e)
+
+    async def _checked(self, checking: asyncio.Task, conversation_id: str, message: ChatMessage):
+        await checking
+        await self._conversation_service.record(conversation_id, [{'role': message.role, 'content': message.content}])
@@ -0,0 +1,296 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import AsyncIterator, Callable, Optional
+
+from utils.errors.base_error import BaseServiceError
+from utils.errors.chat_error import ChatStreamNotFoundError, ChatStreamExpiredError
+from .chat_models import ChatChunk
+
+log = logging.getLogger()
+
+# 每个事件除数据外的估算开销（字节）
+_EVENT_OVERHEAD = 64
+
+
+@dataclass
+class ChatStreamEvent:
+    """
+    已发出的 SSE 事件
+    """
+
+    # 流内递增序号，作为 SSE 事件ID
+    seq: int
+    event: str
+    data: str
+
+
+class ChatStream:
+    """
+    一次流式回复，生成与连接解耦，已发出的事件保存在有界环形缓冲中
+    客户端断线后携带 Last-Event-ID 重连，只补发缺失的尾部事件再继续接收实时事件
+    """
+
+    def __init__(self, stream_id: str, owner: str, max_events: int, max_bytes: int, detach_timeout: float):
+        """
+        :param stream_id: 流ID
+        :param owner: 所属账号ID
+        :param max_events: 缓冲的最大事件数
+        :param max_bytes: 缓冲的最大字节数
+        :param detach_timeout: 无连接订阅时继续生成的时间（秒），超时后取消上游请求
+        """
+        self.id = stream_id
+        self.owner = owner
+        self._max_events = max_events
+        self._max_bytes = max_bytes
+        self._detach_timeout = detach_timeout
+
+        self._events: deque[ChatStreamEvent] = deque()
+        self._bytes = 0
+        self._last_seq = 0
+        self._done = False
+        self._changed = asyncio.Event()
+
+        # 订阅方 -> 已读取的最后序号
+        self._cursors: dict[object, int] = {}
+        self._detach_timer: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._bytes
+
+    def start(self, chunks: AsyncIterator[ChatChunk], first: Optional[ChatChunk]):
+        """
+        在后台任务中消费上游片段
+        :param chunks: 上游片段
+        :param first: 已取得的首个片段
+        """
+        self._task = asyncio.create_task(self._run(chunks, first))
+        self._schedule_detach()
+
+    def check_resumable(self, last_event_id: int):
+        """
+        校验能否从指定事件之后继续，断开期间的事件已被淘汰时抛出异常
+        """
+        if last_event_id > self._last_seq:
+            raise ChatStreamExpiredError()
+        oldest = self._events[0].seq if self._events else self._last_seq + 1
+        if last_event_id + 1 < oldest:
+            raise ChatStreamExpiredError()
+
+    async def subscribe(self, last_event_id: int = 0) -> AsyncIterator[ChatStreamEvent]:
+        """
+        订阅事件，先补发 last_event_id 之后已缓冲的事件，再接收实时事件，流结束后返回
+        :param last_event_id: 客户端已收到的最后事件ID，0 表示从头开始
+        :return: 事件
+        """
+        self.check_resumable(last_event_id)
+
+        token = object()
+        cursor = last_event_id
+        self._attach(token, cursor)
+        try:
+            while True:
+                await self._wait(lambda: self._done or self._last_seq > cursor)
+                self.check_resumable(cursor)
+
+                # 序号连续，按偏移定位；先取快照，写出期间缓冲可能继续变化
+                start = cursor + 1 - self._events[0].seq if self._events else 0
+                pending = list(islice(self._events, start, None))
+                for event in pending:
+                    yield event
+                    cursor = event.seq
+                # 每批写出后更新进度，唤醒因缓冲已满而等待的生成任务
+                self._cursors[token] = cursor
+                self._notify()
+
+                if self._done and cursor >= self._last_seq:
+                    return
+        finally:
+            self._detach(token)
+
+    async def _run(self, chunks: AsyncIterator[ChatChunk], chunk: Optional[ChatChunk]):
+        finish_reason, usage = None, None
+        try:
+            while chunk is not None:
+                if chunk.content:
+                    await self._publish('delta', {'content': chunk.content})
+                finish_reason = chunk.finish_reason or finish_reason
+                usage = chunk.usage or usage
+                chunk = await anext(chunks, None)
+            await self._publish('done', {'finish_reason': finish_reason, 'usage': usage})
+        except BaseServiceError as e:
+            await self._publish('error', {'message': e.message})
+        except asyncio.CancelledError:
+            # 长时间无人订阅被取消，告知之后重连的客户端
+            self._append('error', json.dumps({'message': '连接断开时间过长，回复已取消'}, ensure_ascii=False))
+            raise
+        except Exception as e:
+            # 上游响应异常、网络中断等，同样以 error 事件结束，避免订阅方等待到超时
+            log.exception('Chat stream %s failed: %s', self.id, e)
+            await self._publish('error', {'message': '生成回复失败'})
+        finally:
+            # 关闭上游连接，取消时模型随之停止生成
+            await chunks.aclose()
+            self._done = True
+            self.finished_at = time.monotonic()
+            self._notify()
+
+    async def _publish(self, event: str, data: dict):
+        data = json.dumps(data, ensure_ascii=False)
+        size = len(data) + _EVENT_OVERHEAD
+        # 缓冲已满且仍有订阅方未读取最早的事件时等待，慢速客户端的反压传递到上游
+        await self._wait(lambda: not self._full(size) or not self._lagging())
+        self._append(event, data)
+
+    def _append(self, event: str, data: str):
+        size = len(data) + _EVENT_OVERHEAD
+
+        # 无人等待最早的事件时直接淘汰，之后从该位置重连会得到 410
+        while self._events and self._full(size):
+            self._bytes -= len(self._events.popleft().data) + _EVENT_OVERHEAD
+
+        self._last_seq += 1
+        self._events.append(ChatStreamEvent(seq=self._last_seq, event=event, data=data))
+        self._bytes += size
+        self._notify()
+
+    def _full(self, size: int) -> bool:
+        return bool(self._events) and (len(self._events) >= self._max_events or self._bytes + size > self._max_bytes)
+
+    def _lagging(self) -> bool:
+        oldest = self._events[0].seq
+        return any(cursor < oldest for cursor in self._cursors.values())
+
+    def _notify(self):
+        # 唤醒所有等待方，并为下一轮等待准备新的事件
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _wait(self, predicate: Callable[[], bool]):
+        while not predicate():
+            await self._changed.wait()
+
+    def _attach(self, token: object, cursor: int):
+        if self._detach_timer is not None:
+            self._detach_timer.cancel()
+            self._detach_timer = None
+        self._cursors[token] = cursor
+
+    def _detach(self, token: object):
+        # 连接断开时可能处于取消状态，此处不能再 await
+        self._cursors.pop(token, None)
+        self._notify()
+        if not self._cursors:
+            self._schedule_detach()
+
+    def _schedule_detach(self):
+        if self._done or self._cursors or self._detach_timer is not None:
+            return
+        self._detach_timer = asyncio.get_running_loop().call_later(self._detach_timeout, self._cancel)
+
+    def _cancel(self):
+        self._detach_timer = None
+        if not self._cursors and self._task is not None:
+            self._task.cancel()
+
+
+class ChatStreamRegistry:
+    """
+    按流ID保存进行中及最近完成的流式回复
+    完成的流在 ttl 后过期，总缓冲超出内存预算时提前淘汰最早完成的流
+    """
+
+    def __init__(self, max_events: int = 4096, max_bytes: int = 1 << 20, max_total_bytes: int = 64 << 20,
+                 ttl: float = 300, detach_timeout: float = 30):
+        """
+        :param max_events: 每个流缓冲的最大事件数
+        :param max_bytes: 每个流缓冲的最大字节数
+        :param max_total_bytes: 所有流缓冲的总字节数
+        :param ttl: 完成后保留的时间（秒）
+        :param detach_timeout: 无连接订阅时继续生成的时间（秒）
+        """
+        self._max_events = max_events
+        self._max_bytes = max_bytes
+        self._max_total_bytes = max_total_bytes
+        self._ttl = ttl
+        self._detach_timeout = detach_timeout
+        self._streams: OrderedDict[str, ChatStream] = OrderedDict()
+
+        self.evictions = 0
+
+    def create(self, owner: str, chunks: AsyncIterator[ChatChunk], first: Optional[ChatChunk]) -> ChatStream:
+        """
+        创建流并开始在后台消费上游片段
+        :param owner: 所属账号ID
+        :param chunks: 上游片段
+        :param first: 已取得的首个片段
+        :return: 流
+        """
+        self._expire()
+        stream = ChatStream(uuid.uuid4().hex, owner, self._max_events, self._max_bytes, self._detach_timeout)
+        self._streams[stream.id] = stream
+        stream.start(chunks, first)
+        return stream
+
+    def get(self, stream_id: str, owner: str) -> ChatStream:
+        """
+        获取流，不存在、已过期或不属于该账号时抛出异常
+        """
+        self._expire()
+        stream = self._streams.get(stream_id)
+        if stream is None or stream.owner != owner:
+            raise ChatStreamNotFoundError()
+        return stream
+
+    def stats(self) -> dict:
+        self._expire()
+        return {
+            'streams': len(self._streams),
+            'running': sum(1 for stream in self._streams.values() if not stream.done),
+            'buffered_bytes': sum(stream.buffered_bytes for stream in self._streams.values()),
+            'evictions': self.evictions,
+        }
+
+    def _expire(self):
+        now = time.monotonic()
+        finished = [stream for stream in self._streams.values() if stream.done]
+        # 按完成时间先后淘汰
+        finished.sort(key=lambda stream: stream.finished_at)
+
+        total = sum(stream.buffered_bytes for stream in self._streams.values())
+        for stream in finished:
+            if stream.finished_at + self._ttl > now and total <= self._max_total_bytes:
+                break
+            del self._streams[stream.id]
+            total -= stream.buffered_bytes
+            if stream.finished_at + self._ttl > now:
+                self.evictions += 1
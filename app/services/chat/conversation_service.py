@@ -0,0 +1,154 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+from uuid import UUID
+
+from repositories.data.conversation.ConversationRepository import ConversationRepository
+from repositories.data.conversation.conversation_models import Conversation, Message, encode_cursor, decode_cursor
+from utils.errors.chat_error import ConversationNotFoundError, InvalidCursorError
+from utils.uuid7 import uuid7
+from utils.write_behind import WriteBehindBuffer
+
+
+def _decode(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise InvalidCursorError()
+
+
+class ConversationService:
+    """
+    会话服务
+    """
+
+    def __init__(self, conversation_repository: ConversationRepository, message_writer: WriteBehindBuffer[dict]):
+        """
+        :param conversation_repository: 会话及消息
+        :param message_writer: 消息的后写缓冲
+        """
+        self._conversation_repository = conversation_repository
+        self._message_writer = message_writer
+        self._last_timestamp = datetime.min.replace(tzinfo=timezone.utc)
+
+    async def create(self, account_id: str, title: str) -> Conversation:
+        """
+        创建会话
+        :param account_id: 账号ID
+        :param title: 标题
+        :return: 会话
+        """
+        return await self._conversation_repository.create(account_id, title)
+
+    async def get(self, account_id: str, conversation_id: str) -> Conversation:
+        """
+        获取账号下的会话，不存在时抛出异常
+        :param account_id: 账号ID
+        :param conversation_id: 会话ID
+        :return: 会话
+        """
+        conversation = await self._conversation_repository.find_by_id(conversation_id, account_id)
+        if conversation is None:
+            raise ConversationNotFoundError()
+        return conversation
+
+    async def list_by_account(self, account_id: str, limit: int,
+                              cursor: Optional[str] = None) -> tuple[list[Conversation], Optional[str]]:
+        """
+        按最近更新倒序分页列出会话
+        :param account_id: 账号ID
+        :param limit: 每页数量
+        :param cursor: 上一页返回的游标
+        :return: (会话, 下一页游标)，没有下一页时游标为 None
+        """
+        # 多取一条判断是否还有下一页
+        conversations = await self._conversation_repository.list_by_account(account_id, limit + 1, _decode(cursor))
+        if len(conversations) <= limit:
+            return conversations, None
+        conversations = conversations[:limit]
+        return conversations, encode_cursor(conversations[-1].updated_at, str(conversations[-1].id))
+
+    async def list_messages(self, account_id: str, conversation_id: str, limit: int,
+                            cursor: Optional[str] = None) -> tuple[list[Message], Optional[str]]:
+        """
+        按时间正序分页列出会话中的消息
+        :param account_id: 账号ID
+        :param conversation_id: 会话ID
+        :param limit: 每页数量
+        :param cursor: 上一页返回的游标
+        :return: (消息, 下一页游标)，没有下一页时游标为 None
+        """
+        conversation = await self.get(account_id, conversation_id)
+        # 先写入缓冲中的消息，保证读到刚产生的消息
+        await self._message_writer.flush()
+        messages = await self._conversation_repository.list_messages(conversation, limit + 1, _decode(cursor))
+        if len(messages) <= limit:
+            return messages, None
+        messages = messages[:limit]
+        return messages, encode_cursor(messages[-1].created_at, str(messages[-1].id))
+
+    async def iter_messages(self, account_id: str, conversation_id: str,
+                            page_size: int = 500) -> AsyncIterator[list[Message]]:
+        """
+        逐页读取会话中的全部消息，内存中只保留一页
+        :param account_id: 账号ID
+        :param conversation_id: 会话ID
+        :param page_size: 每页数量
+        :return: 每页消息
+        """
+        conversation = await self.get(account_id, conversation_id)
+        await self._message_writer.flush()
+        after = None
+        while True:
+            messages = await self._conversation_repository.list_messages(conversation, page_size, after)
+            if messages:
+                yield messages
+            if len(messages) < page_size:
+                return
+            after = (messages[-1].created_at, messages[-1].id)
+
+    async def record(self, conversation_id: str, messages: list[dict]) -> list[UUID]:
+        """
+        记录消息，放入后写缓冲即返回，由缓冲批量写入数据库；调用方需先校验会话归属
+        写入时间及ID在此时确定并单调递增，批量写入的先后不影响消息顺序
+        :param conversation_id: 会话ID
+        :param messages: [{role, content, usage?}]
+        :return: 消息ID，写入前即可使用
+        """
+        ids = []
+        for message in messages:
+            message_id = uuid7()
+            await self._message_writer.put({
+                'id': message_id,
+                'conversation_id': conversation_id,
+                'role': message['role'],
+                'content': message['content'],
+                'usage': message.get('usage'),
+                'created_at': self._timestamp(),
+            })
+            ids.append(message_id)
+        return ids
+
+    def _timestamp(self) -> datetime:
+        now = datetime.now(timezone.utc)
+        if now <= self._last_timestamp:
+            now = self._last_timestamp + timedelta(microseconds=1)
+        self._last_timestamp = now
+        return now
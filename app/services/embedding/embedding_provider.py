@@ -0,0 +1,104 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import httpx
+
+from utils.errors.embedding_error import EmbeddingProviderError
+
+log = logging.getLogger()
+
+
+class EmbeddingProvider(ABC):
+    """
+    向量模型服务
+    """
+
+    @property
+    @abstractmethod
+    def model_id(self) -> str:
+        """
+        模型标识，模型或输出维度不同的向量互不通用，用作缓存键的一部分
+        """
+        pass
+
+    @abstractmethod
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """
+        批量生成向量
+        :param texts: 文本
+        :return: 与文本一一对应的向量
+        """
+        pass
+
+    async def close(self):
+        """
+        释放连接
+        """
+        pass
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    兼容 OpenAI /embeddings 接口的向量模型服务
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str], model: str, dimensions: Optional[int] = None,
+                 timeout: float = 30):
+        """
+        :param base_url: 接口地址，如 https://api.openai.com/v1
+        :param api_key: API Key
+        :param model: 模型
+        :param dimensions: 输出维度，部分模型支持
+        :param timeout: 请求超时（秒）
+        """
+        self._model = model
+        self._dimensions = dimensions
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip('/'),
+            headers={'Authorization': f'Bearer {api_key}'} if api_key else None,
+            timeout=timeout,
+        )
+
+    @property
+    def model_id(self) -> str:
+        return f'{self._model}:{self._dimensions}' if self._dimensions else self._model
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        payload = {'model': self._model, 'input': texts, 'encoding_format': 'float'}
+        if self._dimensions:
+            payload['dimensions'] = self._dimensions
+
+        try:
+            response = await self._client.post('/embeddings', json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            log.error('Embedding request failed: %s', e)
+            raise EmbeddingProviderError() from e
+
+        try:
+            data = sorted(response.json()['data'], key=lambda item: item['index'])
+            return [item['embedding'] for item in data]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            # 响应格式不符
+            log.error('Invalid embedding response: %s %s', e, response.text[:200])
+            raise EmbeddingProviderError() from e
+
+    async def close(self):
+        await self._client.aclose()
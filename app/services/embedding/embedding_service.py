@@ -0,0 +1,161 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Optional
+
+from repositories.data.embedding.EmbeddingCacheRepository import EmbeddingCacheRepository
+from utils.cache import TTLCache, MISSING
+from utils.errors.embedding_error import EmbeddingError
+from utils.micro_batcher import MicroBatcher
+from .embedding_provider import EmbeddingProvider
+
+log = logging.getLogger()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf8')).hexdigest()
+
+
+class EmbeddingService:
+    """
+    向量生成服务
+    按 内容HASH + 模型标识 缓存，先查本地缓存，再查持久化缓存，最后请求模型服务
+    并发的单条请求经微批处理合并为批量请求，相同内容的并发请求只计算一次
+    """
+
+    def __init__(self, provider: EmbeddingProvider, cache: TTLCache,
+                 cache_repository: Optional[EmbeddingCacheRepository] = None,
+                 max_batch_size: int = 64, max_wait_ms: float = 10, max_concurrency: int = 4):
+        """
+        :param provider: 向量模型服务
+        :param cache: 本地缓存
+        :param cache_repository: 持久化缓存，None 时不持久化
+        :param max_batch_size: 单次请求模型服务的最大文本数
+        :param max_wait_ms: 合并请求的最长等待时间（毫秒）
+        :param max_concurrency: 同时请求模型服务的批次数
+        """
+        self._provider = provider
+        self._cache = cache
+        self._cache_repository = cache_repository
+        self._batcher: MicroBatcher[tuple[str, str], list[float]] = MicroBatcher(
+            self._embed_batch,
+            max_batch_size=max_batch_size,
+            max_wait=max_wait_ms / 1000,
+            max_concurrency=max_concurrency,
+        )
+        # 计算中的内容HASH -> 结果
+        self._inflight: dict[str, asyncio.Future] = {}
+
+        self.provider_calls = 0
+        self.provider_texts = 0
+        self.repository_hits = 0
+
+    @property
+    def model_id(self) -> str:
+        return self._provider.model_id
+
+    async def embed(self, text: str) -> list[float]:
+        """
+        生成单条文本的向量
+        """
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: list[str]) -> list[list[float]]:
+        """
+        批量生成向量
+        :param texts: 文本
+        :return: 与文本一一对应的向量
+        """
+        model_id = self.model_id
+        hashes = [content_hash(text) for text in texts]
+
+        embeddings: dict[str, list[float]] = {}
+        missing: dict[str, str] = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash in embeddings or text_hash in missing:
+                continue
+            embedding = self._cache.get((model_id, text_hash))
+            if embedding is MISSING:
+                missing[text_hash] = text
+            else:
+                embeddings[text_hash] = embedding
+
+        if missing:
+            loaded = await asyncio.gather(*(self._load(text_hash, text) for text_hash, text in missing.items()))
+            embeddings.update(zip(missing.keys(), loaded))
+
+        # 返回副本，避免调用方修改缓存
+        return [list(embeddings[text_hash]) for text_hash in hashes]
+
+    async def _load(self, text_hash: str, text: str) -> list[float]:
+        future = self._inflight.get(text_hash)
+        if future is None:
+            future = asyncio.ensure_future(self._batcher.submit((text_hash, text)))
+            self._inflight[text_hash] = future
+            future.add_done_callback(lambda _: self._inflight.pop(text_hash, None))
+        # 单个调用方取消时不影响其他等待相同内容的调用方
+        return await asyncio.shield(future)
+
+    async def _embed_batch(self, items: list[tuple[str, str]]) -> list[list[float]]:
+        model_id = self.model_id
+        hashes = [text_hash for text_hash, _ in items]
+
+        embeddings: dict[str, list[float]] = {}
+        if self._cache_repository is not None:
+            try:
+                embeddings = await self._cache_repository.find_many(model_id, hashes)
+                self.repository_hits += len(embeddings)
+            except Exception as e:
+                # 持久化缓存不可用时直接请求模型服务
+                log.warning('Failed to read embedding cache: %s', e)
+
+        missing = [(text_hash, text) for text_hash, text in items if text_hash not in embeddings]
+        if missing:
+            self.provider_calls += 1
+            self.provider_texts += len(missing)
+            vectors = await self._provider.embed([text for _, text in missing])
+            if len(vectors) != len(missing):
+                log.warning('Embedding provider returned %d vectors for %d texts', len(vectors), len(missing))
+                raise EmbeddingError()
+            created = dict(zip([text_hash for text_hash, _ in missing], vectors))
+            embeddings.update(created)
+
+            if self._cache_repository is not None:
+                try:
+                    await self._cache_repository.save_many(model_id, created)
+                except Exception as e:
+                    log.warning('Failed to write embedding cache: %s', e)
+
+        for text_hash in hashes:
+            self._cache.set((model_id, text_hash), embeddings[text_hash])
+        return [embeddings[text_hash] for text_hash in hashes]
+
+    def stats(self) -> dict:
+        """
+        缓存及批处理统计信息
+        """
+        return {
+            'model': self.model_id,
+            'cache': self._cache.stats(),
+            'repository_hits': self.repository_hits,
+            'provider_calls': self.provider_calls,
+            'provider_texts': self.provider_texts,
+            'batcher': self._batcher.stats(),
+            'inflight': len(self._inflight),
+        }
@@ -0,0 +1,63 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from dataclasses import dataclass, field
+
+# 文档导入的后台任务类型，参数与 IngestionPipeline.ingest 一致
+INGEST_DOCUMENT_JOB = 'ingest_document'
+
+
+@dataclass
+class StageStats:
+    """
+    流水线阶段的统计
+
+    Attributes:
+        items: 处理的数量（读取阶段为字节数，其余为片段数）
+        busy_seconds: 处理耗时，不含等待上下游的时间
+        blocked_seconds: 因下游队列已满而等待的时间，持续偏高说明下游是瓶颈
+    """
+
+    items: int = 0
+    busy_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    def add(self, other: 'StageStats'):
+        self.items += other.items
+        self.busy_seconds += other.busy_seconds
+        self.blocked_seconds += other.blocked_seconds
+
+    def as_dict(self) -> dict:
+        return {
+            'items': self.items,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'blocked_seconds': round(self.blocked_seconds, 3),
+            'items_per_second': round(self.items / self.busy_seconds, 1) if self.busy_seconds else 0,
+        }
+
+
+@dataclass
+class IngestionResult:
+    """
+    单个文档的导入结果
+    """
+
+    key: str
+    collection: str
+    bytes: int
+    chunks: int
+    seconds: float
+    stages: dict[str, dict] = field(default_factory=dict)
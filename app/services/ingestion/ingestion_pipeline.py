@@ -0,0 +1,214 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import AsyncIterator, Awaitable, Optional
+
+from repositories.oss.OssRepository import OssRepository
+from repositories.vector.VectorRepository import VectorRepository, validate_collection
+from repositories.vector.vector_models import VectorDocument
+from services.embedding.embedding_service import EmbeddingService
+from utils.errors.embedding_error import EmbeddingError
+from .ingestion_models import StageStats, IngestionResult
+from .text_extraction import TextChunker, decode_text, text_extractor
+
+# 队列结束标记
+_END = None
+
+
+class IngestionPipeline:
+    """
+    文档导入流水线：读取对象 -> 提取并切分文本 -> 批量生成向量 -> 批量写入向量库
+    各阶段以有界队列连接，下游变慢时上游随之等待，任一时刻内存中只有有限的几个批次；
+    向量生成阶段并发多个批次，吞吐受模型服务而非流水线本身限制
+    """
+
+    def __init__(self, oss_repository: OssRepository, embedding_service: EmbeddingService,
+                 vector_repository: VectorRepository, chunk_size: int = 1000, chunk_overlap: int = 100,
+                 embed_batch_size: int = 64, embed_concurrency: int = 4, upsert_batch_size: int = 256,
+                 queue_size: int = 4):
+        """
+        :param oss_repository: 对象存储
+        :param embedding_service: 向量服务
+        :param vector_repository: 向量库
+        :param chunk_size: 片段最大字符数
+        :param chunk_overlap: 相邻片段重叠的字符数
+        :param embed_batch_size: 每次生成向量的片段数
+        :param embed_concurrency: 同时生成向量的批次数
+        :param upsert_batch_size: 每次写入向量库的文档数
+        :param queue_size: 阶段之间队列的最大批次数
+        """
+        self._oss_repository = oss_repository
+        self._embedding_service = embedding_service
+        self._vector_repository = vector_repository
+        self._chunker = TextChunker(chunk_size, chunk_overlap)
+        self._embed_batch_size = embed_batch_size
+        self._embed_concurrency = embed_concurrency
+        self._upsert_batch_size = upsert_batch_size
+        self._queue_size = queue_size
+
+        self.documents = 0
+        self.failures = 0
+        self._stats = {'read': StageStats(), 'chunk': StageStats(), 'embed': StageStats(), 'upsert': StageStats()}
+
+    async def ingest(self, key: str, collection: str, metadata: Optional[dict] = None) -> IngestionResult:
+        """
+        导入单个文档，文档ID由对象键及片段序号确定，重复导入时替换该对象键之前导入的所有片段
+        :param key: 对象键
+        :param collection: 向量集合，不存在时按向量维度创建
+        :param metadata: 附加到每个片段的元数据
+        :return: 导入结果
+        """
+        validate_collection(collection)
+        oss_object = await self._oss_repository.head_object(key)
+        extract, encoding = text_extractor(oss_object.content_type, key)
+
+        started = time.perf_counter()
+        stats = {name: StageStats() for name in self._stats}
+        chunks: asyncio.Queue = asyncio.Queue(self._queue_size)
+        documents: asyncio.Queue = asyncio.Queue(self._queue_size)
+        prefix = hashlib.sha1(key.encode()).hexdigest()[:16]
+        base_metadata = {**(metadata or {}), 'key': key}
+
+        async def read() -> AsyncIterator[bytes]:
+            # 读取对象，统计读取耗时及字节数
+            stream = self._oss_repository.get_object(key)
+            try:
+                while True:
+                    begin = time.perf_counter()
+                    data = await anext(stream, None)
+                    stats['read'].busy_seconds += time.perf_counter() - begin
+                    if data is None:
+                        return
+                    stats['read'].items += len(data)
+                    yield data
+            finally:
+                await stream.aclose()
+
+        async def put(queue: asyncio.Queue, item, stage: StageStats):
+            begin = time.perf_counter()
+            await queue.put(item)
+            stage.blocked_seconds += time.perf_counter() - begin
+
+        async def chunk_stage():
+            # 切分耗时包含读取，扣除读取阶段的耗时
+            batch, index = [], 0
+            texts = self._chunker.split(extract(decode_text(read(), encoding)))
+            begin = time.perf_counter()
+            async for text in texts:
+                batch.append((index, text))
+                index += 1
+                if len(batch) >= self._embed_batch_size:
+                    stats['chunk'].busy_seconds += time.perf_counter() - begin
+                    await put(chunks, batch, stats['chunk'])
+                    batch, begin = [], time.perf_counter()
+            stats['chunk'].busy_seconds += time.perf_counter() - begin
+            stats['chunk'].busy_seconds -= stats['read'].busy_seconds
+            stats['chunk'].items = index
+            if batch:
+                await put(chunks, batch, stats['chunk'])
+            for _ in range(self._embed_concurrency):
+                await chunks.put(_END)
+
+        async def embed_stage():
+            while (batch := await chunks.get()) is not _END:
+                begin = time.perf_counter()
+                embeddings = await self._embedding_service.embed_many([text for _, text in batch])
+                if len(embeddings) != len(batch):
+                    raise EmbeddingError()
+                stats['embed'].busy_seconds += time.perf_counter() - begin
+                stats['embed'].items += len(batch)
+                await put(documents, [
+                    VectorDocument(id=f'{prefix}-{index}', content=text, embedding=embedding,
+                                   metadata={**base_metadata, 'chunk': index})
+                    for (index, text), embedding in zip(batch, embeddings)
+                ], stats['embed'])
+            await documents.put(_END)
+
+        async def upsert_stage():
+            pending: list[VectorDocument] = []
+            created = False
+            finished = 0
+            while finished < self._embed_concurrency:
+                batch = await documents.get()
+                if batch is _END:
+                    finished += 1
+                else:
+                    pending.extend(batch)
+                while len(pending) >= self._upsert_batch_size or (finished == self._embed_concurrency and pending):
+                    batch, pending = pending[:self._upsert_batch_size], pending[self._upsert_batch_size:]
+                    begin = time.perf_counter()
+                    if not created:
+                        await self._vector_repository.create_collection(collection, len(batch[0].embedding))
+                        # 新版本的片段可能更少，先删除之前导入的片段，避免多出的旧片段仍可被检索到
+                        await self._vector_repository.delete_by_metadata(collection, {'key': key})
+                        created = True
+                    await self._vector_repository.upsert(collection, batch)
+                    stats['upsert'].busy_seconds += time.perf_counter() - begin
+                    stats['upsert'].items += len(batch)
+            if not created:
+                # 新版本没有文本时同样删除之前导入的片段
+                await self._vector_repository.delete_by_metadata(collection, {'key': key})
+
+        try:
+            await _run_stages(
+                chunk_stage(),
+                *(embed_stage() for _ in range(self._embed_concurrency)),
+                upsert_stage(),
+            )
+        except BaseException:
+            self.failures += 1
+            raise
+
+        self.documents += 1
+        for name, stage in stats.items():
+            self._stats[name].add(stage)
+        return IngestionResult(
+            key=key,
+            collection=collection,
+            bytes=stats['read'].items,
+            chunks=stats['chunk'].items,
+            seconds=round(time.perf_counter() - started, 3),
+            stages={name: stage.as_dict() for name, stage in stats.items()},
+        )
+
+    def stats(self) -> dict:
+        """
+        各阶段的累计统计
+        """
+        return {
+            'documents': self.documents,
+            'failures': self.failures,
+            'stages': {name: stage.as_dict() for name, stage in self._stats.items()},
+        }
+
+
+async def _run_stages(*stages: Awaitable):
+    """
+    并发运行各阶段，任一阶段失败时取消其余阶段并抛出该异常
+    """
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,170 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import codecs
+import os
+from html.parser import HTMLParser
+from typing import AsyncIterable, AsyncIterator, Callable, Optional
+
+from utils.errors.ingestion_error import UnsupportedDocumentError
+
+# 按扩展名识别未声明内容类型的文本
+_TEXT_EXTENSIONS = {'.txt', '.md', '.markdown', '.csv', '.json', '.jsonl', '.xml', '.yml', '.yaml', '.log'}
+_HTML_EXTENSIONS = {'.html', '.htm'}
+
+
+async def decode_text(chunks: AsyncIterable[bytes], encoding: str = 'utf-8') -> AsyncIterator[str]:
+    """
+    增量解码，多字节字符跨块时由解码器暂存，无法解码的字节替换为占位符
+    :param chunks: 内容块
+    :param encoding: 编码
+    :return: 文本片段
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+class _HtmlTextParser(HTMLParser):
+    _SKIP_TAGS = {'script', 'style', 'noscript', 'template'}
+    _BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'section', 'article', 'header', 'footer',
+                   'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'blockquote', 'table'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skip = 0
+        self._parts: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP_TAGS:
+            self._skip += 1
+        elif tag in self._BLOCK_TAGS:
+            self._parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP_TAGS:
+            self._skip = max(self._skip - 1, 0)
+        elif tag in self._BLOCK_TAGS:
+            self._parts.append('\n\n' if tag != 'br' else '\n')
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._parts.append(data)
+
+    def drain(self) -> str:
+        text = ''.join(self._parts)
+        self._parts.clear()
+        return text
+
+
+async def html_text(texts: AsyncIterable[str]) -> AsyncIterator[str]:
+    """
+    增量提取 HTML 中的文本，忽略脚本及样式，块级元素转换为换行
+    """
+    parser = _HtmlTextParser()
+    async for text in texts:
+        parser.feed(text)
+        if text := parser.drain():
+            yield text
+    parser.close()
+    if text := parser.drain():
+        yield text
+
+
+async def plain_text(texts: AsyncIterable[str]) -> AsyncIterator[str]:
+    async for text in texts:
+        yield text
+
+
+def text_extractor(content_type: Optional[str], key: str) -> tuple[Callable[[AsyncIterable[str]], AsyncIterator[str]], str]:
+    """
+    按内容类型或扩展名选择文本提取方式
+    :param content_type: 内容类型，可包含 charset
+    :param key: 对象键
+    :return: (提取函数, 编码)，不支持的类型或编码抛出 UnsupportedDocumentError
+    """
+    media_type, _, params = (content_type or '').partition(';')
+    media_type = media_type.strip().lower()
+    encoding = 'utf-8'
+    for param in params.split(';'):
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset' and value.strip():
+            encoding = value.strip().strip('"')
+    try:
+        # 编码来自客户端声明的内容类型，未知编码及 base64 等非文本编码均抛出 LookupError
+        encoding = codecs.lookup(encoding).name
+        b' '.decode(encoding, 'ignore')
+    except LookupError:
+        raise UnsupportedDocumentError(f'不支持的文本编码：{encoding}')
+
+    extension = os.path.splitext(key)[1].lower()
+    if media_type in ('text/html', 'application/xhtml+xml') or extension in _HTML_EXTENSIONS:
+        return html_text, encoding
+    if media_type.startswith('text/') or media_type in ('application/json', 'application/xml') \
+            or extension in _TEXT_EXTENSIONS:
+        return plain_text, encoding
+    raise UnsupportedDocumentError(f'不支持的文档类型：{media_type or extension or key}')
+
+
+class TextChunker:
+    """
+    增量切分文本，优先在段落、换行、句子、空白处切分，相邻片段保留重叠部分
+    内存中只保留不超过一个片段长度的未切分文本
+    """
+
+    # 优先级由高到低
+    _SEPARATORS = ('\n\n', '\n', '。', '！', '？', '. ', '! ', '? ', '；', '; ', '，', ', ', ' ')
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 100):
+        """
+        :param chunk_size: 片段最大字符数
+        :param overlap: 相邻片段重叠的字符数，需小于片段长度的一半
+        """
+        if not 0 <= overlap < chunk_size // 2:
+            raise ValueError('overlap must be less than half of chunk_size')
+        self._chunk_size = chunk_size
+        self._overlap = overlap
+
+    async def split(self, texts: AsyncIterable[str]) -> AsyncIterator[str]:
+        """
+        :param texts: 文本片段
+        :return: 切分后的片段，不含空白片段
+        """
+        # 以偏移量推进，单个很长的文本片段也只在读入时复制一次
+        buffer, start = '', 0
+        async for text in texts:
+            buffer, start = buffer[start:] + text, 0
+            while len(buffer) - start > self._chunk_size:
+                cut = self._boundary(buffer, start)
+                if chunk := buffer[start:cut].strip():
+                    yield chunk
+                start = cut - self._overlap
+        if chunk := buffer[start:].strip():
+            yield chunk
+
+    def _boundary(self, buffer: str, start: int) -> int:
+        # 只在后半段寻找切分点，保证每次至少前进半个片段
+        lower, upper = start + self._chunk_size // 2, start + self._chunk_size
+        for separator in self._SEPARATORS:
+            position = buffer.rfind(separator, lower, upper)
+            if position >= 0:
+                return position + len(separator)
+        return upper
@@ -0,0 +1,75 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from datetime import timedelta
+from typing import Optional
+
+from repositories.data.job.JobRepository import JobRepository
+from repositories.data.job.job_models import Job
+from utils.errors.job_error import JobNotFoundError
+
+
+class JobService:
+    """
+    后台任务，由 worker.py 启动的执行进程处理
+    """
+
+    def __init__(self, job_repository: JobRepository, default_queue: str = 'default', max_attempts: int = 5):
+        """
+        :param job_repository: 任务队列
+        :param default_queue: 默认队列
+        :param max_attempts: 默认的最大执行次数
+        """
+        self._job_repository = job_repository
+        self._default_queue = default_queue
+        self._max_attempts = max_attempts
+
+    async def enqueue(self, kind: str, payload: dict, queue: Optional[str] = None, delay: float = 0,
+                      max_attempts: Optional[int] = None, account_id: Optional[str] = None) -> Job:
+        """
+        添加任务
+        :param kind: 任务类型，需在执行进程中注册处理函数
+        :param payload: 处理函数的参数，需可序列化为JSON
+        :param queue: 队列，默认 default_queue
+        :param delay: 延迟执行的时间（秒）
+        :param max_attempts: 最大执行次数
+        :param account_id: 提交任务的账号
+        :return: 任务
+        """
+        return await self._job_repository.enqueue(
+            queue or self._default_queue, kind, payload, max_attempts or self._max_attempts,
+            timedelta(seconds=delay) if delay > 0 else None, account_id,
+        )
+
+    async def get(self, job_id: str, kind: Optional[str] = None, account_id: Optional[str] = None) -> Job:
+        """
+        获取任务
+        :param job_id: 任务ID
+        :param kind: 任务类型，指定时类型不符视为不存在
+        :param account_id: 账号，指定时其他账号提交的任务视为不存在
+        :return: 任务
+        """
+        job = await self._job_repository.find_by_id(job_id)
+        if job is None or (kind is not None and job.kind != kind):
+            raise JobNotFoundError()
+        if account_id is not None and str(job.account_id) != account_id:
+            raise JobNotFoundError()
+        return job
+
+    async def stats(self) -> list[dict]:
+        """
+        各队列各状态的任务数
+        """
+        return await self._job_repository.stats()
@@ -0,0 +1,242 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import asyncio
+import dataclasses
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+
+from repositories.data.job.JobRepository import JobRepository
+from repositories.data.job.job_models import Job
+
+log = logging.getLogger()
+
+
+def _as_result(value) -> Optional[dict]:
+    if value is None:
+        return None
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    if isinstance(value, dict):
+        return value
+    return {'value': value}
+
+
+class JobWorker:
+    """
+    后台任务执行者
+    批量领取任务后并发执行，执行期间定期续约；失败按指数退避重试，执行者失联时任务在租约到期后被其他执行者接管
+    同一任务可能被执行多次（如续约失败后被接管），处理函数需可重复执行
+    """
+
+    def __init__(self, job_repository: JobRepository, handlers: dict[str, Callable[..., Awaitable]],
+                 queues: list[str], batch_size: int = 10, concurrency: int = 4, poll_interval: float = 1,
+                 visibility_timeout: float = 300, retry_backoff: float = 5, max_backoff: float = 3600,
+                 shutdown_timeout: float = 30, retention: float = 7 * 86400, purge_interval: float = 3600):
+        """
+        :param job_repository: 任务队列
+        :param handlers: 任务类型 -> 处理函数，以任务参数作为关键字参数调用
+        :param queues: 处理的队列
+        :param batch_size: 单次最多领取的任务数
+        :param concurrency: 同时执行的任务数
+        :param poll_interval: 队列为空时的轮询间隔（秒）
+        :param visibility_timeout: 租约时长（秒），执行期间每隔三分之一租约续约一次
+        :param retry_backoff: 首次重试的延迟（秒），之后逐次翻倍
+        :param max_backoff: 重试延迟的上限（秒）
+        :param shutdown_timeout: 退出时等待执行中任务的最长时间（秒），超时的任务归还队列
+        :param retention: 完成及最终失败的任务保留的时间（秒）
+        :param purge_interval: 清理结束任务的间隔（秒）
+        """
+        self._job_repository = job_repository
+        self._handlers = handlers
+        self._queues = queues
+        self._batch_size = batch_size
+        self._concurrency = concurrency
+        self._poll_interval = poll_interval
+        self._visibility_timeout = timedelta(seconds=visibility_timeout)
+        self._retry_backoff = retry_backoff
+        self._max_backoff = max_backoff
+        self._shutdown_timeout = shutdown_timeout
+        self._retention = timedelta(seconds=retention)
+        self._purge_interval = purge_interval
+
+        self._worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._running: dict[asyncio.Task, Job] = {}
+        self._stopping = asyncio.Event()
+
+        self.claimed = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+    @property
+    def worker_id(self) -> str:
+        return self._worker_id
+
+    def stop(self):
+        """
+        停止领取新任务，run 在执行中的任务结束（或超时归还）后返回
+        """
+        self._stopping.set()
+
+    async def run(self):
+        """
+        持续领取并执行任务，直到 stop
+        """
+        log.info('Job worker %s started, queues %s', self._worker_id, self._queues)
+        heartbeat = asyncio.create_task(self._heartbeat())
+        purger = asyncio.create_task(self._purge())
+        try:
+            while not self._stopping.is_set():
+                free = self._concurrency - len(self._running)
+                if free <= 0:
+                    await self._wait(set(self._running))
+                    continue
+
+                limit = min(free, self._batch_size)
+                try:
+                    jobs = await self._job_repository.claim(
+                        self._queues, limit, self._worker_id, self._visibility_timeout,
+                    )
+                except Exception as e:
+                    log.warning('Failed to claim jobs: %s', e)
+                    jobs = []
+
+                self.claimed += len(jobs)
+                for job in jobs:
+                    task = asyncio.create_task(self._execute(job))
+                    self._running[task] = job
+                    task.add_done_callback(self._running.pop)
+
+                # 领满时队列可能还有积压，立即继续领取；否则等待轮询间隔或有任务结束
+                if len(jobs) < limit:
+                    await self._wait(set(self._running), self._poll_interval)
+        finally:
+            await self._shutdown()
+            heartbeat.cancel()
+            purger.cancel()
+            await asyncio.gather(heartbeat, purger, return_exceptions=True)
+            log.info('Job worker %s stopped', self._worker_id)
+
+    async def _wait(self, tasks: set[asyncio.Task], timeout: Optional[float] = None):
+        stopping = asyncio.create_task(self._stopping.wait())
+        try:
+            await asyncio.wait(tasks | {stopping}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopping.cancel()
+
+    async def _shutdown(self):
+        if not self._running:
+            return
+        _, pending = await asyncio.wait(set(self._running), timeout=self._shutdown_timeout)
+        if not pending:
+            return
+
+        # 未能按时结束的任务取消后归还，其他执行者可立即领取
+        job_ids = [self._running[task].id for task in pending]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        try:
+            released = await self._job_repository.release(job_ids, self._worker_id)
+            log.info('Job worker %s released %d unfinished jobs', self._worker_id, released)
+        except Exception as e:
+            log.warning('Failed to release jobs, they will be reclaimed after visibility timeout: %s', e)
+
+    async def _execute(self, job: Job):
+        handler = self._handlers.get(job.kind)
+        if handler is None:
+            await self._fail(job, f'Unknown job kind: {job.kind}', retry=False)
+            return
+        if job.attempts > job.max_attempts:
+            # 多次执行超时未完成（执行者失联或续约失败）
+            await self._fail(job, job.last_error or 'Visibility timeout exceeded', retry=False)
+            return
+
+        started = time.perf_counter()
+        try:
+            result = await handler(**job.payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning('Job %s (%s) attempt %d failed: %r', job.id, job.kind, job.attempts, e)
+            await self._fail(job, repr(e), retry=job.attempts < job.max_attempts)
+            return
+
+        try:
+            if await self._job_repository.complete(job.id, self._worker_id, _as_result(result)):
+                self.completed += 1
+            else:
+                log.warning('Job %s (%s) was taken over before completion', job.id, job.kind)
+        except Exception as e:
+            log.warning('Failed to complete job %s, it may run again: %s', job.id, e)
+        log.debug('Job %s (%s) finished in %.3fs', job.id, job.kind, time.perf_counter() - started)
+
+    async def _fail(self, job: Job, error: str, retry: bool):
+        retry_delay = None
+        if retry:
+            # 指数退避加随机抖动，避免同时失败的任务同时重试
+            backoff = min(self._retry_backoff * 2 ** (job.attempts - 1), self._max_backoff)
+            retry_delay = timedelta(seconds=backoff * random.uniform(0.5, 1))
+        try:
+            await self._job_repository.fail(job.id, self._worker_id, error, retry_delay)
+            if retry:
+                self.retried += 1
+            else:
+                self.failed += 1
+        except Exception as e:
+            log.warning('Failed to record failure of job %s: %s', job.id, e)
+
+    async def _heartbeat(self):
+        interval = self._visibility_timeout.total_seconds() / 3
+        while True:
+            await asyncio.sleep(interval)
+            job_ids = [job.id for job in self._running.values()]
+            if not job_ids:
+                continue
+            try:
+                await self._job_repository.extend(job_ids, self._worker_id, self._visibility_timeout)
+            except Exception as e:
+                log.warning('Failed to extend job leases: %s', e)
+
+    async def _purge(self):
+        while True:
+            try:
+                purged = await self._job_repository.purge(self._retention)
+                if purged:
+                    log.info('Purged %d finished jobs', purged)
+            except Exception as e:
+                log.warning('Failed to purge finished jobs: %s', e)
+            await asyncio.sleep(self._purge_interval)
+
+    def stats(self) -> dict:
+        """
+        执行统计
+        """
+        return {
+            'worker': self._worker_id,
+            'queues': self._queues,
+            'running': len(self._running),
+            'claimed': self.claimed,
+            'completed': self.completed,
+            'retried': self.retried,
+            'failed': self.failed,
+        }
@@ -0,0 +1,57 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from repositories.data.knowledge.KnowledgeCollectionRepository import KnowledgeCollectionRepository
+from repositories.data.knowledge.knowledge_models import KnowledgeCollection
+from utils.errors.knowledge_error import KnowledgeCollectionConflictError, KnowledgeCollectionNotFoundError
+
+
+class KnowledgeCollectionService:
+    """
+    知识库归属，账号只能向自己的知识库导入文档及在其中检索
+    """
+
+    def __init__(self, collection_repository: KnowledgeCollectionRepository):
+        """
+        :param collection_repository: 知识库归属仓储
+        """
+        self._collection_repository = collection_repository
+
+    async def claim(self, account_id: str, collection: str) -> KnowledgeCollection:
+        """
+        获取账号的知识库，不存在时创建并归属该账号
+        :param account_id: 账号ID
+        :param collection: 集合名
+        :return: 知识库，属于其他账号时抛出 KnowledgeCollectionConflictError
+        """
+        knowledge_collection = await self._collection_repository.find_by_name(collection)
+        if knowledge_collection is None:
+            knowledge_collection = await self._collection_repository.create(collection, account_id)
+        if str(knowledge_collection.account_id) != account_id:
+            raise KnowledgeCollectionConflictError()
+        return knowledge_collection
+
+    async def get(self, account_id: str, collection: str) -> KnowledgeCollection:
+        """
+        获取账号的知识库
+        :param account_id: 账号ID
+        :param collection: 集合名
+        :return: 知识库，不存在或属于其他账号时抛出 KnowledgeCollectionNotFoundError
+        """
+        knowledge_collection = await self._collection_repository.find_by_name(collection)
+        if knowledge_collection is None or str(knowledge_collection.account_id) != account_id:
+            raise KnowledgeCollectionNotFoundError()
+        return knowledge_collection
@@ -0,0 +1,74 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from typing import Optional
+
+from repositories.vector.VectorRepository import VectorRepository, Reranker
+from repositories.vector.vector_models import VectorSearchResult
+from services.embedding.embedding_service import EmbeddingService
+
+
+class KnowledgeSearchService:
+    """
+    知识库检索
+    """
+
+    def __init__(self, embedding_service: EmbeddingService, vector_repository: VectorRepository,
+                 candidates: int = 40, rrf_k: int = 60, vector_weight: float = 1.0, lexical_weight: float = 1.0,
+                 reranker: Optional[Reranker] = None, rerank_candidates: int = 20):
+        """
+        :param embedding_service: 向量服务
+        :param vector_repository: 向量仓储
+        :param candidates: 混合检索时每一路的候选数
+        :param rrf_k: 倒数排名融合的平滑常数
+        :param vector_weight: 向量检索的融合权重
+        :param lexical_weight: 全文检索的融合权重
+        :param reranker: 重排，None 时直接返回融合结果
+        :param rerank_candidates: 交给重排的候选数
+        """
+        self._embedding_service = embedding_service
+        self._vector_repository = vector_repository
+        self._candidates = candidates
+        self._rrf_k = rrf_k
+        self._weights = (vector_weight, lexical_weight)
+        self._reranker = reranker
+        self._rerank_candidates = rerank_candidates
+
+    async def search(self, collection: str, query: str, top_k: int = 10, filters: Optional[dict] = None,
+                     mode: str = 'hybrid') -> list[VectorSearchResult]:
+        """
+        检索
+        :param collection: 向量集合
+        :param query: 查询文本
+        :param top_k: 返回数量
+        :param filters: 元数据过滤
+        :param mode: hybrid（混合）| vector（仅向量）| lexical（仅全文）
+        :return: 结果
+        """
+        if mode == 'lexical':
+            return await self._vector_repository.lexical_search(collection, query, top_k, filters)
+        if mode == 'vector':
+            embedding = await self._embedding_service.embed(query)
+            return await self._vector_repository.search(collection, embedding, top_k, filters)
+
+        # 查询向量的生成与全文检索并发进行
+        return await self._vector_repository.hybrid_search(
+            collection, query, self._embedding_service.embed(query), top_k, filters,
+            candidates=max(self._candidates, top_k),
+            rrf_k=self._rrf_k,
+            weights=self._weights,
+            rerank=self._reranker,
+            rerank_candidates=max(self._rerank_candidates, top_k),
+        )
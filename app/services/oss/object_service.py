@@ -0,0 +1,93 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import dataclasses
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from repositories.oss.OssRepository import OssRepository, validate_key
+from repositories.oss.oss_models import OssObject
+
+
+def account_object_key(account_id: str, key: str) -> str:
+    """
+    账号的对象键在存储中的实际键，每个账号的对象位于以账号ID为前缀的独立命名空间中
+    :param account_id: 账号ID
+    :param key: 账号内的对象键
+    """
+    return f'{account_id}/{validate_key(key)}'
+
+
+class ObjectService:
+    """
+    账号文件，对象键按账号隔离，账号只能访问自己命名空间中的对象
+    """
+
+    def __init__(self, oss_repository: OssRepository):
+        """
+        :param oss_repository: 对象存储
+        """
+        self._oss_repository = oss_repository
+
+    async def put_object(self, account_id: str, key: str, stream: AsyncIterable[bytes],
+                         content_type: Optional[str] = None) -> OssObject:
+        """
+        流式写入对象，已存在时覆盖
+        :param account_id: 账号ID
+        :param key: 账号内的对象键
+        :param stream: 内容
+        :param content_type: 内容类型
+        :return: 对象信息，键为账号内的对象键
+        """
+        oss_object = await self._oss_repository.put_object(account_object_key(account_id, key), stream, content_type)
+        return dataclasses.replace(oss_object, key=key)
+
+    async def head_object(self, account_id: str, key: str) -> OssObject:
+        """
+        获取对象信息，不存在时抛出 OssObjectNotFoundError
+        :param account_id: 账号ID
+        :param key: 账号内的对象键
+        :return: 对象信息，键为账号内的对象键
+        """
+        oss_object = await self._oss_repository.head_object(account_object_key(account_id, key))
+        return dataclasses.replace(oss_object, key=key)
+
+    def get_object(self, account_id: str, key: str, offset: int = 0,
+                   length: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        流式读取对象
+        :param account_id: 账号ID
+        :param key: 账号内的对象键
+        :param offset: 起始位置
+        :param length: 读取长度，None 时读取到末尾
+        :return: 内容块
+        """
+        return self._oss_repository.get_object(account_object_key(account_id, key), offset, length)
+
+    async def local_path(self, account_id: str, key: str) -> Optional[str]:
+        """
+        对象在本地文件系统中的路径，非本地存储返回 None
+        :param account_id: 账号ID
+        :param key: 账号内的对象键
+        """
+        return await self._oss_repository.local_path(account_object_key(account_id, key))
+
+    async def delete_object(self, account_id: str, key: str):
+        """
+        删除对象，不存在时忽略
+        :param account_id: 账号ID
+        :param key: 账号内的对象键
+        """
+        await self._oss_repository.delete_object(account_object_key(account_id, key))
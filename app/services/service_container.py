@@ -14,10 +14,29 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import operator
+
 from dependency_injector import containers, providers
 
 from repositories import DataContainer, OssContainer, VectorContainer
+from utils.cache import TTLCache
+from utils.password_hasher import PasswordHasher, init_password_hasher
+from utils.write_behind import WriteBehindBuffer
 from .account.account_service import AccountService
+from .account.account_token import TokenRevocationList
+from .chat.chat_provider import ChatProvider, OpenAIChatProvider
+from .chat.chat_service import ChatService
+from .chat.chat_stream import ChatStreamRegistry
+from .chat.conversation_service import ConversationService
+from .embedding.embedding_provider import EmbeddingProvider, OpenAIEmbeddingProvider
+from .embedding.embedding_service import EmbeddingService
+from .ingestion.ingestion_models import INGEST_DOCUMENT_JOB
+from .ingestion.ingestion_pipeline import IngestionPipeline
+from .job.job_service import JobService
+from .job.job_worker import JobWorker
+from .knowledge.knowledge_collection_service import KnowledgeCollectionService
+from .knowledge.knowledge_search_service import KnowledgeSearchService
+from .oss.object_service import ObjectService
 
 
 class ServiceContainer(containers.DeclarativeContainer):
@@ -31,8 +50,192 @@ class ServiceContainer(containers.DeclarativeContainer):
     oss_container: OssContainer = providers.DependenciesContainer()
     vector_container: VectorContainer = providers.DependenciesContainer()
 
+    # 密码哈希执行器
+    password_hasher: PasswordHasher = providers.Resource(
+        init_password_hasher,
+        executor=config.security.password.executor.type,
+        max_workers=config.security.password.executor.max_workers,
+        max_queue=config.security.password.executor.max_queue,
+        hash_config=config.security.password.hash,
+    )
+
+    # 已校验令牌缓存
+    token_cache = providers.Singleton(
+        TTLCache,
+        max_size=config.security.token.verify_cache.max_size,
+        ttl=config.security.token.verify_cache.ttl,
+    )
+
+    # 令牌吊销列表
+    token_revocation_list = providers.Singleton(
+        TokenRevocationList,
+        repository=data_container.token_revocation_repository,
+        sync_interval=config.security.token.revocation.sync_interval,
+    )
+
     # 账号容器
     account_service: AccountService = providers.Singleton(
         AccountService,
-        account_repository=data_container.account_repository
+        async_account_repository=data_container.async_account_repository,
+        password_hasher=password_hasher,
+        token_secret_key=config.security.token.secret_key,
+        token_algorithm=config.security.token.algorithm,
+        access_token_expire_minutes=config.security.token.access_token_expire_minutes,
+        refresh_token_expire_minutes=config.security.token.refresh_token_expire_minutes,
+        token_cache=token_cache,
+        token_revocation_list=token_revocation_list,
+    )
+
+    # 账号文件
+    object_service: ObjectService = providers.Singleton(
+        ObjectService,
+        oss_repository=oss_container.oss_repository,
+    )
+
+    # 向量模型
+    embedding_provider: EmbeddingProvider = providers.Selector(
+        config.embedding.type,
+        openai=providers.Singleton(
+            OpenAIEmbeddingProvider,
+            base_url=config.embedding.base_url,
+            api_key=config.embedding.api_key,
+            model=config.embedding.model,
+            dimensions=config.embedding.dimensions,
+            timeout=config.embedding.timeout,
+        ),
+    )
+
+    # 向量本地缓存
+    embedding_cache = providers.Singleton(
+        TTLCache,
+        max_size=config.embedding.cache.max_size,
+        ttl=config.embedding.cache.ttl,
+    )
+
+    # 向量服务
+    embedding_service: EmbeddingService = providers.Singleton(
+        EmbeddingService,
+        provider=embedding_provider,
+        cache=embedding_cache,
+        cache_repository=providers.Selector(
+            config.embedding.cache.persistence,
+            none=providers.Object(None),
+            postgres=data_container.embedding_cache_repository,
+        ),
+        max_batch_size=config.embedding.batch.max_size,
+        max_wait_ms=config.embedding.batch.max_wait_ms,
+        max_concurrency=config.embedding.batch.max_concurrency,
+    )
+
+    # 文档导入
+    ingestion_pipeline: IngestionPipeline = providers.Singleton(
+        IngestionPipeline,
+        oss_repository=oss_container.oss_repository,
+        embedding_service=embedding_service,
+        vector_repository=vector_container.vector_repository,
+        chunk_size=config.ingestion.chunk.size,
+        chunk_overlap=config.ingestion.chunk.overlap,
+        embed_batch_size=config.ingestion.embed.batch_size,
+        embed_concurrency=config.ingestion.embed.concurrency,
+        upsert_batch_size=config.ingestion.upsert.batch_size,
+        queue_size=config.ingestion.queue_size,
+    )
+
+    # 知识库归属
+    knowledge_collection_service: KnowledgeCollectionService = providers.Singleton(
+        KnowledgeCollectionService,
+        collection_repository=data_container.knowledge_collection_repository,
+    )
+
+    # 知识库检索
+    knowledge_search_service: KnowledgeSearchService = providers.Singleton(
+        KnowledgeSearchService,
+        embedding_service=embedding_service,
+        vector_repository=vector_container.vector_repository,
+        candidates=config.knowledge.search.candidates,
+        rrf_k=config.knowledge.search.rrf_k,
+        vector_weight=config.knowledge.search.weights.vector,
+        lexical_weight=config.knowledge.search.weights.lexical,
+        rerank_candidates=config.knowledge.search.rerank_candidates,
+    )
+
+    # 对话模型
+    chat_provider: ChatProvider = providers.Selector(
+        config.chat.type,
+        openai=providers.Singleton(
+            OpenAIChatProvider,
+            base_url=config.chat.base_url,
+            api_key=config.chat.api_key,
+            model=config.chat.model,
+            connect_timeout=config.chat.connect_timeout,
+            read_timeout=config.chat.read_timeout,
+            max_connections=config.chat.max_connections,
+        ),
+    )
+
+    # 可续传的流式回复
+    chat_stream_registry = providers.Singleton(
+        ChatStreamRegistry,
+        max_events=config.chat.stream.max_events,
+        max_bytes=config.chat.stream.max_bytes,
+        max_total_bytes=config.chat.stream.max_total_bytes,
+        ttl=config.chat.stream.ttl,
+        detach_timeout=config.chat.stream.detach_timeout,
+    )
+
+    # 消息后写缓冲，对话中产生的消息批量写入，不阻塞流式输出
+    message_writer: WriteBehindBuffer = providers.Singleton(
+        WriteBehindBuffer,
+        handler=data_container.conversation_repository.provided.insert_messages,
+        max_batch_size=config.chat.history.write_behind.max_batch_size,
+        max_wait=config.chat.history.write_behind.max_wait,
+        max_pending=config.chat.history.write_behind.max_pending,
+        max_concurrency=config.chat.history.write_behind.max_concurrency,
+        max_retries=config.chat.history.write_behind.max_retries,
+        # 按会话记录丢弃的消息
+        key=providers.Object(operator.itemgetter('conversation_id')),
+    )
+
+    # 会话服务
+    conversation_service: ConversationService = providers.Singleton(
+        ConversationService,
+        conversation_repository=data_container.conversation_repository,
+        message_writer=message_writer,
+    )
+
+    # 对话服务
+    chat_service: ChatService = providers.Singleton(
+        ChatService,
+        provider=chat_provider,
+        stream_registry=chat_stream_registry,
+        conversation_service=conversation_service,
+    )
+
+    # 后台任务
+    job_service: JobService = providers.Singleton(
+        JobService,
+        job_repository=data_container.job_repository,
+        default_queue=config.job.default_queue,
+        max_attempts=config.job.max_attempts,
+    )
+
+    # 任务类型 -> 处理函数
+    job_handlers = providers.Dict({
+        INGEST_DOCUMENT_JOB: ingestion_pipeline.provided.ingest,
+    })
+
+    # 任务执行者，仅在 worker.py 启动的执行进程中创建
+    job_worker: JobWorker = providers.Singleton(
+        JobWorker,
+        job_repository=data_container.job_repository,
+        handlers=job_handlers,
+        queues=config.job.worker.queues,
+        batch_size=config.job.worker.batch_size,
+        concurrency=config.job.worker.concurrency,
+        poll_interval=config.job.worker.poll_interval,
+        visibility_timeout=config.job.worker.visibility_timeout,
+        retry_backoff=config.job.worker.retry_backoff,
+        max_backoff=config.job.worker.max_backoff,
+        shutdown_timeout=config.job.worker.shutdown_timeout,
+        retention=config.job.retention,
     )
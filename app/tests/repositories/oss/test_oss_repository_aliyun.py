@@ -0,0 +1,128 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import os
+
+import pytest
+
+moto_server = pytest.importorskip('moto.server')
+boto3 = pytest.importorskip('boto3')
+
+from repositories.oss.OssRepositoryAliyun import OssRepositoryAliyun
+
+_MIB = 1024 * 1024
+# S3 要求除最后一片外分片不小于 5MB
+_PART_SIZE = 5 * _MIB
+_BUCKET = 'cube-test'
+
+
+@pytest.fixture(scope='module')
+def endpoint():
+    server = moto_server.ThreadedMotoServer(ip_address='127.0.0.1', port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint = f'http://{host}:{port}'
+    boto3.client('s3', endpoint_url=endpoint, region_name='us-east-1', aws_access_key_id='test',
+                 aws_secret_access_key='test').create_bucket(Bucket=_BUCKET)
+    yield endpoint
+    server.stop()
+
+
+@pytest.fixture
+def repository(endpoint, tmp_path):
+    return _repository(endpoint, tmp_path)
+
+
+def _repository(endpoint, state_path) -> OssRepositoryAliyun:
+    return OssRepositoryAliyun(endpoint=endpoint, bucket=_BUCKET, access_key_id='test', access_key_secret='test',
+                               region='us-east-1', part_size=_PART_SIZE, max_concurrency=2,
+                               state_path=str(state_path), download_part_size=2 * _MIB, addressing_style='path')
+
+
+async def _stream(data: bytes, fail_at: int = None, gate: asyncio.Event = None):
+    for offset in range(0, len(data), 256 * 1024):
+        if fail_at is not None and offset >= fail_at:
+            raise IOError('client disconnected')
+        if gate is not None and offset >= 2 * _PART_SIZE:
+            await gate.wait()
+        yield data[offset:offset + 256 * 1024]
+        await asyncio.sleep(0)
+
+
+async def _read(repository: OssRepositoryAliyun, key: str, offset: int = 0, length: int = None) -> bytes:
+    return b''.join([chunk async for chunk in repository.get_object(key, offset, length)])
+
+
+def _count_parts(repository: OssRepositoryAliyun) -> list[int]:
+    numbers = []
+    upload_part = repository._client.upload_part
+
+    def counting(**kwargs):
+        numbers.append(kwargs['PartNumber'])
+        return upload_part(**kwargs)
+
+    repository._client.upload_part = counting
+    return numbers
+
+
+def test_multipart_upload(repository):
+    data = os.urandom(3 * _PART_SIZE + 123)
+
+    async def run():
+        obj = await repository.put_object('multipart.bin', _stream(data), 'application/octet-stream')
+        assert obj.size == len(data)
+        assert (await repository.head_object('multipart.bin')).size == len(data)
+        assert await _read(repository, 'multipart.bin') == data
+        assert await _read(repository, 'multipart.bin', 1000, 6 * _MIB) == data[1000:1000 + 6 * _MIB]
+
+    asyncio.run(run())
+
+
+def test_resume_interrupted_upload(endpoint, tmp_path):
+    data = os.urandom(4 * _PART_SIZE + 123)
+
+    async def run():
+        with pytest.raises(IOError):
+            await _repository(endpoint, tmp_path).put_object('resume.bin', _stream(data, fail_at=3 * _PART_SIZE))
+
+        # 新的实例模拟进程重启，仅上传缺少的分片
+        repository = _repository(endpoint, tmp_path)
+        numbers = _count_parts(repository)
+        await repository.put_object('resume.bin', _stream(data))
+        assert sorted(numbers) == [4, 5]
+        assert await _read(repository, 'resume.bin') == data
+        assert not any(files for _, _, files in os.walk(tmp_path))
+
+    asyncio.run(run())
+
+
+def test_concurrent_uploads_of_same_key(repository, tmp_path):
+    first, second = os.urandom(3 * _PART_SIZE + 1), os.urandom(3 * _PART_SIZE + 2)
+
+    async def run():
+        gate = asyncio.Event()
+        # 第一个上传在前两个分片后暂停，第二个上传不能续传第一个上传
+        pending = asyncio.create_task(repository.put_object('concurrent.bin', _stream(first, gate=gate)))
+        await asyncio.sleep(0.5)
+        await repository.put_object('concurrent.bin', _stream(second))
+        assert await _read(repository, 'concurrent.bin') == second
+
+        gate.set()
+        await pending
+        assert await _read(repository, 'concurrent.bin') == first
+
+    asyncio.run(run())
@@ -16,5 +16,7 @@ limitations under the License.
 
 __all__ = [
     'password',
-    'dataclass_tolerant'
+    'password_hasher',
+    'dataclass_tolerant',
+    'micro_batcher',
 ]
@@ -14,36 +14,81 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from dataclasses import fields
+from dataclasses import dataclass, fields, is_dataclass
 from functools import wraps
+from typing import Iterable, Mapping, Sequence
 
 
-def tolerant_dataclass(_cls=None, *, extra_ignore=False):
+def tolerant_dataclass(_cls=None, *, extra_ignore=False, **dataclass_kwargs):
+    """
+    宽容的数据类，构造时忽略未定义的字段
+    未声明为dataclass的类会生成基于 __slots__ 的dataclass，字段集合在装饰时预先计算，
+    并提供从查询结果行批量构造的方法 from_row / from_rows / from_mapping / from_mappings
+    """
+
     def wrap(cls):
+        if not is_dataclass(cls):
+            cls = dataclass(cls, slots=True, **dataclass_kwargs)
+
         # 保存原始 __init__
         orig_init = cls.__init__
 
+        # 装饰时预先计算字段，避免每次构造时反射
+        field_names = tuple(field.name for field in fields(cls))
+        defined_fields = frozenset(field_names)
+
         # 定义新的 __init__，它会忽略未定义的字段
         @wraps(orig_init)
         def new_init(self, *args, **kwargs):
-            # 获取类中已定义的字段集合
-            defined_fields = {field.name for field in fields(cls)}
-            # 把传入的关键字参数分为已定义和未定义两组
-            defined_kwargs = {k: v for k, v in kwargs.items() if k in defined_fields}
-            extra_kwargs = {k: v for k, v in kwargs.items() if k not in defined_fields}
+            # 仅在存在未定义的字段时才过滤
+            if kwargs and not defined_fields.issuperset(kwargs):
+                # 未定义的字段均被忽略，与原有 extra_ignore 的处理一致
+                kwargs = {k: v for k, v in kwargs.items() if k in defined_fields}
 
             # 调用原始的 __init__
-            orig_init(self, *args, **defined_kwargs)
+            orig_init(self, *args, **kwargs)
+
+        def from_row(klass, row: Sequence):
+            """
+            按字段顺序从元组（查询结果行）构造
+            """
+            obj = object.__new__(klass)
+            orig_init(obj, *row)
+            return obj
+
+        def from_rows(klass, rows: Iterable[Sequence]) -> list:
+            """
+            按字段顺序从多行批量构造
+            """
+            new = object.__new__
+            objs = []
+            for row in rows:
+                obj = new(klass)
+                orig_init(obj, *row)
+                objs.append(obj)
+            return objs
+
+        def from_mapping(klass, mapping: Mapping):
+            """
+            从映射构造，忽略未定义的键
+            """
+            obj = object.__new__(klass)
+            orig_init(obj, **{name: mapping[name] for name in field_names if name in mapping})
+            return obj
 
-            # 如果需要，处理额外的关键字参数
-            if extra_ignore:
-                for key, value in extra_kwargs.items():
-                    # 在这里，我们选择简单地忽略未定义的字段
-                    # 但是你可以根据需要进行更复杂的处理
-                    pass
+        def from_mappings(klass, mappings: Iterable[Mapping]) -> list:
+            """
+            从多个映射批量构造
+            """
+            return [from_mapping(klass, mapping) for mapping in mappings]
 
         # 替换掉原来的 __init__ 方法
         cls.__init__ = new_init
+        cls.field_names = field_names
+        cls.from_row = classmethod(from_row)
+        cls.from_rows = classmethod(from_rows)
+        cls.from_mapping = classmethod(from_mapping)
+        cls.from_mappings = classmethod(from_mappings)
         return cls
 
     # 支持没有括号的情况 @tolerant_dataclass
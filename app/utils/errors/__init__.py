@@ -17,4 +17,10 @@ limitations under the License.
 __all__ = [
     'base_error',
     'account_error',
+    'password_error',
+    'embedding_error',
+    'oss_error',
+    'chat_error',
+    'ingestion_error',
+    'job_error',
 ]
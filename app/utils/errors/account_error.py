@@ -18,3 +18,8 @@ from utils.errors.base_error import BaseServiceError
 
 class AccountLoginError(BaseServiceError):
     pass
+
+
+class AccountTokenError(BaseServiceError):
+    def __init__(self, message: str = '登录已失效，请重新登录', status_code: int = 401):
+        super().__init__(message, status_code)
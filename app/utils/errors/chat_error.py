@@ -0,0 +1,41 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from utils.errors.base_error import BaseServiceError
+
+
+class ChatProviderError(BaseServiceError):
+    def __init__(self, message: str = '模型服务异常，请稍后重试', status_code: int = 502):
+        super().__init__(message, status_code)
+
+
+class ChatStreamNotFoundError(BaseServiceError):
+    def __init__(self, message: str = '回复不存在或已过期', status_code: int = 404):
+        super().__init__(message, status_code)
+
+
+class ChatStreamExpiredError(BaseServiceError):
+    def __init__(self, message: str = '断开期间的回复已过期，请重新发起对话', status_code: int = 410):
+        super().__init__(message, status_code)
+
+
+class ConversationNotFoundError(BaseServiceError):
+    def __init__(self, message: str = '会话不存在', status_code: int = 404):
+        super().__init__(message, status_code)
+
+
+class InvalidCursorError(BaseServiceError):
+    def __init__(self, message: str = '分页游标无效', status_code: int = 400):
+        super().__init__(message, status_code)
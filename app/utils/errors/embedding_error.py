@@ -0,0 +1,26 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from utils.errors.base_error import BaseServiceError
+
+
+class EmbeddingProviderError(BaseServiceError):
+    def __init__(self, message: str = '向量模型服务异常，请稍后重试', status_code: int = 502):
+        super().__init__(message, status_code)
+
+
+class EmbeddingError(BaseServiceError):
+    def __init__(self, message: str = '向量模型返回的向量数与文本数不一致', status_code: int = 502):
+        super().__init__(message, status_code)
@@ -0,0 +1,27 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from utils.errors.base_error import BaseServiceError
+
+
+class KnowledgeCollectionNotFoundError(BaseServiceError):
+    def __init__(self, message: str = '知识库不存在', status_code: int = 404):
+        super().__init__(message, status_code)
+
+
+class KnowledgeCollectionConflictError(BaseServiceError):
+    def __init__(self, message: str = '知识库名称已被占用', status_code: int = 409):
+        super().__init__(message, status_code)
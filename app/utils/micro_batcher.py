@@ -0,0 +1,117 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+log = logging.getLogger()
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    微批处理器，将并发提交的单个请求在一个很小的时间或数量窗口内合并为一次批量调用
+    批量调用的并发数受限，超出时新的批次排队等待，形成背压
+    """
+
+    def __init__(self, handler: Callable[[list[T]], Awaitable[list[R]]],
+                 max_batch_size: int = 64, max_wait: float = 0.01, max_concurrency: int = 4):
+        """
+        :param handler: 批量处理函数，返回值与输入一一对应
+        :param max_batch_size: 单批最大数量，达到后立即提交
+        :param max_wait: 首个请求到达后最长等待时间（秒）
+        :param max_concurrency: 同时执行的批次数
+        """
+        self._handler = handler
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self._pending: list[tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.items = 0
+        self.full_batches = 0
+
+    async def submit(self, item: T) -> R:
+        """
+        提交单个请求，等待所在批次处理完成
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self._max_batch_size]
+            del self._pending[:self._max_batch_size]
+            if len(batch) == self._max_batch_size:
+                self.full_batches += 1
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[T, asyncio.Future]]):
+        async with self._semaphore:
+            # 等待期间已被取消的请求不再处理
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                return
+
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = await self._handler([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def close(self):
+        """
+        提交剩余请求并等待所有批次完成
+        """
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'full_batches': self.full_batches,
+            'avg_batch_size': self.items / self.batches if self.batches else 0,
+            'pending': len(self._pending),
+            'running': len(self._tasks),
+        }
@@ -14,11 +14,36 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
 
+def configure(schemes: list[str], bcrypt: Optional[dict] = None, argon2: Optional[dict] = None):
+    """
+    配置密码上下文
+    首个方案用于生成新的HASH，其余方案仅用于校验；方案或参数与当前配置不一致的HASH会被标记为需要更新
+    :param schemes: 哈希方案，如 ['argon2', 'bcrypt']
+    :param bcrypt: bcrypt参数，rounds
+    :param argon2: argon2参数，time_cost / memory_cost(KiB) / parallelism
+    """
+    settings = {'schemes': schemes, 'deprecated': 'auto'}
+
+    if bcrypt and bcrypt.get('rounds'):
+        rounds = int(bcrypt['rounds'])
+        # 限定上下界，cost与配置不一致的HASH均会被重新计算
+        settings.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
+
+    if argon2:
+        for key in ('time_cost', 'memory_cost', 'parallelism'):
+            if argon2.get(key):
+                settings[f'argon2__{key}'] = int(argon2[key])
+
+    pwd_context.update(**settings)
+
+
 def hash_password(password: str) -> str:
     """
     密码加密
@@ -36,3 +61,13 @@ def verify_password(password: str, password_hash: str) -> bool:
     :return: True / False
     """
     return pwd_context.verify(password, password_hash)
+
+
+def verify_and_update(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    密码验证，并在HASH方案或参数过期时重新计算HASH
+    :param password: 密码
+    :param password_hash: HASH后的密码
+    :return: (True / False, 新的HASH，无需更新时为None)
+    """
+    return pwd_context.verify_and_update(password, password_hash)
@@ -0,0 +1,106 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import statistics
+import time
+
+from passlib.context import CryptContext
+
+_SAMPLE_PASSWORD = 'calibrate-password'
+
+
+def measure(context: CryptContext, samples: int = 5) -> float:
+    """
+    测量单次校验耗时的中位数
+    :param context: 密码上下文
+    :param samples: 采样次数
+    :return: 耗时（毫秒）
+    """
+    password_hash = context.hash(_SAMPLE_PASSWORD)
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.verify(_SAMPLE_PASSWORD, password_hash)
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int = 5, min_rounds: int = 10, max_rounds: int = 16) -> int:
+    """
+    标定bcrypt rounds
+    :param target_ms: 目标校验耗时（毫秒）
+    :return: rounds
+    """
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        elapsed = measure(CryptContext(schemes=['bcrypt'], bcrypt__default_rounds=rounds), samples)
+        print(f'bcrypt rounds={rounds}: {elapsed:.1f} ms')
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+    return chosen
+
+
+def calibrate_argon2(target_ms: float, memory_cost: int, parallelism: int, samples: int = 5,
+                     max_time_cost: int = 10) -> int:
+    """
+    标定argon2 time_cost，内存参数由调用方指定
+    :param target_ms: 目标校验耗时（毫秒）
+    :param memory_cost: 内存（KiB）
+    :param parallelism: 并行度
+    :return: time_cost
+    """
+    chosen = 1
+    for time_cost in range(1, max_time_cost + 1):
+        context = CryptContext(schemes=['argon2'], argon2__time_cost=time_cost,
+                               argon2__memory_cost=memory_cost, argon2__parallelism=parallelism)
+        elapsed = measure(context, samples)
+        print(f'argon2 time_cost={time_cost} memory_cost={memory_cost} parallelism={parallelism}: {elapsed:.1f} ms')
+        if elapsed > target_ms:
+            break
+        chosen = time_cost
+    return chosen
+
+
+def main():
+    """
+    密码哈希参数标定
+    在当前主机上测量不同cost下单次校验的耗时，选出不超过目标耗时的最大cost
+
+    python -m utils.password_calibrate --scheme bcrypt --target-ms 250
+    python -m utils.password_calibrate --scheme argon2 --target-ms 100 --memory-cost 19456 --parallelism 1
+    """
+    parser = argparse.ArgumentParser(description='标定密码哈希参数')
+    parser.add_argument('--scheme', choices=['bcrypt', 'argon2'], default='bcrypt')
+    parser.add_argument('--target-ms', type=float, default=250, help='目标单次校验耗时（毫秒）')
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--memory-cost', type=int, default=19456, help='argon2内存（KiB）')
+    parser.add_argument('--parallelism', type=int, default=1, help='argon2并行度')
+    args = parser.parse_args()
+
+    print('# config.yml security.password.hash')
+    if args.scheme == 'bcrypt':
+        rounds = calibrate_bcrypt(args.target_ms, args.samples)
+        print(f'bcrypt:\n  rounds: {rounds}')
+    else:
+        time_cost = calibrate_argon2(args.target_ms, args.memory_cost, args.parallelism, args.samples)
+        print(f'argon2:\n  time_cost: {time_cost}\n  memory_cost: {args.memory_cost}\n'
+              f'  parallelism: {args.parallelism}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from utils import password as password_util
+from utils.errors.password_error import PasswordHasherBusyError
+
+log = logging.getLogger()
+
+
+def _timed_call(fn: Callable, *args):
+    """
+    在执行器中运行并计时，返回 (结果, 耗时秒)
+    """
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+class _Timing:
+    """
+    耗时统计
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class PasswordHasher:
+    """
+    密码哈希执行器
+    将CPU密集的哈希计算放到独立的执行器中，并限制排队长度，队列满时快速失败
+    """
+
+    def __init__(self, executor: str = 'process', max_workers: int = 2, max_queue: int = 64,
+                 hash_config: Optional[dict] = None):
+        """
+        :param executor: 执行器类型 inline | thread | process
+        :param max_workers: 并发执行的哈希计算数
+        :param max_queue: 最大排队数，超过后直接拒绝
+        :param hash_config: 哈希方案配置，见 password.configure
+        """
+        if executor not in ('inline', 'thread', 'process'):
+            raise ValueError(f'Unknown password executor type: {executor}')
+
+        self._executor_type = executor
+        self._max_workers = max_workers
+        self._max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._hash_config = hash_config
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._wait = _Timing()
+        self._hash = _Timing()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self._executor_type == 'process':
+                        # 使用spawn，避免fork带有事件循环及线程的父进程
+                        # 子进程中需要同样配置密码上下文
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self._max_workers,
+                            mp_context=multiprocessing.get_context('spawn'),
+                            initializer=password_util.configure if self._hash_config else None,
+                            initargs=(self._hash_config['schemes'], self._hash_config.get('bcrypt'),
+                                      self._hash_config.get('argon2')) if self._hash_config else (),
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self._max_workers,
+                            thread_name_prefix='password-hasher',
+                        )
+        return self._executor
+
+    async def _submit(self, fn: Callable, *args):
+        with self._lock:
+            if self._in_flight >= self._max_workers + self._max_queue:
+                self._rejected += 1
+                raise PasswordHasherBusyError()
+            self._in_flight += 1
+
+        submitted = time.perf_counter()
+        try:
+            if self._executor_type == 'inline':
+                result, elapsed = _timed_call(fn, *args)
+            else:
+                loop = asyncio.get_running_loop()
+                result, elapsed = await loop.run_in_executor(self._get_executor(), _timed_call, fn, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        total = time.perf_counter() - submitted
+        with self._lock:
+            self._hash.record(elapsed)
+            self._wait.record(max(total - elapsed, 0.0))
+        return result
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        """
+        密码验证
+        :param password: 密码
+        :param password_hash: HASH后的密码
+        :return: True / False
+        """
+        return await self._submit(password_util.verify_password, password, password_hash)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """
+        密码验证，并在HASH过期时重新计算HASH
+        :param password: 密码
+        :param password_hash: HASH后的密码
+        :return: (True / False, 新的HASH，无需更新时为None)
+        """
+        return await self._submit(password_util.verify_and_update, password, password_hash)
+
+    async def hash(self, password: str) -> str:
+        """
+        密码加密
+        :param password: 密码
+        :return: HASH后的密码
+        """
+        return await self._submit(password_util.hash_password, password)
+
+    def stats(self) -> dict:
+        """
+        执行器统计信息
+        """
+        with self._lock:
+            return {
+                'executor': self._executor_type,
+                'max_workers': self._max_workers,
+                'max_queue': self._max_queue,
+                'in_flight': self._in_flight,
+                'queue_depth': max(self._in_flight - self._max_workers, 0),
+                'rejected': self._rejected,
+                'wait': self._wait.as_dict(),
+                'hash': self._hash.as_dict(),
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def init_password_hasher(executor: str, max_workers: int, max_queue: int, hash_config: Optional[dict] = None):
+    """
+    密码哈希执行器资源，应用关闭时释放执行器
+    """
+    if hash_config:
+        password_util.configure(hash_config['schemes'], hash_config.get('bcrypt'), hash_config.get('argon2'))
+
+    hasher = PasswordHasher(executor=executor, max_workers=max_workers, max_queue=max_queue,
+                            hash_config=hash_config)
+    yield hasher
+    hasher.shutdown()
@@ -0,0 +1,52 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+# 同一毫秒内的计数器占 rand_a 的12位，起始值只取低11位随机数，保证每毫秒至少可生成2048个
+_COUNTER_MAX = 0xfff
+_COUNTER_SEED_MASK = 0x7ff
+_RAND_B_MASK = (1 << 62) - 1
+
+
+def uuid7() -> uuid.UUID:
+    """
+    生成 UUIDv7（RFC 9562）：48位毫秒时间戳 + 版本 + 12位计数器 + 变体 + 62位随机数
+    按时间递增，作为主键时插入集中在索引末端，避免随机主键造成的页分裂及索引膨胀
+    同一进程内严格递增：同一毫秒内计数器加一，计数溢出或时钟回拨时沿用上次的时间戳继续递增
+    :return: UUID
+    """
+    global _last_ms, _counter
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            _counter = int.from_bytes(os.urandom(2), 'big') & _COUNTER_SEED_MASK
+        else:
+            _counter += 1
+            if _counter > _COUNTER_MAX:
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+
+    rand_b = int.from_bytes(os.urandom(8), 'big') & _RAND_B_MASK
+    return uuid.UUID(int=(ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | rand_b)
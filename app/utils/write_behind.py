@@ -0,0 +1,180 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+log = logging.getLogger()
+
+T = TypeVar('T')
+
+# 记录丢弃数量的最大分组数，超过后淘汰最早的分组
+_MAX_DROPPED_KEYS = 1000
+
+
+class WriteBehindBuffer(Generic[T]):
+    """
+    后写缓冲，写入方只把数据放入进程内缓冲即返回，缓冲按数量或时间窗口合并为批量写入
+    未写完的数据超过上限时写入方等待，形成背压；写入失败按指数退避重试，超过次数后丢弃，并按分组记录丢弃的数量
+    """
+
+    def __init__(self, handler: Callable[[list[T]], Awaitable], max_batch_size: int = 500,
+                 max_wait: float = 0.05, max_pending: int = 10000, max_concurrency: int = 2,
+                 max_retries: int = 3, retry_backoff: float = 0.5, key: Optional[Callable[[T], str]] = None):
+        """
+        :param handler: 批量写入函数
+        :param max_batch_size: 单批最大数量，达到后立即写入
+        :param max_wait: 首条数据进入缓冲后最长等待时间（秒）
+        :param max_pending: 缓冲及写入中的最大数量，超过后写入方等待
+        :param max_concurrency: 同时执行的批次数
+        :param max_retries: 单批最大重试次数
+        :param retry_backoff: 首次重试前的等待时间（秒），之后逐次翻倍
+        :param key: 数据的分组键（如会话ID），丢弃时按分组记录日志及数量
+        """
+        self._handler = handler
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._max_pending = max_pending
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._key = key
+        # 分组键 -> 丢弃的数量，最近丢弃的分组在后
+        self._dropped_by_key: OrderedDict[str, int] = OrderedDict()
+
+        self._pending: list[T] = []
+        self._writing = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._released: Optional[asyncio.Event] = None
+        self._closed = False
+
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.dropped = 0
+        self.blocked = 0
+
+    async def put(self, item: T):
+        """
+        放入缓冲，通常立即返回；缓冲已满时等待已有批次写完
+        """
+        if self._closed:
+            raise RuntimeError('Write-behind buffer is closed')
+
+        if len(self._pending) + self._writing >= self._max_pending:
+            self.blocked += 1
+            while len(self._pending) + self._writing >= self._max_pending:
+                # 缓冲已满时不再等待时间窗口
+                self._flush()
+                if self._released is None:
+                    self._released = asyncio.Event()
+                await self._released.wait()
+
+        self._pending.append(item)
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._max_wait, self._flush)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self._max_batch_size]
+            del self._pending[:self._max_batch_size]
+            self._writing += len(batch)
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[T]):
+        try:
+            async with self._semaphore:
+                for attempt in range(self._max_retries + 1):
+                    try:
+                        await self._handler(batch)
+                        self.written += len(batch)
+                        self.batches += 1
+                        return
+                    except Exception as e:
+                        if attempt >= self._max_retries:
+                            self._drop(batch, attempt, e)
+                            return
+                        self.retries += 1
+                        log.warning('Write-behind batch of %d failed, retrying: %s', len(batch), e)
+                        await asyncio.sleep(self._retry_backoff * 2 ** attempt)
+        finally:
+            self._writing -= len(batch)
+            # 唤醒所有等待空间的写入方
+            if self._released is not None:
+                self._released.set()
+                self._released = None
+
+    def _drop(self, batch: list[T], retries: int, error: Exception):
+        self.dropped += len(batch)
+        if self._key is None:
+            log.error('Write-behind batch of %d dropped after %d retries: %s', len(batch), retries, error)
+            return
+
+        # 一批可能包含多个分组的数据，逐个分组记录，便于定位受影响的会话
+        for key, count in Counter(self._key(item) for item in batch).items():
+            log.error('Write-behind dropped %d items of %s after %d retries: %s', count, key, retries, error)
+            self._dropped_by_key[key] = self._dropped_by_key.pop(key, 0) + count
+        while len(self._dropped_by_key) > _MAX_DROPPED_KEYS:
+            self._dropped_by_key.popitem(last=False)
+
+    def dropped_for(self, key: str) -> int:
+        """
+        分组因写入失败被丢弃的数量，仅包含本进程最近丢弃的分组
+        :param key: 分组键
+        """
+        return self._dropped_by_key.get(key, 0)
+
+    async def flush(self):
+        """
+        立即写入缓冲中的数据，并等待调用时已有的批次完成；之后放入的数据不在等待范围内，持续写入时也能及时返回
+        """
+        self._flush()
+        tasks = list(self._tasks)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self):
+        """
+        拒绝新的数据，写入剩余数据并等待完成，通常在应用关闭前调用
+        """
+        self._closed = True
+        # 关闭前已在等待缓冲空间的写入方仍会放入数据
+        while self._pending or self._tasks:
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            'written': self.written,
+            'batches': self.batches,
+            'avg_batch_size': self.written / self.batches if self.batches else 0,
+            'retries': self.retries,
+            'dropped': self.dropped,
+            'blocked': self.blocked,
+            'pending': len(self._pending),
+            'writing': self._writing,
+            'dropped_by_key': dict(self._dropped_by_key),
+        }
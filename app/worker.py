@@ -0,0 +1,74 @@
+"""
+Copyright 2024 Maner·Fan
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import argparse
+import asyncio
+import logging.config
+import os
+import signal
+from typing import Optional
+
+import yaml
+
+import app_container
+
+# 日志配置
+with open('logging.yml', 'r') as f:
+    config = yaml.safe_load(f)
+    # 日志目录不纳入版本管理，首次启动时创建
+    for handler in config['handlers'].values():
+        if 'filename' in handler:
+            os.makedirs(os.path.dirname(handler['filename']), exist_ok=True)
+    logging.config.dictConfig(config)
+
+
+async def run(queues: Optional[list[str]] = None):
+    """
+    后台任务执行进程，与API进程使用相同的容器及配置
+    :param queues: 处理的队列，为空时使用 job.worker.queues
+    """
+
+    # 初始化Container容器
+    container = app_container.AppContainer()
+    if queues:
+        container.config.job.worker.queues.from_value(queues)
+    container.init_resources()
+
+    # 注入依赖
+    container.wire(packages=['services', 'repositories'])
+
+    worker = container.service_container.job_worker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        await container.service_container.embedding_provider().close()
+        container.shutdown_resources()
+        # 释放数据库连接池
+        await container.repository_container.data_container.db_pg().dispose()
+
+
+if __name__ == '__main__':
+    """
+    python worker.py [--queues default ...]
+    可在多个节点上启动任意数量的执行进程，任务不会被重复领取
+    """
+    parser = argparse.ArgumentParser(description='后台任务执行进程')
+    parser.add_argument('--queues', nargs='+', help='处理的队列，默认使用配置 job.worker.queues')
+    args = parser.parse_args()
+    asyncio.run(run(args.queues))